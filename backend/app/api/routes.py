@@ -1,13 +1,82 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Body, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import ValidationError
+import asyncio
+import json
 import logging
-from app.models.schemas import OptimizationResponse, UserPreferences
+import time
+from typing import List, Optional, Union
+from app.config import env_int
+from app.models.domain import PoiCatalogue
+from app.models.schemas import JobInfo, OptimizationResponse, SolverProfile, UserPreferences
 from app.services.algorithm.hga_engine import HybridGeneticAlgorithm
-from app.services.data_loader import load_solomon_c101
+from app.services.data_loader import (
+    DEFAULT_DATASET,
+    UnknownDatasetError,
+    available_datasets,
+    get_catalogue,
+)
+from app.services.island import ISLAND_COUNT, island_config, solve_islands
+from app.services.jobs import JobQueueFullError, job_manager
+from app.services.metrics import metrics
+from app.services.result_cache import cache_key, result_cache
+from app.services.solver_pool import (
+    SolverBusyError,
+    empty_route_detail,
+    solve_itinerary,
+    solver_pool,
+    stream_itinerary,
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+BUSY_DETAIL = "Hệ thống đang xử lý quá nhiều yêu cầu. Vui lòng thử lại sau."
+ERROR_DETAIL = "Đã xảy ra lỗi trong quá trình tối ưu hóa lộ trình."
+
+BATCH_MAX_SIZE = env_int("HGA_BATCH_MAX_SIZE", 1000)   # Số request tối đa mỗi batch
+
+
+def _validate_start_node(request: UserPreferences) -> PoiCatalogue:
+    """
+    Edge Case 6: dataset, start_node_id và end_node_id phải tồn tại (400 nếu không).
+    Trả về catalogue của dataset được yêu cầu.
+    """
+    try:
+        catalogue = get_catalogue(request.dataset)
+    except UnknownDatasetError:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"Dataset '{request.dataset}' không tồn tại. "
+                f"Dataset hợp lệ: {', '.join(available_datasets())}."
+            ),
+        )
+    if request.start_node_id not in catalogue.by_id:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"Điểm xuất phát (start_node_id={request.start_node_id}) "
+                f"không tồn tại trong dataset. "
+                f"ID hợp lệ: 0 đến {max(catalogue.by_id)}."
+            ),
+        )
+    if request.end_node_id is not None and request.end_node_id not in catalogue.by_id:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"Điểm kết thúc (end_node_id={request.end_node_id}) "
+                f"không tồn tại trong dataset. "
+                f"ID hợp lệ: 0 đến {max(catalogue.by_id)}."
+            ),
+        )
+    return catalogue
+
+
+def _request_cache_key(request: UserPreferences, catalogue: PoiCatalogue) -> str:
+    solver_config = {**HybridGeneticAlgorithm.solver_config(), **island_config()}
+    return cache_key(request, catalogue.key, solver_config)
+
 
 @router.post(
     "/optimize",
@@ -18,9 +87,13 @@ logger = logging.getLogger(__name__)
         "và trả về lộ trình tối ưu sử dụng thuật toán Di truyền Lai (HGA).\n\n"
         "**Quy trình xử lý:**\n"
         "1. Pydantic validation: kiểm tra budget, khung thời gian, interests → 422 nếu sai định dạng.\n"
-        "2. Business validation: kiểm tra start_node_id có tồn tại trong dataset → 400 nếu không hợp lệ.\n"
-        "3. Chạy HGA tối ưu lộ trình → 500 nếu lỗi hệ thống.\n"
+        "2. Business validation: kiểm tra dataset, start_node_id và end_node_id có tồn tại → 400 nếu không hợp lệ.\n"
+        "3. Chạy HGA tối ưu lộ trình trong process pool → 503 nếu hàng đợi solver đã đầy, "
+        "500 nếu lỗi hệ thống.\n"
         "4. Kiểm tra kết quả: route rỗng hoặc chỉ có Depot → 404.\n\n"
+        "**Cache:** request trùng (cùng preferences, dataset và cấu hình solver) được trả "
+        "ngay từ result cache; header `X-Cache` cho biết `HIT`/`MISS`. "
+        "Dùng `?refresh=true` để buộc giải lại.\n\n"
         "**Loại hình điểm tham quan (interests):**\n"
         "- `history_culture`: Lịch sử - Văn hóa\n"
         "- `nature_parks`: Thiên nhiên - Công viên\n"
@@ -71,57 +144,367 @@ logger = logging.getLogger(__name__)
                 }
             },
         },
+        503: {
+            "description": "Server đang quá tải (hàng đợi solver đã đầy), thử lại sau.",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "Hệ thống đang xử lý quá nhiều yêu cầu. Vui lòng thử lại sau."
+                    }
+                }
+            },
+        },
     },
 )
-async def optimize_itinerary(request: UserPreferences):
+async def optimize_itinerary(
+    request: UserPreferences,
+    response: Response,
+    refresh: bool = Query(False, description="Bỏ qua result cache và giải lại từ đầu"),
+    debug: bool = Query(False, description="Trả về profiling theo pha + thời gian xử lý (header Server-Timing)"),
+):
+    started = time.perf_counter()
+    request_ms: dict[str, float] = {}
+    status = 500
     try:
-        logger.info("Received optimization request with preferences: %s", request)
+        logger.debug("Received optimization request with preferences: %s", request)
 
         # ── Edge Case 6: Validate start_node_id exists in dataset ─────────
-        pois = load_solomon_c101()
-        valid_ids = {p.id for p in pois}
-        if request.start_node_id not in valid_ids:
-            raise HTTPException(
-                status_code=400,
-                detail=(
-                    f"Điểm xuất phát (start_node_id={request.start_node_id}) "
-                    f"không tồn tại trong dataset. "
-                    f"ID hợp lệ: 0 đến {max(valid_ids)}."
-                ),
-            )
-
-        # ── Run HGA ───────────────────────────────────────────────────────
-        hga_solver = HybridGeneticAlgorithm(request)
-        result = hga_solver.run()
+        catalogue = _validate_start_node(request)
+        request_ms["validate"] = (time.perf_counter() - started) * 1000.0
+
+        # ── Result cache (request trùng → trả ngay) ───────────────────────
+        mark = time.perf_counter()
+        key = _request_cache_key(request, catalogue)
+        result = None if refresh else result_cache.get(key)
+        response.headers["X-Cache"] = "MISS" if result is None else "HIT"
+        request_ms["cache"] = (time.perf_counter() - mark) * 1000.0
+
+        # ── Run HGA (process pool, không chặn event loop) ─────────────────
+        if result is None:
+            mark = time.perf_counter()
+            try:
+                if ISLAND_COUNT > 1:
+                    result = await solve_islands(solver_pool, request)
+                else:
+                    result = await solver_pool.run(solve_itinerary, request)
+            except SolverBusyError:
+                raise HTTPException(
+                    status_code=503,
+                    detail=BUSY_DETAIL,
+                    headers={"Retry-After": "1"},
+                )
+            result_cache.put(key, result)
+            metrics.observe_profile(result.profile)
+            request_ms["solve"] = (time.perf_counter() - mark) * 1000.0
 
         # ── Edge Case 7: GA trả về route rỗng [Depot, Depot] ─────────────
-        if not result:
-            raise HTTPException(
-                status_code=404,
-                detail="Không tìm được lộ trình khả thi với các tùy chọn đã cho.",
-            )
-
-        # Kiểm tra route chỉ có Depot (không ghé được POI nào)
-        if hasattr(result, 'route') and len(result.route) <= 2:
-            raise HTTPException(
-                status_code=404,
-                detail=(
-                    "Không thể ghé thăm bất kỳ điểm nào trong khung thời gian "
-                    f"và ngân sách đã cho ({request.start_time}h → {request.end_time}h, "
-                    f"budget={request.budget:,.0f}). "
-                    "Hãy thử mở rộng khung giờ hoặc tăng ngân sách."
-                ),
-            )
-
-        return result
-
-    except HTTPException:
+        detail = empty_route_detail(request, result)
+        if detail is not None:
+            raise HTTPException(status_code=404, detail=detail)
+
+        status = 200
+        if debug:
+            request_ms["total"] = (time.perf_counter() - started) * 1000.0
+            return _debug_result(result, response, request_ms)
+        return result.without_profile()
+
+    except HTTPException as e:
         # Re-raise HTTPExceptions (đã có status code rõ ràng)
+        status = e.status_code
         raise
 
     except Exception as e:
         logger.error("Error during optimization: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
-            detail="Đã xảy ra lỗi trong quá trình tối ưu hóa lộ trình.",
-        )
\ No newline at end of file
+            detail=ERROR_DETAIL,
+        )
+
+    finally:
+        metrics.observe_request("optimize", status, time.perf_counter() - started)
+
+
+def _debug_result(result: OptimizationResponse, response: Response,
+                  request_ms: dict[str, float]) -> OptimizationResponse:
+    """Gắn thời gian xử lý request vào profile + header Server-Timing (?debug=true)."""
+    response.headers["Server-Timing"] = ", ".join(
+        f"{name};dur={ms:.1f}" for name, ms in request_ms.items()
+    )
+    profile = result.profile or SolverProfile(timings_ms={}, calls={}, counters={})
+    return result.model_copy(update={"profile": profile.model_copy(update={"request_ms": request_ms})})
+
+
+def _sse(event: str, data) -> str:
+    """Một message Server-Sent Events."""
+    if isinstance(data, OptimizationResponse):
+        data = data.model_dump(mode="json")
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post(
+    "/optimize/stream",
+    summary="Tối ưu hóa lộ trình (stream tiến trình)",
+    description=(
+        "Giống `POST /api/optimize` nhưng trả về luồng **Server-Sent Events** "
+        "(`text/event-stream`) trong khi HGA đang chạy, để client hiển thị sớm "
+        "một lộ trình tốt rồi cập nhật dần.\n\n"
+        "**Các sự kiện:**\n"
+        "- `best`: lộ trình best-ever mới (cùng dạng `OptimizationResponse`), "
+        "gửi sau khởi tạo và mỗi khi cải thiện.\n"
+        "- `generation`: thống kê mỗi thế hệ (generation, best_fitness, avg_fitness, "
+        "unique_routes, wait, stagnation, duplicates).\n"
+        "- `result`: kết quả cuối cùng (`OptimizationResponse`), kết thúc stream.\n"
+        "- `error`: `{\"detail\": ...}` nếu không có lộ trình khả thi hoặc lỗi hệ thống, "
+        "kết thúc stream.\n\n"
+        "Request trùng có trong result cache chỉ nhận một sự kiện `result`. "
+        "Lỗi 400/422/503 được trả về như endpoint thường trước khi stream bắt đầu. "
+        "Luôn chạy một quần thể (không dùng Island Model)."
+    ),
+    response_class=StreamingResponse,
+    responses={
+        200: {"description": "Luồng sự kiện SSE.", "content": {"text/event-stream": {}}},
+        400: {"description": "dataset, start_node_id hoặc end_node_id không tồn tại."},
+        422: {"description": "Lỗi validation dữ liệu."},
+        503: {"description": "Server đang quá tải (hàng đợi solver đã đầy), thử lại sau."},
+    },
+)
+async def optimize_itinerary_stream(
+    request: UserPreferences,
+    refresh: bool = Query(False, description="Bỏ qua result cache và giải lại từ đầu"),
+):
+    logger.debug("Received streaming optimization request with preferences: %s", request)
+
+    catalogue = _validate_start_node(request)
+    key = _request_cache_key(request, catalogue)
+    cached = None if refresh else result_cache.get(key)
+    if cached is None and solver_pool.pending >= solver_pool.max_pending:
+        raise HTTPException(status_code=503, detail=BUSY_DETAIL, headers={"Retry-After": "1"})
+
+    async def events():
+        started = time.perf_counter()
+        status = 200
+        if cached is not None:
+            yield _sse("result", cached.without_profile())
+            metrics.observe_request("stream", status, time.perf_counter() - started)
+            return
+        try:
+            async for kind, *payload in solver_pool.stream(stream_itinerary, request):
+                if kind == "progress":
+                    stats, best = payload
+                    if best is not None:
+                        yield _sse("best", best)
+                    yield _sse("generation", stats)
+                    continue
+
+                result = payload[0]
+                result_cache.put(key, result)
+                metrics.observe_profile(result.profile)
+                detail = empty_route_detail(request, result)
+                if detail is not None:
+                    status = 404
+                    yield _sse("error", {"detail": detail})
+                else:
+                    yield _sse("result", result.without_profile())
+        except SolverBusyError:
+            status = 503
+            yield _sse("error", {"detail": BUSY_DETAIL})
+        except Exception as e:
+            status = 500
+            logger.error("Error during streaming optimization: %s", e, exc_info=True)
+            yield _sse("error", {"detail": ERROR_DETAIL})
+        finally:
+            metrics.observe_request("stream", status, time.perf_counter() - started)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "X-Cache": "MISS" if cached is None else "HIT",
+        },
+    )
+
+
+@router.post(
+    "/optimize/batch",
+    summary="Tối ưu hóa hàng loạt (NDJSON)",
+    description=(
+        "Nhận một **mảng** `UserPreferences` (tối đa `HGA_BATCH_MAX_SIZE` phần tử) và trả về "
+        "luồng NDJSON (`application/x-ndjson`), mỗi dòng là kết quả của một phần tử theo "
+        "thứ tự HOÀN THÀNH:\n\n"
+        "- Thành công: `{\"index\": i, \"status\": 200, \"result\": {...OptimizationResponse}}`\n"
+        "- Thất bại: `{\"index\": i, \"status\": 400 | 404 | 500 | 503, \"detail\": \"...\"}` "
+        "(503: solver pool đầy giữa chừng — gửi lại các phần tử đó sau)\n\n"
+        "Các phần tử dùng chung catalogue POI và ma trận khoảng cách của solver pool, "
+        "được giải song song trên tối đa `HGA_SOLVER_WORKERS` worker (một quần thể mỗi "
+        "phần tử). Phần tử có trong result cache được trả về ngay."
+    ),
+    response_class=StreamingResponse,
+    responses={
+        200: {"description": "Luồng NDJSON.", "content": {"application/x-ndjson": {}}},
+        413: {"description": "Batch vượt quá HGA_BATCH_MAX_SIZE phần tử."},
+        422: {"description": "Lỗi validation dữ liệu của một phần tử bất kỳ."},
+        503: {"description": "Server đang quá tải (hàng đợi solver đã đầy), thử lại sau."},
+    },
+)
+async def optimize_batch(requests: List[UserPreferences] = Body(...)):
+    logger.debug("Received batch optimization request: %d items", len(requests))
+    started = time.perf_counter()
+    if len(requests) > BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch tối đa {BATCH_MAX_SIZE} phần tử, nhận được {len(requests)}.",
+        )
+
+    lines: list[dict] = []
+    todo: list[tuple[int, str]] = []     # (index, cache key) cần giải
+    for index, request in enumerate(requests):
+        try:
+            catalogue = _validate_start_node(request)
+        except HTTPException as e:
+            lines.append({"index": index, "status": e.status_code, "detail": e.detail})
+            continue
+        key = _request_cache_key(request, catalogue)
+        cached = result_cache.get(key)
+        if cached is None:
+            todo.append((index, key))
+        else:
+            lines.append(_batch_line(index, requests[index], cached))
+
+    if todo and solver_pool.pending >= solver_pool.max_pending:
+        raise HTTPException(status_code=503, detail=BUSY_DETAIL, headers={"Retry-After": "1"})
+
+    async def results():
+        status: Union[int, str] = 200
+        solved: set[int] = set()     # Vị trí trong `todo` đã có dòng kết quả
+        try:
+            for line in lines:
+                yield _ndjson(line)
+            if not todo:
+                return
+            async for pos, result, error in solver_pool.map_unordered(
+                solve_itinerary, [(requests[index],) for index, _ in todo],
+            ):
+                index, key = todo[pos]
+                solved.add(pos)
+                if error is not None:
+                    logger.error("Error during batch item %d: %s", index, error, exc_info=error)
+                    line = {"index": index, "status": 500, "detail": ERROR_DETAIL}
+                else:
+                    result_cache.put(key, result)
+                    metrics.observe_profile(result.profile)
+                    line = _batch_line(index, requests[index], result)
+                yield _ndjson(line)
+        except SolverBusyError:
+            status = 503
+            for pos, (index, _) in enumerate(todo):
+                if pos not in solved:
+                    yield _ndjson({"index": index, "status": 503, "detail": BUSY_DETAIL})
+        except (asyncio.CancelledError, GeneratorExit):
+            status = "cancelled"    # Client ngắt kết nối giữa chừng
+            raise
+        except Exception as e:
+            status = 500
+            logger.error("Error during batch optimization: %s", e, exc_info=True)
+            for pos, (index, _) in enumerate(todo):
+                if pos not in solved:
+                    yield _ndjson({"index": index, "status": 500, "detail": ERROR_DETAIL})
+        finally:
+            metrics.observe_request("batch", status, time.perf_counter() - started)
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+def _ndjson(line: dict) -> str:
+    return json.dumps(line, ensure_ascii=False) + "\n"
+
+
+def _batch_line(index: int, request: UserPreferences, result: OptimizationResponse) -> dict:
+    detail = empty_route_detail(request, result)
+    if detail is not None:
+        return {"index": index, "status": 404, "detail": detail}
+    return {"index": index, "status": 200, "result": result.without_profile().model_dump(mode="json")}
+
+
+@router.get(
+    "/datasets",
+    summary="Danh sách dataset",
+    description="Tên các bộ dữ liệu POI có thể dùng trong trường `dataset` của request.",
+)
+def list_datasets():
+    return {"default": DEFAULT_DATASET, "datasets": available_datasets()}
+
+
+@router.get(
+    "/cache/stats",
+    summary="Thống kê result cache",
+    description="Số mục đang lưu, giới hạn LRU/TTL và số lần hit/miss của result cache.",
+)
+def cache_stats():
+    return result_cache.stats()
+
+
+# =============================================================================
+#  Job API — giải bất đồng bộ
+# =============================================================================
+
+def _get_job_or_404(job_id: str) -> JobInfo:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Không tìm thấy job {job_id}.")
+    return job
+
+
+@router.post(
+    "/jobs",
+    response_model=JobInfo,
+    status_code=202,
+    summary="Tạo job tối ưu hóa (bất đồng bộ)",
+    description=(
+        "Nhận cùng request body như `POST /api/optimize` nhưng trả về ngay một job "
+        "(`status = queued`). Theo dõi bằng `GET /api/jobs/{id}`; khi `status = succeeded` "
+        "trường `result` chứa lộ trình. Hủy bằng `DELETE /api/jobs/{id}`.\n\n"
+        "Request trùng có trong result cache tạo job đã `succeeded` sẵn."
+    ),
+    responses={
+        400: {"description": "dataset, start_node_id hoặc end_node_id không tồn tại."},
+        422: {"description": "Lỗi validation dữ liệu."},
+        503: {"description": "Hàng đợi job đã đầy, thử lại sau."},
+    },
+)
+async def create_job(request: UserPreferences, response: Response):
+    logger.debug("Received optimization job with preferences: %s", request)
+    catalogue = _validate_start_node(request)
+    try:
+        job = job_manager.submit(request, cache_key=_request_cache_key(request, catalogue))
+    except JobQueueFullError:
+        raise HTTPException(status_code=503, detail=BUSY_DETAIL, headers={"Retry-After": "1"})
+    response.headers["Location"] = f"/api/jobs/{job.id}"
+    return job
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=JobInfo,
+    summary="Trạng thái / kết quả job",
+    description="Trả về trạng thái job (queued, running, succeeded, failed, cancelled) và kết quả nếu đã xong.",
+    responses={404: {"description": "Job không tồn tại (hoặc đã hết hạn lưu trữ)."}},
+)
+def get_job(job_id: str):
+    return _get_job_or_404(job_id)
+
+
+@router.delete(
+    "/jobs/{job_id}",
+    response_model=JobInfo,
+    summary="Hủy job",
+    description=(
+        "Hủy job đang chờ hoặc đang chạy (thuật toán dừng ở thế hệ kế tiếp). "
+        "Job đang chạy chuyển sang `cancelled` ngay sau đó; job đã kết thúc giữ nguyên trạng thái."
+    ),
+    responses={404: {"description": "Job không tồn tại (hoặc đã hết hạn lưu trữ)."}},
+)
+def cancel_job(job_id: str):
+    _get_job_or_404(job_id)
+    return job_manager.cancel(job_id)
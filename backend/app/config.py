@@ -0,0 +1,18 @@
+"""
+Đọc cấu hình số từ biến môi trường (HGA_*), dùng chung cho mọi module.
+
+Biến rỗng / không đặt → giá trị mặc định; giá trị sai định dạng → ValueError
+ngay khi import module cấu hình (fail fast lúc khởi động).
+"""
+
+import os
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.getenv(name, "").strip()
+    return int(value) if value else default
+
+
+def env_float(name: str, default: float) -> float:
+    value = os.getenv(name, "").strip()
+    return float(value) if value else default
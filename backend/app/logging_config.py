@@ -0,0 +1,55 @@
+"""
+Cấu hình logging dùng chung cho API và worker process.
+
+  • HGA_LOG_LEVEL  – DEBUG | INFO (mặc định) | WARNING | ERROR.
+                     Ở DEBUG, HGA log thống kê từng thế hệ (best/avg fitness,
+                     unique routes...); các thống kê này CHỈ được tính khi
+                     DEBUG bật, nên production không trả chi phí chẩn đoán.
+  • HGA_LOG_FORMAT – text (mặc định) | json. Ở dạng json, mỗi record là một
+                     dòng JSON gồm cả các trường truyền qua `extra=`
+                     (VD: bản tóm tắt mỗi lời giải trong trường `solve`).
+
+Chỉ cấu hình logger "app" (không động tới logger của uvicorn); gọi lại
+nhiều lần là an toàn.
+"""
+
+import json
+import logging
+import os
+
+LOG_LEVEL  = os.getenv("HGA_LOG_LEVEL", "").strip().upper() or "INFO"
+LOG_FORMAT = os.getenv("HGA_LOG_FORMAT", "").strip().lower() or "text"
+
+_TEXT_FORMAT = "%(asctime)s %(levelname)-7s %(processName)s %(name)s: %(message)s"
+
+# Thuộc tính chuẩn của LogRecord — phần còn lại là `extra`
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including fields passed via `extra=`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.processName,
+            "message": record.getMessage(),
+        }
+        payload.update({k: v for k, v in vars(record).items() if k not in _RECORD_FIELDS})
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT) -> None:
+    logger = logging.getLogger("app")
+    logger.setLevel(level)
+    if any(getattr(h, "_hga", False) for h in logger.handlers):
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(_TEXT_FORMAT))
+    handler._hga = True
+    logger.addHandler(handler)
+    logger.propagate = False
@@ -1,7 +1,27 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.routes import router
+from app.logging_config import configure_logging
+from app.services.jobs import job_manager
+from app.services.metrics import CONTENT_TYPE, metrics
+from app.services.solver_pool import solver_pool
+
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Khởi động process pool cùng server để worker nạp sẵn dữ liệu
+    solver_pool.start()
+    job_manager.start()
+    yield
+    await job_manager.shutdown()
+    solver_pool.shutdown()
+
 
 app = FastAPI(
     title="TOPTW Hybrid GA API",
@@ -17,6 +37,7 @@ app = FastAPI(
     license_info={
         "name": "MIT License",
     },
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -37,4 +58,18 @@ app.include_router(router, prefix="/api", tags=["Optimization"])
     tags=["System"],
 )
 def root():
-    return {"status": "ok", "message": "Server is running..."}
\ No newline at end of file
+    return {"status": "ok", "message": "Server is running..."}
+
+
+@app.get(
+    "/metrics",
+    summary="Prometheus metrics",
+    description=(
+        "Số liệu theo định dạng Prometheus: request theo endpoint/status, thời gian từng pha "
+        "của HGA, số lần đánh giá fitness, result cache hit/miss, tải của solver pool."
+    ),
+    response_class=PlainTextResponse,
+    tags=["System"],
+)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
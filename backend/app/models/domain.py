@@ -1,33 +1,175 @@
+import hashlib
+from array import array
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Iterable, Iterator, Mapping, Optional
+
+_MASK64 = (1 << 64) - 1
+
+
 class POI:
     """
     Represents a Point of Interest (or Depot when id == 0).
     Coordinates use Euclidean x/y matching Solomon benchmark format.
     Time fields are in Solomon's integer time units.
+
+    POI là BẤT BIẾN (immutable, __slots__): không toán tử GA nào được sửa
+    thuộc tính POI, nên cùng một object được dùng chung giữa mọi request
+    mà không cần deep copy.
     """
 
+    __slots__ = ('id', 'x', 'y', 'base_score', 'open_time', 'close_time',
+                 'price', 'duration', 'category')
+
     def __init__(self, id: int, x: float, y: float, score: float,
                  open_time: float, close_time: float,
                  duration: float, category: str, price: float = 0.0):
-        self.id = id
-        self.x = x                  # Tọa độ X (Euclidean – Solomon)
-        self.y = y                  # Tọa độ Y (Euclidean – Solomon)
-        self.base_score = score     # DEMAND tương ứng trong Solomon
-        self.open_time = open_time  # Giờ mở cửa (đơn vị thời gian Solomon)
-        self.close_time = close_time  # Giờ đóng cửa (đơn vị thời gian Solomon)
-        self.price = price          # Chi phí tham quan
-        self.duration = duration    # Thời gian tham quan (đơn vị thời gian Solomon = SERVICE TIME)
-        self.category = category    # Loại điểm (depot, history_culture, food_drink, ...)
+        init = object.__setattr__
+        init(self, 'id', id)
+        init(self, 'x', x)                    # Tọa độ X (Euclidean – Solomon)
+        init(self, 'y', y)                    # Tọa độ Y (Euclidean – Solomon)
+        init(self, 'base_score', score)       # DEMAND tương ứng trong Solomon
+        init(self, 'open_time', open_time)    # Giờ mở cửa (đơn vị thời gian Solomon)
+        init(self, 'close_time', close_time)  # Giờ đóng cửa (đơn vị thời gian Solomon)
+        init(self, 'price', price)            # Chi phí tham quan
+        init(self, 'duration', duration)      # Thời gian tham quan (đơn vị thời gian Solomon = SERVICE TIME)
+        init(self, 'category', category)      # Loại điểm (depot, history_culture, food_drink, ...)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"POI is immutable (cannot set '{name}')")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"POI is immutable (cannot delete '{name}')")
+
+    def __reduce__(self):
+        return (POI, (self.id, self.x, self.y, self.base_score, self.open_time,
+                      self.close_time, self.duration, self.category, self.price))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __repr__(self):
         return f"POI(id={self.id}, cat={self.category}, score={self.base_score})"
 
 
+def dataset_key(pois: Iterable[POI]) -> str:
+    """
+    Content fingerprint of a POI set (every field used by the solver),
+    so two datasets sharing coordinates but not time windows never collide.
+    """
+    h = hashlib.sha1()
+    for p in sorted(pois, key=lambda p: p.id):
+        h.update(repr((p.id, p.x, p.y, p.base_score, p.open_time, p.close_time,
+                       p.duration, p.price, p.category)).encode())
+    return h.hexdigest()[:16]
+
+
+class PoiCatalogue:
+    """
+    Read-only catalogue of the POIs of one dataset.
+
+    Built once by the data loader and shared by reference across requests;
+    per-request state (population, routes, ...) lives in the engine.
+    """
+
+    __slots__ = ('name', 'pois', 'by_id', 'key')
+
+    def __init__(self, name: str, pois: Iterable[POI]):
+        self.name = name
+        self.pois: tuple[POI, ...] = tuple(pois)
+        self.by_id: Mapping[int, POI] = MappingProxyType({p.id: p for p in self.pois})
+        self.key = dataset_key(self.pois)
+
+    def endpoint(self, poi_id: int) -> POI:
+        """
+        POI `poi_id` in the role of a route start / end (hotel, airport, ...).
+
+        The depot (id 0) is returned as is. Any other node is copied with the
+        depot's time window (the planning horizon), no service time, score or
+        price — its own opening hours do not constrain leaving or arriving.
+        Raises KeyError if `poi_id` is not in the catalogue.
+        """
+        poi = self.by_id[poi_id]
+        depot = self.by_id.get(0)
+        if depot is None or poi is depot:
+            return poi
+        return POI(id=poi.id, x=poi.x, y=poi.y, score=0.0,
+                   open_time=depot.open_time, close_time=depot.close_time,
+                   duration=0.0, category=depot.category, price=0.0)
+
+    def __len__(self) -> int:
+        return len(self.pois)
+
+    def __iter__(self) -> Iterator[POI]:
+        return iter(self.pois)
+
+    def __repr__(self):
+        return f"PoiCatalogue(name={self.name}, size={len(self.pois)}, key={self.key})"
+
+
+@lru_cache(maxsize=None)
+def zobrist_key(poi_id: int) -> int:
+    """
+    Khóa Zobrist 64-bit của một POI (splitmix64 của id → như nhau ở mọi
+    process). XOR các khóa của tập POI = chữ ký tập hợp, cập nhật O(1) khi
+    thêm/bớt một POI.
+    """
+    z = (poi_id + 0x9E3779B97F4A7C15) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
 class Individual:
     """
     Represents a single solution (chromosome) in the GA population.
     A route is an ordered list of POI objects: [Depot, POI_a, POI_b, ..., Depot].
+
+    Chuyến đi nhiều ngày (m tour) dùng biểu diễn "giant tour": các ngày nối
+    tiếp nhau trong CÙNG một route, ngăn cách bởi m−1 lần lặp lại Depot xuất
+    phát ở interior (separator = về depot cuối ngày d, xuất phát ngày d+1):
+        [Depot, a, b, Depot, c, d, e, Depot, f, Depot]     (m = 3)
+    Mỗi POI xuất hiện tối đa một lần → các tour dùng chung tập đã ghé; toán
+    tử hoán vị interior (2-opt, swap, Or-opt, chèn) tự dời POI giữa các tour.
+
+    Bên cạnh route, cá thể giữ hai bộ đệm dẫn xuất từ route:
+      • Lịch trình (arrival / wait / start / latest_start / route_cost) do
+        `schedule.compute_schedule()` điền → kiểm tra chèn/xóa POI trong O(1).
+      • Prefix cache (prefix_time / prefix_score / ...) do
+        `delta.compute_prefix()` điền → delta evaluation cho 2-opt/swap/...
+    Gán route mới (hoặc sửa route tại chỗ rồi gán lại chính list đó, như
+    schedule.insert_poi/remove_poi và các toán tử đột biến) sẽ đánh dấu các
+    bộ đệm hết hạn.
+
+    Dạng nén của route (tính lười, giữ tới khi route đổi):
+      • ids                – dãy POI id dạng array('H') (2 byte/gen; 'I' nếu
+                             id ≥ 65536) → đóng gói quần thể cho evaluate
+                             vector hóa, trao đổi di cư, log.
+      • set_signature      – Zobrist hash của tập POI id interior, không
+                             phụ thuộc thứ tự; insert_poi/remove_poi cập nhật
+                             tăng dần bằng XOR (`toggle_visit`).
+      • sequence_signature – hash của dãy POI id (phân biệt thứ tự).
+
+    Lớp dùng __slots__ (không có __dict__ mỗi cá thể). Khi pickle chỉ route
+    và các thành phần fitness được gửi đi; lịch trình / prefix cache được
+    dựng lại khi cần ở process nhận.
     """
 
+    __slots__ = (
+        '_route', '_ids', '_set_signature', '_sequence_signature',
+        'fitness', 'total_score', 'total_cost', 'total_time', 'total_wait',
+        'schedule_valid', 'arrival', 'wait', 'start', 'latest_start',
+        'route_cost', 'tw_violations',
+        'prefix_valid', 'prefix_time', 'prefix_score', 'prefix_cost', 'prefix_penalty',
+        'local_optimum',
+    )
+
+    # Thành phần fitness (do calculate_fitness / evaluate_population điền)
+    FITNESS_FIELDS = ('fitness', 'total_score', 'total_cost', 'total_time', 'total_wait')
+
     def __init__(self, route: list[POI] = None):
         self.route: list[POI] = route if route is not None else []
         self.fitness: float = 0.0
@@ -36,9 +178,111 @@ class Individual:
         self.total_time: float = 0.0
         self.total_wait: float = 0.0   # Tổng thời gian chờ tại các POI
 
+        # ── Lịch trình (Forward Time Slack) ───────────────────────────────
+        self.arrival: list[float] = []
+        self.wait: list[float] = []
+        self.start: list[float] = []
+        self.latest_start: list[float] = []
+        self.route_cost: float = 0.0
+        self.tw_violations: int = 0
+
+        # ── Prefix cache (Delta Evaluation) ───────────────────────────────
+        self.prefix_time: list[float] = []
+        self.prefix_score: list[float] = []
+        self.prefix_cost: list[float] = []
+        self.prefix_penalty: list[float] = []
+
+    @property
+    def route(self) -> list[POI]:
+        return self._route
+
+    @route.setter
+    def route(self, value: list[POI]) -> None:
+        self._route = value
+        self.schedule_valid = False
+        self.prefix_valid = False
+        self.local_optimum = False   # Local search chưa chạy trên route này
+        self._ids: Optional[array] = None
+        self._set_signature: Optional[int] = None
+        self._sequence_signature: Optional[int] = None
+
+    @property
+    def ids(self) -> array:
+        """POI ids of the route as a compact array('H') (array('I') for ids ≥ 65536)."""
+        if self._ids is None:
+            ids = [p.id for p in self._route]
+            try:
+                self._ids = array('H', ids)
+            except OverflowError:
+                self._ids = array('I', ids)
+        return self._ids
+
+    @property
+    def set_signature(self) -> int:
+        if self._set_signature is None:
+            sig = 0
+            ids = self.ids
+            for k in range(1, len(ids) - 1):
+                sig ^= zobrist_key(ids[k])
+            self._set_signature = sig
+        return self._set_signature
+
+    @property
+    def sequence_signature(self) -> int:
+        if self._sequence_signature is None:
+            self._sequence_signature = hash(self.ids[1:-1].tobytes())
+        return self._sequence_signature
+
+    def signature(self, mode: str = 'set') -> int:
+        """Route signature for diversity checks: 'set' (POI set) or 'sequence' (order)."""
+        return self.sequence_signature if mode == 'sequence' else self.set_signature
+
+    def toggle_visit(self, poi: POI) -> None:
+        """Cập nhật chữ ký sau khi route (sửa tại chỗ) thêm hoặc bớt `poi`."""
+        if self._set_signature is not None:
+            self._set_signature ^= zobrist_key(poi.id)
+        self._sequence_signature = None
+        self._ids = None
+
+    def tours(self) -> list[list[POI]]:
+        """POIs of each day tour (interior split at the separators)."""
+        depot_id = self._route[0].id
+        tours: list[list[POI]] = [[]]
+        for p in self._route[1:-1]:
+            if p.id == depot_id:
+                tours.append([])
+            else:
+                tours[-1].append(p)
+        return tours
+
+    def copy(self) -> 'Individual':
+        """
+        Independent copy (own route list) with the same fitness fields and
+        prefix cache; the schedule is rebuilt lazily.
+        """
+        twin = _restore_individual(list(self._route),
+                                   tuple(getattr(self, f) for f in self.FITNESS_FIELDS))
+        if self.prefix_valid:
+            # compute_prefix luôn gán list mới (không sửa tại chỗ) → dùng chung được
+            twin.prefix_time, twin.prefix_score = self.prefix_time, self.prefix_score
+            twin.prefix_cost, twin.prefix_penalty = self.prefix_cost, self.prefix_penalty
+            twin.prefix_valid = True
+        return twin
+
+    # ── Pickle: route + thành phần fitness, bỏ các bộ đệm dẫn xuất ───────────
+    def __reduce__(self):
+        return (_restore_individual,
+                (self._route, tuple(getattr(self, f) for f in self.FITNESS_FIELDS)))
+
     def __repr__(self):
-        ids = [p.id for p in self.route]
-        return f"Individual(fitness={self.fitness:.2f}, route_ids={ids})"
+        return f"Individual(fitness={self.fitness:.2f}, route_ids={self.ids.tolist()})"
 
     def __len__(self):
         return len(self.route)
+
+
+def _restore_individual(route: list[POI], fitness: tuple) -> Individual:
+    ind = Individual(route)
+    for name, value in zip(Individual.FITNESS_FIELDS, fitness):
+        setattr(ind, name, value)
+    return ind
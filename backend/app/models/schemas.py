@@ -1,3 +1,6 @@
+from datetime import datetime
+from enum import Enum
+from functools import cached_property
 from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import Dict, List, Optional
 
@@ -5,6 +8,7 @@ from typing import Dict, List, Optional
 #  Hằng số cấu hình
 # =============================================================================
 MIN_TOUR_DURATION_HOURS = 1.0   # Tối thiểu 1 giờ để lập lịch trình
+MAX_TRIP_DAYS = 7               # Số ngày (tour) tối đa trong một lời giải
 
 
 # =============================================================================
@@ -52,6 +56,14 @@ class UserPreferences(BaseModel):
     start_time: float = Field(8.0, description="Thời gian bắt đầu chuyến đi (giờ, VD: 8.0 = 8:00)")
     end_time: float = Field(17.0, description="Thời gian kết thúc chuyến đi (giờ, VD: 17.0 = 17:00)")
     start_node_id: int = Field(..., description="ID điểm xuất phát (depot), thường là 0")
+    end_node_id: Optional[int] = Field(
+        None,
+        description=(
+            "ID điểm kết thúc chuyến đi (VD: khách sạn → sân bay). Bỏ trống = quay về "
+            "start_node_id. Với chuyến đi nhiều ngày, các ngày trước kết thúc tại "
+            "start_node_id; chỉ ngày cuối kết thúc tại end_node_id."
+        ),
+    )
     interests: Dict[str, int] = Field(
         ...,
         description=(
@@ -64,6 +76,35 @@ class UserPreferences(BaseModel):
         )
     )
 
+    dataset: Optional[str] = Field(
+        None,
+        pattern=r'^[A-Za-z0-9][A-Za-z0-9_.-]*$',
+        description=(
+            "Tên bộ dữ liệu POI (VD: C101, R101, RC101 — xem GET /api/datasets). "
+            "Bỏ trống = dataset mặc định của server."
+        ),
+    )
+
+    days: int = Field(
+        1,
+        ge=1,
+        le=MAX_TRIP_DAYS,
+        description=(
+            "Số ngày của chuyến đi (Team Orienteering: m tour). Mỗi ngày là một tour "
+            "từ depot về depot trong khung start_time → end_time; các ngày dùng chung "
+            "ngân sách và không ghé lại POI đã đi. Mặc định 1."
+        ),
+    )
+
+    time_budget_ms: Optional[float] = Field(
+        None,
+        gt=0,
+        description=(
+            "Giới hạn thời gian giải (mili giây). Khi hết giờ, thuật toán dừng và trả về "
+            "lộ trình tốt nhất tìm được tới lúc đó. Bỏ trống = chạy tới khi hội tụ."
+        ),
+    )
+
     # ─────────────────────────────────────────────────────────────────────────
     #  Field Validators
     # ─────────────────────────────────────────────────────────────────────────
@@ -143,6 +184,11 @@ class UserPreferences(BaseModel):
     #  User nhập giờ (8.0 = 8AM, 17.0 = 5PM) → cần nhân 60 để khớp đơn vị.
     # ─────────────────────────────────────────────────────────────────────────
 
+    @property
+    def end_node(self) -> int:
+        """ID điểm kết thúc thực tế (end_node_id, mặc định = start_node_id)."""
+        return self.start_node_id if self.end_node_id is None else self.end_node_id
+
     @property
     def start_time_minutes(self) -> float:
         """Thời gian bắt đầu quy đổi sang phút (Solomon time units)."""
@@ -153,10 +199,11 @@ class UserPreferences(BaseModel):
         """Thời gian kết thúc quy đổi sang phút (Solomon time units)."""
         return self.end_time * 60.0
 
-    @property
+    @cached_property
     def interest_weights(self) -> Dict[str, float]:
         """
         Chuyển đổi số sao → trọng số float ĐÃ CHUẨN HÓA để thuật toán sử dụng.
+        Tính 1 lần cho mỗi request (cached) vì GA tra cứu hàng nghìn lần.
 
         ★ NORMALIZATION (Edge Case 2) ★
           Khi tất cả category có cùng số sao (VD: toàn bộ 1★ hoặc toàn bộ 5★),
@@ -183,7 +230,8 @@ class UserPreferences(BaseModel):
 # Dữ liệu đầu ra
 class ItineraryItem(BaseModel):
     """Thông tin một điểm tham quan trong lộ trình."""
-    order: int = Field(..., description="Thứ tự trong lộ trình (bắt đầu từ 1)")
+    day: int = Field(1, description="Ngày (tour) chứa điểm này, bắt đầu từ 1")
+    order: int = Field(..., description="Thứ tự trong tour của ngày (bắt đầu từ 1)")
     id: int = Field(..., description="ID điểm tham quan")
     name: str = Field(..., description="Tên điểm tham quan")
     category: Optional[str] = Field(None, description="Loại điểm tham quan (history_culture, nature_parks, food_drink, shopping, entertainment, depot)")
@@ -197,11 +245,51 @@ class ItineraryItem(BaseModel):
     score: float = Field(..., description="Điểm đạt được tại điểm tham quan (đã tính trọng số sở thích)")
 
 
+class SolverProfile(BaseModel):
+    """Thời gian / số lần gọi từng pha của HGA (chỉ trả về khi `?debug=true`)."""
+    timings_ms: Dict[str, float] = Field(..., description="Tổng thời gian mỗi pha (ms); init đã gồm evaluation ban đầu")
+    calls: Dict[str, int] = Field(..., description="Số lần gọi mỗi pha")
+    counters: Dict[str, int] = Field(..., description="Bộ đếm: fitness_evaluations, generations, duplicates_replaced, ...")
+    request_ms: Optional[Dict[str, float]] = Field(None, description="Thời gian xử lý request phía API (ms): validate, cache, solve, total")
+
+
 class OptimizationResponse(BaseModel):
     """Kết quả tối ưu hóa lộ trình du lịch."""
     total_score: float = Field(..., description="Tổng điểm đạt được của toàn bộ lộ trình")
     total_cost: float = Field(..., description="Tổng chi phí chuyến đi (VND)")
     total_distance: float = Field(..., description="Tổng quãng đường di chuyển (đơn vị khoảng cách)")
-    total_duration: float = Field(..., description="Tổng thời gian chuyến đi (giờ)")
-    route: List[ItineraryItem] = Field(..., description="Danh sách các điểm tham quan theo thứ tự (bao gồm Depot đầu và cuối)")
+    total_duration: float = Field(..., description="Tổng thời gian chuyến đi (giờ, cộng dồn mọi ngày)")
+    route: List[ItineraryItem] = Field(..., description="Danh sách các điểm tham quan theo thứ tự (bao gồm Depot đầu và cuối của mỗi ngày)")
     execution_time: float = Field(..., description="Thời gian chạy thuật toán (giây)")
+    profile: Optional[SolverProfile] = Field(None, description="Profiling theo pha (chỉ khi `?debug=true`)")
+
+    def without_profile(self) -> 'OptimizationResponse':
+        """Bản sao không kèm profile (mặc định của API; profile chỉ trả về khi debug)."""
+        return self if self.profile is None else self.model_copy(update={"profile": None})
+
+
+# Job bất đồng bộ (POST /api/jobs)
+
+
+class JobStatus(str, Enum):
+    """Trạng thái của một job tối ưu hóa."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    @property
+    def finished(self) -> bool:
+        return self in (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class JobInfo(BaseModel):
+    """Trạng thái và kết quả của một job tối ưu hóa."""
+    id: str = Field(..., description="ID của job")
+    status: JobStatus = Field(..., description="queued | running | succeeded | failed | cancelled")
+    created_at: datetime = Field(..., description="Thời điểm tạo job (UTC)")
+    started_at: Optional[datetime] = Field(None, description="Thời điểm bắt đầu giải (UTC)")
+    finished_at: Optional[datetime] = Field(None, description="Thời điểm kết thúc (UTC)")
+    result: Optional[OptimizationResponse] = Field(None, description="Kết quả khi status = succeeded")
+    error: Optional[str] = Field(None, description="Thông báo lỗi khi status = failed")
@@ -0,0 +1,230 @@
+"""
+Delta Evaluation — chấm điểm nhanh các bước di chuyển cục bộ (local moves).
+
+calculate_fitness mô phỏng lại toàn bộ route. Với các bước 2-opt / swap /
+or-opt / insert / remove, phần route TRƯỚC vị trí thay đổi đầu tiên giữ nguyên, nên
+trạng thái mô phỏng tại đó có thể dùng lại.
+
+Mỗi Individual giữ "prefix cache" (do compute_prefix() điền) — trạng thái
+của calculate_fitness sau khi đã đến và rời vị trí k:
+
+  • prefix_time[k]    – thời điểm rời vị trí k
+  • prefix_score[k]   – tổng điểm các vị trí 0..k-1
+  • prefix_cost[k]    – tổng chi phí các vị trí 0..k-1
+  • prefix_penalty[k] – tổng phạt (chờ + trễ giờ) tại các vị trí 1..k
+
+Một bước di chuyển có vị trí thay đổi đầu tiên i chỉ cần mô phỏng tiếp từ
+trạng thái i-1 trên phần đuôi mới: O(n − i) thay vì O(n), và vì thứ tự cộng
+dồn giống hệt calculate_fitness nên kết quả trùng khớp từng bit với việc
+chấm lại toàn bộ route mới (kể cả phạt về trễ tại separator của chuyến đi
+nhiều ngày, đã gộp vào prefix_penalty).
+"""
+
+from itertools import chain
+from typing import Iterable, Sequence
+
+from app.models.domain import POI, Individual
+from app.models.schemas import UserPreferences
+from app.services.algorithm.fitness import (
+    DistanceMatrix,
+    PENALTY_BUDGET,
+    PENALTY_LATE_ARRIVAL,
+    PENALTY_LATE_RETURN,
+    PENALTY_WAIT,
+)
+
+
+# =============================================================================
+#  Prefix cache
+# =============================================================================
+
+def compute_prefix(ind: Individual, user_prefs: UserPreferences,
+                   dist: DistanceMatrix) -> float:
+    """
+    Full evaluation that also records the prefix cache.
+    Sets the same fields as calculate_fitness and returns the fitness.
+    """
+    route = ind.route
+    n = len(route)
+    rows = dist.rows
+    weights = user_prefs.interest_weights
+
+    times = [0.0] * n
+    scores = [0.0] * n
+    costs = [0.0] * n
+    penalties = [0.0] * n
+
+    start_time = user_prefs.start_time_minutes
+    end_time_limit = user_prefs.end_time_minutes
+    current_time = start_time
+    total_score = total_cost = total_wait = penalty = 0.0
+    if n:
+        times[0] = current_time
+        separator = route[0].id
+
+    for i in range(n - 1):
+        curr = route[i]
+        nxt = route[i + 1]
+
+        total_score += curr.base_score * weights.get(curr.category, 0.0)
+        total_cost += curr.price
+
+        arrival = current_time + rows[curr.id][nxt.id]
+        if arrival < nxt.open_time:
+            wait = nxt.open_time - arrival
+            total_wait += wait
+            penalty += wait * PENALTY_WAIT
+            arrival = nxt.open_time
+        if arrival > nxt.close_time:
+            penalty += (arrival - nxt.close_time) * PENALTY_LATE_ARRIVAL
+        current_time = arrival + nxt.duration
+        if nxt.id == separator and i + 1 < n - 1:
+            if current_time > end_time_limit:
+                penalty += (current_time - end_time_limit) * PENALTY_LATE_RETURN
+            current_time = start_time
+
+        times[i + 1] = current_time
+        scores[i + 1] = total_score
+        costs[i + 1] = total_cost
+        penalties[i + 1] = penalty
+
+    ind.prefix_time = times
+    ind.prefix_score = scores
+    ind.prefix_cost = costs
+    ind.prefix_penalty = penalties
+    ind.prefix_valid = True
+
+    fitness = _finalize(total_score, total_cost, current_time, penalty, user_prefs)
+    ind.fitness = fitness
+    ind.total_score = total_score
+    ind.total_cost = total_cost
+    ind.total_time = current_time
+    ind.total_wait = total_wait
+    return fitness
+
+
+def ensure_prefix(ind: Individual, user_prefs: UserPreferences,
+                  dist: DistanceMatrix) -> None:
+    """Build the prefix cache only if the route changed since the last build."""
+    if not ind.prefix_valid:
+        compute_prefix(ind, user_prefs, dist)
+
+
+def _finalize(total_score: float, total_cost: float, current_time: float,
+              penalty: float, user_prefs: UserPreferences) -> float:
+    if total_cost > user_prefs.budget:
+        penalty += (total_cost - user_prefs.budget) * PENALTY_BUDGET
+    end_time_limit = user_prefs.end_time_minutes
+    if current_time > end_time_limit:
+        penalty += (current_time - end_time_limit) * PENALTY_LATE_RETURN
+    return total_score - penalty
+
+
+def _suffix_fitness(ind: Individual, i: int, tail: Iterable[POI], size: int,
+                    user_prefs: UserPreferences, dist: DistanceMatrix) -> float:
+    """
+    Fitness of route[:i] + tail (`size` POIs), resuming from the cached state
+    at i-1. Requires a valid prefix cache and 1 ≤ i ≤ len(route).
+    """
+    rows = dist.rows
+    weights = user_prefs.interest_weights
+    k = i - 1
+    current_time = ind.prefix_time[k]
+    total_score = ind.prefix_score[k]
+    total_cost = ind.prefix_cost[k]
+    penalty = ind.prefix_penalty[k]
+
+    curr = ind.route[k]
+    separator = ind.route[0].id
+    last = size - 1
+    for j, nxt in enumerate(tail):
+        total_score += curr.base_score * weights.get(curr.category, 0.0)
+        total_cost += curr.price
+
+        arrival = current_time + rows[curr.id][nxt.id]
+        if arrival < nxt.open_time:
+            penalty += (nxt.open_time - arrival) * PENALTY_WAIT
+            arrival = nxt.open_time
+        if arrival > nxt.close_time:
+            penalty += (arrival - nxt.close_time) * PENALTY_LATE_ARRIVAL
+        current_time = arrival + nxt.duration
+        if nxt.id == separator and j < last:
+            end_time_limit = user_prefs.end_time_minutes
+            if current_time > end_time_limit:
+                penalty += (current_time - end_time_limit) * PENALTY_LATE_RETURN
+            current_time = user_prefs.start_time_minutes
+        curr = nxt
+
+    return _finalize(total_score, total_cost, current_time, penalty, user_prefs)
+
+
+# =============================================================================
+#  Move deltas  (new_fitness − current fitness; route is NOT modified)
+# =============================================================================
+
+def delta_tail(ind: Individual, i: int, tail: Sequence[POI],
+               user_prefs: UserPreferences, dist: DistanceMatrix) -> float:
+    """Generic move: replace route[i:] by `tail` (1 ≤ i ≤ len(route))."""
+    ensure_prefix(ind, user_prefs, dist)
+    return _suffix_fitness(ind, i, tail, len(tail), user_prefs, dist) - ind.fitness
+
+
+def delta_two_opt(ind: Individual, i: int, j: int,
+                  user_prefs: UserPreferences, dist: DistanceMatrix) -> float:
+    """Reverse route[i..j] (1 ≤ i < j ≤ len-2)."""
+    ensure_prefix(ind, user_prefs, dist)
+    route = ind.route
+    tail = route[i:j + 1][::-1] + route[j + 1:]
+    return _suffix_fitness(ind, i, tail, len(tail), user_prefs, dist) - ind.fitness
+
+
+def delta_swap(ind: Individual, i: int, j: int,
+               user_prefs: UserPreferences, dist: DistanceMatrix) -> float:
+    """Exchange route[i] and route[j] (interior positions)."""
+    if i > j:
+        i, j = j, i
+    ensure_prefix(ind, user_prefs, dist)
+    tail = ind.route[i:]
+    tail[0], tail[j - i] = tail[j - i], tail[0]
+    return _suffix_fitness(ind, i, tail, len(tail), user_prefs, dist) - ind.fitness
+
+
+def delta_or_opt(ind: Individual, i: int, seg_len: int, at: int,
+                 user_prefs: UserPreferences, dist: DistanceMatrix) -> float:
+    """
+    Move route[i:i+seg_len] to position `at` of the route without it
+    (at ≠ i); the tail is streamed from route indices, not copied.
+    """
+    ensure_prefix(ind, user_prefs, dist)
+    route = ind.route
+    n = len(route)
+    end = i + seg_len
+    if at < i:
+        first, order = at, chain(range(i, end), range(at, i), range(end, n))
+    else:
+        first, order = i, chain(range(end, at + seg_len), range(i, end), range(at + seg_len, n))
+    tail = map(route.__getitem__, order)
+    return _suffix_fitness(ind, first, tail, n - first, user_prefs, dist) - ind.fitness
+
+
+def or_opt_route(route: Sequence[POI], i: int, seg_len: int, at: int) -> list[POI]:
+    """The route scored by delta_or_opt(ind, i, seg_len, at)."""
+    segment = route[i:i + seg_len]
+    rest = route[:i] + route[i + seg_len:]
+    return rest[:at] + segment + rest[at:]
+
+
+def delta_insert(ind: Individual, pos: int, poi: POI,
+                 user_prefs: UserPreferences, dist: DistanceMatrix) -> float:
+    """Insert `poi` before route[pos] (1 ≤ pos ≤ len-1)."""
+    ensure_prefix(ind, user_prefs, dist)
+    tail = [poi] + ind.route[pos:]
+    return _suffix_fitness(ind, pos, tail, len(tail), user_prefs, dist) - ind.fitness
+
+
+def delta_remove(ind: Individual, pos: int,
+                 user_prefs: UserPreferences, dist: DistanceMatrix) -> float:
+    """Remove route[pos] (interior position)."""
+    ensure_prefix(ind, user_prefs, dist)
+    tail = ind.route[pos + 1:]
+    return _suffix_fitness(ind, pos, tail, len(tail), user_prefs, dist) - ind.fitness
@@ -1,22 +1,268 @@
+import logging
 import math
-from typing import List, Optional
-from app.models.domain import POI
+import sys
+import threading
+from collections import OrderedDict
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from app.models.domain import POI, dataset_key
 from app.models.schemas import UserPreferences
 
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+#  POI COLUMNS  (array-backed attributes for vectorized evaluation)
+# =============================================================================
+#
+#  Các thuộc tính của POI được lưu thành từng cột NumPy, đánh chỉ số theo
+#  POI id (0..N-1). Nhờ vậy việc đánh giá cả quần thể chỉ cần fancy-indexing
+#  thay vì truy cập thuộc tính từng object POI.
+#
+# =============================================================================
+
+class PoiColumns:
+    """
+    Column store of POI attributes, indexed by POI id.
+
+    `category` holds an index into `categories`; per-request interest
+    weights are mapped onto it with `weight_vector()`.
+    """
+
+    def __init__(self, pois: List[POI]):
+        sorted_pois = sorted(pois, key=lambda p: p.id)
+        self.size = len(sorted_pois)
+        self.categories: list[str] = sorted({p.category for p in sorted_pois})
+        cat_index = {c: k for k, c in enumerate(self.categories)}
+
+        def column(attr: str) -> np.ndarray:
+            return np.array([getattr(p, attr) for p in sorted_pois], dtype=np.float64)
+
+        self.x = column('x')
+        self.y = column('y')
+        self.open_time = column('open_time')
+        self.close_time = column('close_time')
+        self.duration = column('duration')
+        self.price = column('price')
+        self.base_score = column('base_score')
+        self.category = np.array(
+            [cat_index[p.category] for p in sorted_pois], dtype=np.intp
+        )
+
+    def weight_vector(self, user_prefs: UserPreferences) -> np.ndarray:
+        """Interest weight per category index (0.0 for unknown, e.g. depot)."""
+        weights = user_prefs.interest_weights
+        return np.array([weights.get(c, 0.0) for c in self.categories],
+                        dtype=np.float64)
+
+    def weighted_scores(self, user_prefs: UserPreferences) -> np.ndarray:
+        """base_score × interest_weight for every POI id."""
+        return self.base_score * self.weight_vector(user_prefs)[self.category]
+
 
 # =============================================================================
-#  DISTANCE MATRIX  (O(1) lookup – pre-computed at startup)
+#  DISTANCE MATRIX  (O(1) lookup – pre-computed once per dataset)
 # =============================================================================
 #
 #  Thay vì gọi math.sqrt() hàng triệu lần trong quá trình GA, ta tính
-#  trước ma trận khoảng cách N×N một lần duy nhất khi load dữ liệu.
+#  trước ma trận khoảng cách N×N một lần duy nhất cho mỗi bộ dữ liệu.
 #  Mọi tra cứu sau đó chỉ mất O(1) (truy cập mảng 2D).
 #  Với 101 POI → ma trận 101×101 = ~10 201 giá trị float ≈ 80 KB RAM.
 #
+#  Ma trận được đóng gói trong DistanceMatrix:
+#    • Bất biến (ndarray read-only) → dùng chung an toàn giữa các thread.
+#    • Cache theo "dataset key" (dấu vân tay nội dung POI) → mỗi request
+#      chỉ tra cache, không dựng lại O(N²).
+#    • Có thể đặt vào shared memory để nhiều worker process cùng đọc.
+#      `rows` (list-of-lists cho tra cứu vô hướng) chỉ được dựng khi cần;
+#      ma trận attach từ shared memory dùng _LazyRows → worker chỉ giữ bản
+#      list của các hàng thực sự đọc. Lời giải thực tế đọc ma trận CON của
+#      request (reduction.py, copy n_sub² riêng mỗi bài toán con), còn ma trận
+#      đầy đủ chỉ được đọc qua ndarray → không có bản sao O(N²) riêng mỗi
+#      worker. Đổi lại: tra cứu qua _LazyRows chậm hơn list thuần.
+#    • Được truyền TƯỜNG MINH vào get_travel_time / check_constraints /
+#      calculate_fitness thay vì dùng biến global của module.
+#
 # =============================================================================
 
-# Module-level distance matrix – initialized by build_distance_matrix()
-_DIST_MATRIX: Optional[list[list[float]]] = None
+_EAGER_ROWS_MAX = 1024     # N lớn hơn → `rows` chuyển hàng sang list khi cần (LRU)
+_ROW_CACHE_ROWS = 2048     # Số hàng giữ trong _LazyRows
+_NEIGHBOR_CHUNK_ROWS = 1024
+
+
+class _LazyRows:
+    """
+    `rows` of a large matrix: row i is converted to a Python list on first
+    access and kept in a bounded LRU, instead of materializing N² floats.
+    """
+
+    def __init__(self, array, capacity: int = _ROW_CACHE_ROWS):
+        self._array = array
+        self._capacity = capacity
+        self._rows: OrderedDict[int, list[float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._array)
+
+    def __getitem__(self, i: int) -> list[float]:
+        row = self._rows.get(i)
+        if row is None:
+            row = np.asarray(self._array[i], dtype=np.float64).tolist()
+            self._rows[i] = row
+            if len(self._rows) > self._capacity:
+                self._rows.popitem(last=False)
+        else:
+            self._rows.move_to_end(i)
+        return row
+
+
+class SharedMatrixHandle(NamedTuple):
+    """Picklable reference to a DistanceMatrix placed in shared memory."""
+    key: str
+    shm_name: str
+    size: int
+
+
+class DistanceMatrix:
+    """
+    Immutable N×N travel-time matrix (plus POI columns) for one dataset.
+
+    `array` is the read-only NumPy matrix used by vectorized code (or a
+    memory-mapped / sparse array-like from matrix_store, in which case
+    `path` names the backing file); `rows` is a list-of-lists view for fast
+    scalar lookups, built on first access — a full copy when
+    N ≤ _EAGER_ROWS_MAX, otherwise (and always for a matrix attached from
+    shared memory) converted per row on demand by _LazyRows.
+    """
+
+    def __init__(self, key: str, array: np.ndarray, columns: PoiColumns,
+                 shm: Optional[shared_memory.SharedMemory] = None,
+                 path: Optional[str] = None):
+        if isinstance(array, np.ndarray) and array.flags.writeable:
+            array.setflags(write=False)
+        self.key = key
+        self.size = array.shape[0]
+        self.array = array
+        self.columns = columns
+        self.path = path
+        self._shm = shm
+        self._attached = shm is not None
+        self._rows = None
+        self._neighbors: dict[int, list[list[int]]] = {}
+
+    @property
+    def rows(self):
+        rows = self._rows
+        if rows is None:
+            if self.size <= _EAGER_ROWS_MAX and not self._attached:
+                rows = self.array.tolist()
+            else:
+                rows = _LazyRows(self.array)
+            self._rows = rows
+        return rows
+
+    @classmethod
+    def build(cls, pois: List[POI], key: Optional[str] = None) -> 'DistanceMatrix':
+        """Compute the Euclidean matrix with NumPy broadcasting."""
+        columns = PoiColumns(pois)
+        dx = columns.x[:, None] - columns.x[None, :]
+        dy = columns.y[:, None] - columns.y[None, :]
+        matrix = np.sqrt(dx * dx + dy * dy)
+        return cls(key or dataset_key(pois), matrix, columns)
+
+    def travel_time(self, i: int, j: int) -> float:
+        return self.rows[i][j]
+
+    def neighbors(self, k: int) -> list[list[int]]:
+        """
+        The k nearest POI ids of every POI (itself excluded), closest first.
+        Computed once per k and cached; used to keep local search sub-quadratic.
+        """
+        k = min(k, self.size - 1)
+        cached = self._neighbors.get(k)
+        if cached is None:
+            cached = []
+            for lo in range(0, self.size, _NEIGHBOR_CHUNK_ROWS):
+                hi = min(lo + _NEIGHBOR_CHUNK_ROWS, self.size)
+                others = np.array(self.array[lo:hi], dtype=np.float64)
+                others[np.arange(hi - lo), np.arange(lo, hi)] = np.inf
+                nearest = np.argpartition(others, k - 1, axis=1)[:, :k] if k > 0 \
+                    else np.empty((hi - lo, 0), dtype=np.intp)
+                order = np.take_along_axis(others, nearest, axis=1).argsort(axis=1, kind='stable')
+                cached.extend(np.take_along_axis(nearest, order, axis=1).tolist())
+            self._neighbors[k] = cached
+        return cached
+
+    # ── Shared memory (cross-process, read-only) ─────────────────────────────
+    def share(self) -> Optional[SharedMatrixHandle]:
+        """
+        Copy the matrix into a shared-memory block (once) and return a
+        picklable handle that worker processes can `attach()` to.
+
+        File-backed matrices return None: workers map the same file
+        themselves (the OS page cache is already shared).
+        """
+        if self.path is not None:
+            return None
+        if self._shm is None:
+            shm = shared_memory.SharedMemory(create=True, size=self.array.nbytes)
+            shared = np.ndarray(self.array.shape, dtype=np.float64, buffer=shm.buf)
+            shared[:] = self.array
+            shared.setflags(write=False)
+            self.array = shared
+            self._shm = shm
+        return SharedMatrixHandle(self.key, self._shm.name, self.size)
+
+    @classmethod
+    def attach(cls, handle: SharedMatrixHandle, pois: List[POI]) -> 'DistanceMatrix':
+        """Map a matrix published by `share()` in another process."""
+        shm = _attach_untracked(handle.shm_name)
+        array = np.ndarray((handle.size, handle.size), dtype=np.float64, buffer=shm.buf)
+        return cls(handle.key, array, PoiColumns(pois), shm=shm)
+
+    def release(self) -> None:
+        """Detach from (and, in the owning process, unlink) shared memory."""
+        if self._shm is None:
+            return
+        self.array = np.array(self.array)
+        self.array.setflags(write=False)
+        self._rows = None            # _LazyRows có thể còn trỏ vào vùng shm
+        self._shm.close()
+        if not self._attached:       # Chỉ process tạo vùng nhớ mới unlink
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._attached = False
+        self._shm = None
+
+
+_ATTACH_LOCK = threading.Lock()
+
+
+def _attach_untracked(name: str) -> shared_memory.SharedMemory:
+    """
+    Open an existing segment WITHOUT registering it with the resource
+    tracker: only the creating process (share() → release()) owns and
+    unlinks it. Unregistering after the fact is wrong on a tracker shared
+    with the parent (spawn) — it drops the parent's own registration.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # ≤ 3.12: SharedMemory(name=...) luôn gọi resource_tracker.register
+    with _ATTACH_LOCK:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+_MATRIX_CACHE: dict[str, DistanceMatrix] = {}
+_MATRIX_LOCK = threading.Lock()
 
 
 def euclidean_distance(p1: POI, p2: POI) -> float:
@@ -24,63 +270,58 @@ def euclidean_distance(p1: POI, p2: POI) -> float:
     return math.sqrt((p1.x - p2.x) ** 2 + (p1.y - p2.y) ** 2)
 
 
-def build_distance_matrix(pois: List[POI]) -> list[list[float]]:
+def build_distance_matrix(pois: List[POI], key: Optional[str] = None) -> DistanceMatrix:
     """
-    Pre-compute the full N×N Euclidean distance matrix.
+    Return the DistanceMatrix for `pois`, building it on first use.
 
-    Must be called ONCE at startup (after loading POIs).
-    Subsequent calls to get_travel_time() will use O(1) lookups.
+    Matrices are cached by dataset key, so only the first request for a
+    dataset pays the O(N²) construction; later calls are a dict lookup.
 
     Parameters
     ----------
     pois : list[POI]
         All POIs (including depot). POI ids must be 0..N-1.
-
-    Returns
-    -------
-    list[list[float]]
-        2D matrix where matrix[i][j] = Euclidean distance from POI i to POI j.
+    key : str, optional
+        Dataset identity; defaults to a content fingerprint of `pois`.
     """
-    global _DIST_MATRIX
-    n = len(pois)
-
-    # Sort by id to guarantee matrix[poi.id] maps correctly
-    sorted_pois = sorted(pois, key=lambda p: p.id)
+    key = key or dataset_key(pois)
+    matrix = _MATRIX_CACHE.get(key)
+    if matrix is not None:
+        return matrix
+
+    with _MATRIX_LOCK:
+        matrix = _MATRIX_CACHE.get(key)
+        if matrix is None:
+            matrix = DistanceMatrix.build(pois, key)
+            _MATRIX_CACHE[key] = matrix
+            n = matrix.size
+            logger.info("Built %d×%d distance matrix (%d entries)", n, n, n * n)
+    return matrix
 
-    matrix = [[0.0] * n for _ in range(n)]
-    for i in range(n):
-        pi = sorted_pois[i]
-        for j in range(i + 1, n):
-            pj = sorted_pois[j]
-            d = math.sqrt((pi.x - pj.x) ** 2 + (pi.y - pj.y) ** 2)
-            matrix[i][j] = d
-            matrix[j][i] = d  # Symmetric
 
-    _DIST_MATRIX = matrix
-    print(f"[DistMatrix] Built {n}×{n} distance matrix ({n*n} entries)")
-    return matrix
+def register_distance_matrix(matrix: DistanceMatrix) -> None:
+    """Install an externally built matrix (e.g. attached from shared memory)."""
+    with _MATRIX_LOCK:
+        _MATRIX_CACHE[matrix.key] = matrix
 
 
-def get_travel_time(p1: POI, p2: POI) -> float:
+def get_travel_time(p1: POI, p2: POI, dist: DistanceMatrix) -> float:
     """
     Travel time between two POIs.
     For Solomon benchmarks, travel time == Euclidean distance
     (speed = 1 unit/time-unit).
 
-    Uses pre-computed distance matrix for O(1) lookup.
-    Falls back to direct calculation if matrix is not yet initialized.
+    Uses the pre-computed distance matrix for O(1) lookup.
     """
-    if _DIST_MATRIX is not None:
-        return _DIST_MATRIX[p1.id][p2.id]
-    # Fallback (should not happen in normal flow)
-    return euclidean_distance(p1, p2)
+    return dist.rows[p1.id][p2.id]
 
 
 # =============================================================================
 #  CONSTRAINT CHECKING  (TOPTW feasibility)
 # =============================================================================
 
-def check_constraints(route: list[POI], user_prefs: UserPreferences) -> bool:
+def check_constraints(route: list[POI], user_prefs: UserPreferences,
+                      dist: DistanceMatrix) -> bool:
     """
     Validate whether a COMPLETE route [Depot, ..., Depot] satisfies all
     TOPTW constraints:
@@ -88,6 +329,9 @@ def check_constraints(route: list[POI], user_prefs: UserPreferences) -> bool:
       2. Max Tour Time – return to depot before end_time.
       3. Budget        – total price of visited POIs ≤ user_prefs.budget.
 
+    Nhiều ngày: mỗi lần Depot xuất phát lặp lại ở interior (separator) là
+    kết thúc một ngày — ngày tiếp theo rời depot lúc start_time.
+
     ĐƠN VỊ: Mọi phép tính bên trong dùng PHÚT (Solomon time units).
     User input (giờ) được chuyển qua start_time_minutes / end_time_minutes.
 
@@ -98,13 +342,15 @@ def check_constraints(route: list[POI], user_prefs: UserPreferences) -> bool:
 
     current_time = user_prefs.start_time_minutes  # Phút (VD: 8h → 480)
     total_cost = 0.0
+    separator = route[0].id
+    last = len(route) - 1
 
-    for i in range(len(route) - 1):
+    for i in range(last):
         curr = route[i]
         next_p = route[i + 1]
 
         # --- Travel ---
-        travel = get_travel_time(curr, next_p)
+        travel = get_travel_time(curr, next_p, dist)
         arrival = current_time + travel
 
         # --- Time Window ---
@@ -119,6 +365,8 @@ def check_constraints(route: list[POI], user_prefs: UserPreferences) -> bool:
         # --- Service ---
         departure = arrival + next_p.duration
         current_time = departure
+        if next_p.id == separator and i + 1 < last:
+            current_time = user_prefs.start_time_minutes   # Sang ngày mới
 
         # --- Budget ---
         total_cost += next_p.price
@@ -131,7 +379,7 @@ def check_constraints(route: list[POI], user_prefs: UserPreferences) -> bool:
 
 
 def try_add_poi(route: list[POI], candidate: POI,
-                user_prefs: UserPreferences) -> bool:
+                user_prefs: UserPreferences, dist: DistanceMatrix) -> bool:
     """
     Check if `candidate` can be *inserted just before the trailing Depot*
     while keeping the route feasible.
@@ -143,7 +391,7 @@ def try_add_poi(route: list[POI], candidate: POI,
     """
     depot = route[0]  # Depot is always the first element
     test_route = route + [candidate, depot]
-    return check_constraints(test_route, user_prefs)
+    return check_constraints(test_route, user_prefs, dist)
 
 
 # =============================================================================
@@ -173,7 +421,8 @@ PENALTY_BUDGET        =   0.5   # Vượt ngân sách      (ràng buộc mềm)
 PENALTY_WAIT          =   0.2   # Thời gian chờ       (chất lượng trải nghiệm)
 
 
-def calculate_fitness(ind, user_prefs: UserPreferences) -> float:
+def calculate_fitness(ind, user_prefs: UserPreferences,
+                      dist: DistanceMatrix) -> float:
     """
     Evaluate fitness of an Individual.
 
@@ -188,24 +437,32 @@ def calculate_fitness(ind, user_prefs: UserPreferences) -> float:
       • Waiting time           – arrive before open_time        (× 0.2)
         → Ép GA sắp xếp thứ tự POI sao cho đến nơi là vào chơi luôn,
           tránh bắt du khách chờ ngoài cửa.
+
+    Nhiều ngày: tại mỗi separator (Depot ở interior) áp dụng phạt về trễ
+    của ngày đó rồi bắt đầu ngày mới lúc start_time; mọi tour được chấm
+    trong cùng một lượt, ngân sách tính chung.
     """
+    weights = user_prefs.interest_weights  # property → tính 1 lần, không phải mỗi chặng
     current_time = user_prefs.start_time_minutes  # Phút (VD: 8h → 480)
     total_score = 0.0
     total_cost = 0.0
     total_wait = 0.0
     penalty = 0.0
+    end_time_limit = user_prefs.end_time_minutes  # Phút (VD: 17h → 1020)
+    separator = ind.route[0].id
+    last = len(ind.route) - 1
 
-    for i in range(len(ind.route) - 1):
+    for i in range(last):
         curr = ind.route[i]
         next_p = ind.route[i + 1]
 
         # --- Score (skip depot; its category is 'depot') ---
-        w = user_prefs.interest_weights.get(curr.category, 0.0)
+        w = weights.get(curr.category, 0.0)
         total_score += curr.base_score * w
         total_cost += curr.price
 
         # --- Travel ---
-        travel = get_travel_time(curr, next_p)
+        travel = get_travel_time(curr, next_p, dist)
         arrival = current_time + travel
 
         # --- Time Window ---
@@ -223,12 +480,17 @@ def calculate_fitness(ind, user_prefs: UserPreferences) -> float:
         departure = arrival + next_p.duration
         current_time = departure
 
+        # --- Separator: về depot cuối ngày, sang ngày mới ---
+        if next_p.id == separator and i + 1 < last:
+            if current_time > end_time_limit:
+                penalty += (current_time - end_time_limit) * PENALTY_LATE_RETURN
+            current_time = user_prefs.start_time_minutes
+
     # Budget penalty
     if total_cost > user_prefs.budget:
         penalty += (total_cost - user_prefs.budget) * PENALTY_BUDGET
 
     # Late return penalty (check against user end_time in minutes)
-    end_time_limit = user_prefs.end_time_minutes  # Phút (VD: 17h → 1020)
     if current_time > end_time_limit:
         penalty += (current_time - end_time_limit) * PENALTY_LATE_RETURN
 
@@ -238,4 +500,112 @@ def calculate_fitness(ind, user_prefs: UserPreferences) -> float:
     ind.total_time = current_time
     ind.total_wait = total_wait
 
-    return ind.fitness
\ No newline at end of file
+    return ind.fitness
+
+
+def evaluate_population(population: list, user_prefs: UserPreferences,
+                        dist: DistanceMatrix) -> None:
+    """
+    Batched version of `calculate_fitness` for a whole population.
+
+    Routes are packed into a padded (P × L) index array and simulated leg by
+    leg, vectorized across individuals. Accumulation order per route is the
+    same as in `calculate_fitness`, so results are bit-identical; masked-out
+    legs only ever add 0.0. Day separators (multi-day trips) are handled
+    with the same per-leg masks, as are start / end nodes other than the
+    depot (columns of the node replaced by PoiCatalogue.endpoint values).
+    """
+    if not population:
+        return
+
+    cols = dist.columns
+    matrix = dist.array
+    scores = cols.weighted_scores(user_prefs)
+
+    size = len(population)
+    lengths = np.array([len(ind.route) for ind in population], dtype=np.intp)
+    width = max(int(lengths.max()), 2)
+    idx = np.zeros((size, width), dtype=np.intp)
+    for row, ind in enumerate(population):
+        idx[row, :lengths[row]] = ind.ids       # array('H') → buffer protocol
+
+    current_time = np.full(size, user_prefs.start_time_minutes, dtype=np.float64)
+    total_score = np.zeros(size)
+    total_cost = np.zeros(size)
+    total_wait = np.zeros(size)
+    penalty = np.zeros(size)
+    end_time_limit = user_prefs.end_time_minutes
+    multi_day = user_prefs.days > 1
+    depot = idx[:, 0]
+    last = lengths - 1
+
+    # Start / end khác depot (id 0): khung giờ của depot, không điểm / giá /
+    # thời gian phục vụ — như PoiCatalogue.endpoint() trên route object
+    custom_ends = bool(depot.any() or idx[np.arange(size), last].any())
+    horizon_open, horizon_close = cols.open_time[0], cols.close_time[0]
+
+    for k in range(width - 1):
+        active = k < last
+        curr = idx[:, k]
+        nxt = idx[:, k + 1]
+        score_t, price_t = scores[curr], cols.price[curr]
+        open_t, close_t, service_t = cols.open_time[nxt], cols.close_time[nxt], cols.duration[nxt]
+        if custom_ends:
+            leaving_end = (curr == depot) if k else np.ones(size, dtype=bool)
+            score_t = np.where(leaving_end, 0.0, score_t)
+            price_t = np.where(leaving_end, 0.0, price_t)
+            at_end = (nxt == depot) | (k + 1 == last)
+            open_t = np.where(at_end, horizon_open, open_t)
+            close_t = np.where(at_end, horizon_close, close_t)
+            service_t = np.where(at_end, 0.0, service_t)
+
+        # --- Score / Cost of the node being left ---
+        total_score += np.where(active, score_t, 0.0)
+        total_cost += np.where(active, price_t, 0.0)
+
+        # --- Travel ---
+        arrival = current_time + matrix[curr, nxt]
+
+        # --- Time Window ---
+        early = active & (arrival < open_t)
+        wait = open_t - arrival
+        total_wait += np.where(early, wait, 0.0)
+        penalty += np.where(early, wait * PENALTY_WAIT, 0.0)
+        arrival = np.where(early, open_t, arrival)
+
+        late = active & (arrival > close_t)
+        penalty += np.where(late, (arrival - close_t) * PENALTY_LATE_ARRIVAL, 0.0)
+
+        # --- Service ---
+        current_time = np.where(active, arrival + service_t, current_time)
+
+        # --- Separator: về depot cuối ngày, sang ngày mới ---
+        if multi_day:
+            separator = (nxt == depot) & (k + 1 < last)
+            late_day = separator & (current_time > end_time_limit)
+            penalty += np.where(late_day,
+                                (current_time - end_time_limit) * PENALTY_LATE_RETURN, 0.0)
+            current_time = np.where(separator, user_prefs.start_time_minutes, current_time)
+
+    # Budget penalty
+    budget = user_prefs.budget
+    over_budget = total_cost > budget
+    penalty += np.where(over_budget, (total_cost - budget) * PENALTY_BUDGET, 0.0)
+
+    # Late return penalty
+    late_return = current_time > end_time_limit
+    penalty += np.where(late_return,
+                        (current_time - end_time_limit) * PENALTY_LATE_RETURN, 0.0)
+
+    fitness = (total_score - penalty).tolist()
+    total_score = total_score.tolist()
+    total_cost = total_cost.tolist()
+    total_time = current_time.tolist()
+    total_wait = total_wait.tolist()
+
+    for row, ind in enumerate(population):
+        ind.fitness = fitness[row]
+        ind.total_score = total_score[row]
+        ind.total_cost = total_cost[row]
+        ind.total_time = total_time[row]
+        ind.total_wait = total_wait[row]
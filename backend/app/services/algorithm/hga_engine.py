@@ -9,20 +9,33 @@ Luồng chính mỗi thế hệ:
   5. Smart Repair – xóa POI có tỷ lệ Score/Time kém nhất.
   6. Diversity – loại con trùng lặp, thay bằng cá thể random.
   7. Evaluate  – tính fitness cho con mới.
-  8. Replace   – thay thế quần thể, sắp xếp, lặp lại.
+  8. Replace   – thay thế quần thể, sắp xếp.
+  9. Local Search – 2-opt / Or-opt / Swap-in-out trên các elite
+                 (giới hạn thời gian mỗi thế hệ), sắp xếp lại, lặp lại.
 
 Nguyên tắc "Depot-Safe":
   Mọi toán tử GA đều CHỈ thao tác trên "interior" = route[1:-1].
   Depot được gắn lại sau khi xử lý xong.
+
+Trước khi chạy, request được rút gọn thành bài toán con (reduction.py): chỉ
+các POI có thể ghé, đánh lại chỉ số 0..n-1 — mọi toán tử chỉ quét các POI đó.
+
+Chuyến đi nhiều ngày (user_prefs.days = m): route là "giant tour" gồm m tour
+ngăn cách bởi m−1 separator (Depot lặp lại ở interior, xem Individual). Các
+toán tử hoán vị interior nên tự dời POI giữa các ngày; crossover giữ đủ
+separator, repair không bao giờ xóa separator, và mọi tour được chấm điểm
+trong cùng một lượt evaluate.
 """
 
+import logging
 import random
 import time
-from typing import Optional, List
+from itertools import islice
+from typing import Callable, NamedTuple, Optional, List
 
 from app.models.domain import POI, Individual
 from app.models.schemas import UserPreferences, OptimizationResponse, ItineraryItem
-from app.services.data_loader import load_solomon_c101
+from app.services.data_loader import get_catalogue
 from app.services.algorithm.initialization import (
     initialize_population,
     POPULATION_SIZE,
@@ -30,10 +43,23 @@ from app.services.algorithm.initialization import (
 )
 from app.services.algorithm.fitness import (
     calculate_fitness,
-    check_constraints,
+    evaluate_population,
     get_travel_time,
     build_distance_matrix,
 )
+from app.services.algorithm.delta import delta_swap, delta_two_opt
+from app.services.algorithm.local_search import improve_elites
+from app.services.algorithm.profiling import PROFILING_ENABLED, SolverProfiler
+from app.services.algorithm.reduction import reduce_problem
+from app.services.algorithm.schedule import (
+    can_insert,
+    ensure_schedule,
+    insert_poi,
+    is_feasible,
+    remove_poi,
+)
+
+logger = logging.getLogger(__name__)
 
 
 def _format_time(minutes: float) -> str:
@@ -47,45 +73,137 @@ def _format_time(minutes: float) -> str:
     return f"{hours:02d}:{mins:02d}"
 
 
+class GenerationStats(NamedTuple):
+    """Thống kê một thế hệ (log + progress callback)."""
+    generation: int
+    best_fitness: float
+    avg_fitness: float
+    unique_routes: int
+    wait: float
+    stagnation: int
+    duplicates: int
+
+
+# Gọi sau khi khởi tạo (generation 0) và sau mỗi thế hệ; tham số thứ hai là
+# lộ trình best-ever MỚI nếu vừa cải thiện, ngược lại None.
+ProgressCallback = Callable[[GenerationStats, Optional[OptimizationResponse]], None]
+
+
 class HybridGeneticAlgorithm:
+    # ── Tham số solver (mặc định cho mọi instance; có thể ghi đè trên instance) ─
+    population_size = POPULATION_SIZE   # 50
+    mutation_rate   = 0.3
+    mutation_trials = 4                 # Số bước 2-opt/Swap thử (delta evaluation)
+    generations     = 200               # Max cap (early stopping sẽ bảo vệ)
+    stagnation_limit = 15               # Dừng nếu 15 gen không cải thiện
+    improvement_threshold = 1e-4        # Min delta để tính là "cải thiện"
+    elitism_rate    = 2
+    tournament_k    = 3
+    diversity       = 'set'             # Chống trùng: 'set' (cùng tập POI) | 'sequence' (cùng thứ tự)
+    local_search_elites = 2             # Số elite được chạy Local Search mỗi thế hệ
+    local_search_ms = 5.0               # Ngân sách thời gian Local Search / thế hệ (ms)
+    time_budget_ms: Optional[float] = None   # Giới hạn thời gian giải mặc định (ms); None = không giới hạn
+    profiling = PROFILING_ENABLED       # Đo thời gian từng pha (không ảnh hưởng kết quả)
+
+    CONFIG_FIELDS = (
+        'population_size', 'mutation_rate', 'mutation_trials', 'generations',
+        'stagnation_limit', 'improvement_threshold', 'elitism_rate', 'tournament_k',
+        'diversity', 'local_search_elites', 'local_search_ms', 'time_budget_ms',
+    )
+
+    @classmethod
+    def solver_config(cls) -> dict:
+        """Default solver parameters (part of the result-cache key)."""
+        return {name: getattr(cls, name) for name in cls.CONFIG_FIELDS}
+
     def __init__(self, user_prefs: UserPreferences):
         self.user_prefs = user_prefs
-        self.pois = load_solomon_c101()
 
-        # ── Pre-compute Distance Matrix (O(1) lookups) ────────────────────
-        build_distance_matrix(self.pois)
-        self.depot: Optional[POI] = next(
-            (p for p in self.pois if p.id == 0), None
-        )
-        self.poi_map = {p.id: p for p in self.pois}
-        self.population_size = POPULATION_SIZE   # 50
-        self.mutation_rate   = 0.3
-        self.generations     = 200               # Max cap (early stopping sẽ bảo vệ)
-        self.stagnation_limit = 15               # Dừng nếu 15 gen không cải thiện
-        self.improvement_threshold = 1e-4        # Min delta để tính là "cải thiện"
-        self.elitism_rate    = 2
-        self.tournament_k    = 3
+        # ── Catalogue dùng chung (bất biến, không copy) ───────────────────
+        catalogue = get_catalogue(user_prefs.dataset)
+        for node in (user_prefs.start_node_id, user_prefs.end_node):
+            if node not in catalogue.by_id:
+                raise ValueError(f"Node id {node} not found in dataset {catalogue.name!r}")
+
+        # ── Distance Matrix (O(1) lookups) — dựng 1 lần/dataset, lấy từ cache ─
+        full_dist = build_distance_matrix(catalogue.pois, key=catalogue.key)
+
+        # ── Bài toán con: chỉ các POI có thể ghé, đánh lại chỉ số 0..n-1 ──
+        #    0 = điểm xuất phát, (1 = điểm kết thúc riêng), rồi các POI giữ lại;
+        #    điểm đầu/cuối khác depot mang khung giờ của depot (VD: khách sạn
+        #    → sân bay). Ma trận + k-NN / time-window index dựng theo bài toán
+        #    con (cache theo tập ứng viên); original_ids → id gốc cho response.
+        self.problem = reduce_problem(catalogue, full_dist, user_prefs)
+        self.pois = self.problem.pois
+        self.poi_map = self.problem.by_id
+        self.dist = self.problem.dist
+        self.index = self.problem.index
+        self.depot: POI = self.problem.depot
+        self.end_depot: POI = self.problem.end_depot
+        self.start_reachable = self.index.reachable_from_start(
+            self.depot.id, user_prefs.start_time_minutes)
         self.population: list[Individual] = []
+        self.best_ever: Optional[Individual] = None
+        self.generation = 0
+        self.gens_without_improvement = 0
+        self.deadline: Optional[float] = None    # time.perf_counter(); None = không giới hạn
+
+        # ── Profiling theo pha (bọc method của instance này khi bật) ───────
+        self.profiler: Optional[SolverProfiler] = None
+        if self.profiling:
+            self.profiler = SolverProfiler()
+            self.profiler.instrument(self)
+
+    # ══════════════════════════════════════════════════════════════════════════
+    #  Time budget (anytime mode)
+    # ══════════════════════════════════════════════════════════════════════════
+    def start_clock(self, budget_ms: Optional[float] = None) -> None:
+        """
+        Đặt deadline = bây giờ + `budget_ms`. Mặc định lấy time_budget_ms của
+        request, nếu không có thì của engine; cả hai None → không giới hạn.
+        """
+        if budget_ms is None:
+            budget_ms = self.user_prefs.time_budget_ms or self.time_budget_ms
+        self.deadline = (None if budget_ms is None
+                         else time.perf_counter() + budget_ms / 1000.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    def _remaining_ms(self) -> float:
+        if self.deadline is None:
+            return float('inf')
+        return max(0.0, (self.deadline - time.perf_counter()) * 1000.0)
 
     # ══════════════════════════════════════════════════════════════════════════
     #  Step 1: Population Initialization
     # ══════════════════════════════════════════════════════════════════════════
     def initialize_population(self) -> list[Individual]:
-        self.population = initialize_population(self.pois, self.user_prefs)
-        for ind in self.population:
-            calculate_fitness(ind, self.user_prefs)
+        self.population = initialize_population(self.pois, self.user_prefs, self.dist,
+                                                deadline=self.deadline, depot=self.depot,
+                                                end_depot=self.end_depot, index=self.index)
+        self._evaluate(self.population)
         self.population.sort(key=lambda ind: ind.fitness, reverse=True)
+        self.best_ever = self.population[0]
+        self.generation = 0
+        self.gens_without_improvement = 0
 
-        print("[HGA] Population initialized and evaluated.")
-        print(f"      Best fitness  = {self.population[0].fitness:.2f}")
-        print(f"      Worst fitness = {self.population[-1].fitness:.2f}")
+        logger.debug("Population initialized: best fitness = %.2f, worst fitness = %.2f",
+                     self.population[0].fitness, self.population[-1].fitness)
         return self.population
 
     # ══════════════════════════════════════════════════════════════════════════
     #  Step 2: Fitness Evaluation
     # ══════════════════════════════════════════════════════════════════════════
     def evaluate_fitness(self, individual: Individual) -> float:
-        return calculate_fitness(individual, self.user_prefs)
+        return calculate_fitness(individual, self.user_prefs, self.dist)
+
+    def _evaluate(self, population: list[Individual]) -> None:
+        """Chấm fitness cả lô (vector hóa)."""
+        if self.profiler is not None:
+            self.profiler.count('fitness_evaluations', len(population))
+        evaluate_population(population, self.user_prefs, self.dist)
 
     # ══════════════════════════════════════════════════════════════════════════
     #  Step 3: Parent Selection — Tournament
@@ -108,34 +226,46 @@ class HybridGeneticAlgorithm:
     def crossover(self, parent1: Individual, parent2: Individual) -> Individual:
         """
         OX1 chỉ thao tác trên interior (bỏ Depot 2 đầu).
-        """
-        r1 = parent1.route[1:-1]
-        r2 = parent2.route[1:-1]
 
-        size = min(len(r1), len(r2))
+        Separator của chuyến đi nhiều ngày được đánh khóa theo thứ tự xuất
+        hiện (separator thứ n ↔ khóa −n) để OX1 coi chúng là các gen khác
+        nhau; separator bị cắt mất khi cắt ngắn được bù ở cuối (ngày trống).
+        """
+        size = min(len(parent1.route), len(parent2.route)) - 2
         if size < 2:
             return Individual(route=list(parent1.route))
 
-        r1, r2 = r1[:size], r2[:size]
+        r1 = parent1.route[1:size + 1]
+        r2 = parent2.route[1:size + 1]
 
         cut1, cut2 = sorted(random.sample(range(size), 2))
 
-        child_interior: list[Optional[POI]] = [None] * size
-
-        segment_ids = set()
-        for k in range(cut1, cut2 + 1):
-            child_interior[k] = r1[k]
-            segment_ids.add(r1[k].id)
-
-        remaining = [poi for poi in r2 if poi.id not in segment_ids]
-        empty_positions = [k for k in range(size) if child_interior[k] is None]
-        for pos, poi in zip(empty_positions, remaining):
-            child_interior[pos] = poi
-
-        child_interior_clean = [p for p in child_interior if p is not None]
-
-        new_route = [self.depot] + child_interior_clean + [self.depot]
-        return Individual(route=new_route)
+        # Đoạn [cut1, cut2] giữ từ cha 1; các vị trí còn lại lấp theo thứ tự
+        # của mẹ 2 (bỏ gen đã có trong đoạn) — route con dựng trong MỘT list
+        segment_keys = set(self._gene_keys(r1)[cut1:cut2 + 1])
+        fill = iter([poi for poi, key in zip(r2, self._gene_keys(r2))
+                     if key not in segment_keys])
+
+        route = [self.depot]
+        route.extend(islice(fill, cut1))
+        route.extend(r1[cut1:cut2 + 1])
+        route.extend(islice(fill, size - cut2 - 1))
+        route.extend([self.depot] * (self.user_prefs.days - route.count(self.depot)))
+        route.append(self.end_depot)
+        return Individual(route=route)
+
+    def _gene_keys(self, interior: list[POI]) -> list[int]:
+        """POI id for each gene; separators get distinct keys −1, −2, ..."""
+        depot_id = self.depot.id
+        keys = []
+        n = 0
+        for p in interior:
+            if p.id == depot_id:
+                n += 1
+                keys.append(-n)
+            else:
+                keys.append(p.id)
+        return keys
 
     # ══════════════════════════════════════════════════════════════════════════
     #  Step 5: Mutation — 2-opt / Swap / Insertion  (Depot-Safe)
@@ -148,13 +278,20 @@ class HybridGeneticAlgorithm:
           • Swap      (30%) : hoán đổi 2 POI → thay đổi thứ tự.
           • Insertion (40%) : tìm POI mới chưa đi, chèn vào vị trí tốt nhất
                               → TĂNG ĐIỂM (biến thời gian dư thành điểm thưởng).
+
+        Với 2-opt / Swap: thử `mutation_trials` cặp vị trí ngẫu nhiên, chấm mỗi
+        bước bằng delta evaluation (chỉ mô phỏng lại từ vị trí đổi đầu tiên)
+        và áp dụng bước có fitness mới cao nhất.
         """
         if random.random() > self.mutation_rate:
             return individual
 
-        interior = list(individual.route[1:-1])
+        # Con vừa sinh sở hữu route của nó → đổi tại chỗ rồi gán lại chính
+        # list đó (setter đánh dấu lịch trình / prefix / chữ ký hết hạn)
+        route = individual.route
+        size = len(route) - 2      # interior
 
-        if len(interior) < 2:
+        if size < 2:
             individual = self._insertion_mutation(individual)
             return individual
 
@@ -162,15 +299,15 @@ class HybridGeneticAlgorithm:
 
         if roll < 0.30:
             # ── 2-opt ────────────────────────────────────────────────────────
-            i, j = sorted(random.sample(range(len(interior)), 2))
-            interior[i:j + 1] = interior[i:j + 1][::-1]
-            individual.route = [self.depot] + interior + [self.depot]
+            i, j = self._pick_move(individual, delta_two_opt, size, ordered=True)
+            route[i + 1:j + 2] = route[j + 1:i:-1]
+            individual.route = route
 
         elif roll < 0.60:
             # ── Swap ─────────────────────────────────────────────────────────
-            i, j = random.sample(range(len(interior)), 2)
-            interior[i], interior[j] = interior[j], interior[i]
-            individual.route = [self.depot] + interior + [self.depot]
+            i, j = self._pick_move(individual, delta_swap, size, ordered=False)
+            route[i + 1], route[j + 1] = route[j + 1], route[i + 1]
+            individual.route = route
 
         else:
             # ── Insertion Mutation ────────────────────────────────────────────
@@ -178,16 +315,48 @@ class HybridGeneticAlgorithm:
 
         return individual
 
+    def _pick_move(self, individual: Individual, delta_fn, size: int,
+                   ordered: bool) -> tuple[int, int]:
+        """
+        Chọn cặp vị trí (trên interior) cho 2-opt/Swap: lấy mẫu
+        `mutation_trials` cặp và giữ cặp có delta fitness lớn nhất.
+        """
+        best_move: tuple[int, int] = (0, 1)
+        best_delta = float('-inf')
+        for _ in range(self.mutation_trials):
+            if ordered:
+                i, j = sorted(random.sample(range(size), 2))
+            else:
+                i, j = random.sample(range(size), 2)
+            if self.mutation_trials == 1:
+                return i, j
+            # Interior index k ↔ route index k + 1
+            delta = delta_fn(individual, i + 1, j + 1, self.user_prefs, self.dist)
+            if delta > best_delta:
+                best_delta = delta
+                best_move = (i, j)
+        return best_move
+
     def _insertion_mutation(self, individual: Individual) -> Individual:
         """
         ★ INSERTION MUTATION — Toán tử cốt lõi để phá Hội tụ sớm ★
 
         Tìm POI chưa ghé thăm, chèn vào vị trí tốn ít thời gian nhất.
-        Lấy tối đa 10 ứng viên ngẫu nhiên để giữ hiệu năng.
+        Ứng viên chỉ gồm POI chưa đi mà PoiIndex cho biết kịp khung giờ khi
+        đi ngay sau ít nhất một điểm trên route (POI khác chắc chắn không chèn
+        được). Lấy tối đa 10 ứng viên ngẫu nhiên để giữ hiệu năng.
+        Tính khả thi kiểm tra O(1) nhờ lịch trình (forward time slack).
         """
-        route = list(individual.route)
-        visited_ids = {p.id for p in route}
-        unvisited = [p for p in self.pois if p.id not in visited_ids and p.id != 0]
+        ensure_schedule(individual, self.user_prefs, self.dist)
+        route = individual.route
+        ids = individual.ids
+        depot_id = self.depot.id
+        reachable = set(self.start_reachable)
+        for k in range(1, len(ids) - 1):
+            if ids[k] != depot_id:          # Separator: đã có start_reachable
+                reachable.update(self.index.reachable[ids[k]])
+        reachable.difference_update(ids)
+        unvisited = [self.poi_map[pid] for pid in sorted(reachable)]
 
         if not unvisited:
             return individual
@@ -209,11 +378,11 @@ class HybridGeneticAlgorithm:
                 prev_poi = route[pos - 1]
                 next_poi = route[pos]
 
-                old_travel = get_travel_time(prev_poi, next_poi)
+                old_travel = get_travel_time(prev_poi, next_poi, self.dist)
                 new_travel = (
-                    get_travel_time(prev_poi, candidate)
+                    get_travel_time(prev_poi, candidate, self.dist)
                     + candidate.duration
-                    + get_travel_time(candidate, next_poi)
+                    + get_travel_time(candidate, next_poi, self.dist)
                 )
                 cost_increase = new_travel - old_travel
 
@@ -221,13 +390,11 @@ class HybridGeneticAlgorithm:
                     best_cost_increase = cost_increase
                     best_pos = pos
 
-            if best_pos > 0:
-                test_route = list(route)
-                test_route.insert(best_pos, candidate)
-                if check_constraints(test_route, self.user_prefs):
-                    route = test_route
+            if best_pos > 0 and can_insert(
+                individual, best_pos, candidate, self.user_prefs, self.dist
+            ):
+                insert_poi(individual, best_pos, candidate, self.user_prefs, self.dist)
 
-        individual.route = route
         return individual
 
     # ══════════════════════════════════════════════════════════════════════════
@@ -244,17 +411,23 @@ class HybridGeneticAlgorithm:
         Nếu POI tốn nhiều thời gian nhưng chỉ mang lại ít điểm → xóa trước.
 
         Vẫn đảm bảo Depot-Safe: chỉ xóa trong interior (route[1:-1]).
+        Tính khả thi đọc từ lịch trình; mỗi lần xóa chỉ cập nhật cục bộ.
         """
+        ensure_schedule(individual, self.user_prefs, self.dist)
         route = individual.route
+        weights = self.user_prefs.interest_weights
+        separator = self.depot.id
+        min_len = self.user_prefs.days + 1     # Depot 2 đầu + (days − 1) separator
 
-        while not check_constraints(route, self.user_prefs) and len(route) > 2:
+        while not is_feasible(individual, self.user_prefs) and len(route) > min_len:
             # Tìm POI kém nhất trong interior (index 1 đến len-2)
             worst_idx = -1
             worst_value = float('inf')
-            weights = self.user_prefs.interest_weights
 
             for i in range(1, len(route) - 1):
                 poi = route[i]
+                if poi.id == separator:
+                    continue
 
                 # Tính điểm thực tế của POI này
                 score_value = poi.base_score * weights.get(poi.category, 0.0)
@@ -264,10 +437,10 @@ class HybridGeneticAlgorithm:
                 prev_poi = route[i - 1]
                 next_poi = route[i + 1]
                 time_cost = (
-                    get_travel_time(prev_poi, poi)
+                    get_travel_time(prev_poi, poi, self.dist)
                     + poi.duration
-                    + get_travel_time(poi, next_poi)
-                    - get_travel_time(prev_poi, next_poi)
+                    + get_travel_time(poi, next_poi, self.dist)
+                    - get_travel_time(prev_poi, next_poi, self.dist)
                 )
 
                 # Tỷ lệ giá trị: score mang lại / thời gian tốn
@@ -282,40 +455,41 @@ class HybridGeneticAlgorithm:
                     worst_idx = i
 
             if worst_idx > 0:
-                route.pop(worst_idx)
+                remove_poi(individual, worst_idx, self.user_prefs, self.dist)
             else:
-                # Fallback: xóa áp chót
-                route.pop(-2)
+                # Fallback: xóa POI cuối cùng (bỏ qua separator)
+                last = max(i for i in range(1, len(route) - 1) if route[i].id != separator)
+                remove_poi(individual, last, self.user_prefs, self.dist)
 
-        individual.route = route
         return individual
 
     # ══════════════════════════════════════════════════════════════════════════
     #  Diversity Check (Bước 2 — Chống đồng huyết)
     # ══════════════════════════════════════════════════════════════════════════
-    def _is_duplicate(self, child: Individual, population: list[Individual]) -> bool:
+    def _signatures(self, population: list[Individual]) -> set[int]:
+        """Hash set chữ ký route của `population` (theo chế độ `diversity`)."""
+        mode = self.diversity
+        return {ind.signature(mode) for ind in population}
+
+    def _is_duplicate(self, child: Individual, signatures: set[int]) -> bool:
         """
-        Kiểm tra cá thể `child` có trùng lặp với bất kỳ cá thể nào
-        trong `population` hay không.
+        Kiểm tra cá thể `child` có trùng lặp với cá thể nào đã có chữ ký
+        trong `signatures` (hash set của quần thể) hay không — O(1).
 
-        Hai cá thể được coi là "trùng" nếu tập hợp POI ID giống hệt nhau
-        (không cần cùng thứ tự — vì thứ tự có thể khác nhưng bản chất giống).
+        diversity = 'set': hai cá thể "trùng" nếu tập hợp POI ID giống hệt
+        nhau (không cần cùng thứ tự — vì thứ tự có thể khác nhưng bản chất
+        giống). diversity = 'sequence': chỉ trùng khi cùng cả thứ tự thăm.
         """
-        child_ids = frozenset(p.id for p in child.route[1:-1])
-        for ind in population:
-            existing_ids = frozenset(p.id for p in ind.route[1:-1])
-            if child_ids == existing_ids:
-                return True
-        return False
+        return child.signature(self.diversity) in signatures
 
     def _create_diverse_individual(self) -> Individual:
         """
         Tạo 1 cá thể Random hoàn toàn mới khi phát hiện bản sao.
         Đảm bảo quần thể luôn có sự đa dạng.
+        Fitness được tính cùng lượt với các con khác (evaluate_population).
         """
-        ind = _create_random_individual(self.pois, self.depot, self.user_prefs)
-        calculate_fitness(ind, self.user_prefs)
-        return ind
+        return _create_random_individual(self.pois, self.depot, self.user_prefs, self.dist,
+                                         self.end_depot)
 
     # ══════════════════════════════════════════════════════════════════════════
     #  Build API Response from best Individual
@@ -331,41 +505,58 @@ class HybridGeneticAlgorithm:
           • arrival, wait, start, leave tại mỗi POI
           • total_score, total_cost, total_distance, total_duration
 
+        Nhiều ngày: mỗi separator sinh "Trở về (Depot)" của ngày d và
+        "Điểm xuất phát (Depot)" của ngày d+1 (trường `day`, `order` đếm lại).
+
+        Route dùng id của bài toán con; `id` / `name` trong response là id
+        gốc của catalogue (SubProblem.original_ids).
+
         ĐƠN VỊ: Bên trong tính bằng PHÚT (Solomon time units).
         Output arrival/start/leave → format HH:MM.
         Output total_duration → giờ (để user dễ đọc).
         """
         route = best.route
         weights = self.user_prefs.interest_weights
+        start_minutes = self.user_prefs.start_time_minutes  # Phút (VD: 8h → 480)
+        separator = route[0].id
+        original_ids = self.problem.original_ids
 
-        current_time = self.user_prefs.start_time_minutes  # Phút (VD: 8h → 480)
+        current_time = start_minutes
         items: list[ItineraryItem] = []
         total_cost = 0.0
         total_score = 0.0
         total_distance = 0.0
+        total_minutes = 0.0
+        day = 1
+        order = 0
+
+        def depot_start() -> ItineraryItem:
+            # Depot xuất phát — không có travel (điểm bắt đầu của ngày)
+            return ItineraryItem(
+                day=day,
+                order=1,
+                id=original_ids[separator],
+                name="Điểm xuất phát (Depot)",
+                category="depot",
+                travel_distance=None,
+                travel_time=None,
+                arrival=_format_time(start_minutes),
+                wait=0,
+                start=_format_time(start_minutes),
+                leave=_format_time(start_minutes),
+                cost=0.0,
+                score=0.0,
+            )
 
-        for order, poi in enumerate(route):
-            if order == 0:
-                # Depot xuất phát — không có travel (điểm bắt đầu)
-                items.append(ItineraryItem(
-                    order=1,
-                    id=poi.id,
-                    name="Điểm xuất phát (Depot)",
-                    category="depot",
-                    travel_distance=None,
-                    travel_time=None,
-                    arrival=_format_time(current_time),
-                    wait=0,
-                    start=_format_time(current_time),
-                    leave=_format_time(current_time),
-                    cost=0.0,
-                    score=0.0,
-                ))
+        for k, poi in enumerate(route):
+            order += 1
+            if k == 0:
+                items.append(depot_start())
                 continue
 
             # Tính khoảng cách và thời gian di chuyển (phút) từ điểm trước
-            prev_poi = route[order - 1]
-            travel = get_travel_time(prev_poi, poi)
+            prev_poi = route[k - 1]
+            travel = get_travel_time(prev_poi, poi, self.dist)
             total_distance += travel
             travel_time_minutes = int(round(travel))
 
@@ -387,12 +578,13 @@ class HybridGeneticAlgorithm:
             w = weights.get(poi.category, 0.0)
             score = poi.base_score * w
 
-            if order == len(route) - 1:
-                # Depot cuối (trở về)
+            if k == len(route) - 1 or poi.id == separator:
+                # Depot cuối ngày (trở về) hoặc điểm kết thúc riêng (end_node_id)
                 items.append(ItineraryItem(
-                    order=order + 1,
-                    id=poi.id,
-                    name="Trở về (Depot)",
+                    day=day,
+                    order=order,
+                    id=original_ids[poi.id],
+                    name="Trở về (Depot)" if poi.id == separator else "Điểm kết thúc",
                     category="depot",
                     travel_distance=round(travel, 2),
                     travel_time=travel_time_minutes,
@@ -403,13 +595,21 @@ class HybridGeneticAlgorithm:
                     cost=0.0,
                     score=0.0,
                 ))
+                total_minutes += current_time - start_minutes
+                if k < len(route) - 1:
+                    # Separator → ngày mới xuất phát lại từ depot
+                    day += 1
+                    order = 1
+                    current_time = start_minutes
+                    items.append(depot_start())
             else:
                 total_cost += poi.price
                 total_score += score
                 items.append(ItineraryItem(
-                    order=order + 1,
-                    id=poi.id,
-                    name=f"POI-{poi.id} ({poi.category})",
+                    day=day,
+                    order=order,
+                    id=original_ids[poi.id],
+                    name=f"POI-{original_ids[poi.id]} ({poi.category})",
                     category=poi.category,
                     travel_distance=round(travel, 2),
                     travel_time=travel_time_minutes,
@@ -421,8 +621,8 @@ class HybridGeneticAlgorithm:
                     score=round(score, 2),
                 ))
 
-        # total_duration: phút → giờ (output cho user)
-        total_duration_hours = (current_time - self.user_prefs.start_time_minutes) / 60.0
+        # total_duration: phút → giờ (output cho user), cộng dồn mọi ngày
+        total_duration_hours = total_minutes / 60.0
 
         return OptimizationResponse(
             total_score=round(total_score, 2),
@@ -433,104 +633,258 @@ class HybridGeneticAlgorithm:
             execution_time=round(execution_time, 4),
         )
 
+    # ══════════════════════════════════════════════════════════════════════════
+    #  One generation (dùng chung cho run() và Island Model)
+    # ══════════════════════════════════════════════════════════════════════════
+    @property
+    def converged(self) -> bool:
+        """Early stopping: best chưa cải thiện trong `stagnation_limit` thế hệ."""
+        return self.gens_without_improvement >= self.stagnation_limit
+
+    @property
+    def finished(self) -> bool:
+        return self.converged or self.generation >= self.generations or self.expired
+
+    def step(self) -> int:
+        """
+        Tiến hóa quần thể thêm MỘT thế hệ (elitism → selection → crossover →
+        mutation → repair → diversity → evaluate → local search) và cập nhật
+        best_ever / bộ đếm stagnation. Trả về số con trùng lặp đã thay thế.
+
+        Nếu hết time budget giữa chừng, phần còn thiếu được lấp bằng các cá
+        thể hiện có (thế hệ kết thúc ngay, best-so-far không mất).
+        """
+        new_population: list[Individual] = list(
+            self.population[:self.elitism_rate]
+        )
+        signatures = self._signatures(new_population)
+
+        duplicates_replaced = 0
+
+        while len(new_population) < self.population_size:
+            if self.expired:
+                new_population.extend(self.population[len(new_population):])
+                break
+            p1, p2 = self.select_parents(self.population)
+            child = self.crossover(p1, p2)
+            child = self.mutate(child)
+            child = self._repair(child)
+
+            # ── Diversity Check ──────────────────────────────────────────────
+            if self._is_duplicate(child, signatures):
+                child = self._create_diverse_individual()
+                duplicates_replaced += 1
+
+            new_population.append(child)
+            signatures.add(child.signature(self.diversity))
+
+        # ── Evaluate: chấm điểm toàn bộ con mới trong 1 lượt vector hóa ──────
+        self._evaluate(new_population[self.elitism_rate:])
+
+        new_population.sort(key=lambda ind: ind.fitness, reverse=True)
+
+        # ── Memetic stage: Local Search trên các elite (không vượt deadline) ─
+        local_search_ms = min(self.local_search_ms, self._remaining_ms())
+        if local_search_ms > 0 and self._local_search(new_population, local_search_ms):
+            new_population.sort(key=lambda ind: ind.fitness, reverse=True)
+
+        self.population = new_population
+        self.generation += 1
+        self._update_best()
+        if self.profiler is not None:
+            self.profiler.count('generations')
+            self.profiler.count('duplicates_replaced', duplicates_replaced)
+        return duplicates_replaced
+
+    def _local_search(self, population: list[Individual], budget_ms: float) -> int:
+        """Local Search trên các elite; trả về số elite được cải thiện."""
+        improved = improve_elites(population, self.local_search_elites, self.poi_map,
+                                  self.user_prefs, self.dist, budget_ms)
+        if self.profiler is not None:
+            self.profiler.count('local_search_improvements', improved)
+        return improved
+
+    def _update_best(self) -> None:
+        """Cập nhật Best Ever + bộ đếm Early Stopping từ quần thể hiện tại."""
+        improvement = self.population[0].fitness - self.best_ever.fitness
+        if improvement > self.improvement_threshold:
+            self.best_ever = self.population[0]
+            self.gens_without_improvement = 0
+        else:
+            self.gens_without_improvement += 1
+
+    # ══════════════════════════════════════════════════════════════════════════
+    #  Migration (Island Model) — trao đổi cá thể dưới dạng danh sách POI id
+    # ══════════════════════════════════════════════════════════════════════════
+    def _from_routes(self, routes: list[list[int]]) -> list[Individual]:
+        start_id = self.depot.id
+        individuals = [
+            Individual(route=[self.depot]
+                       + [self.depot if pid == start_id else self.poi_map[pid] for pid in ids[1:-1]]
+                       + [self.end_depot])
+            for ids in routes
+        ]
+        self._evaluate(individuals)
+        return individuals
+
+    def restore_individual(self, route: list[int]) -> Individual:
+        """Individual (đã chấm fitness) từ một route dạng POI id."""
+        return self._from_routes([route])[0]
+
+    def restore(self, routes: list[list[int]], best_route: list[int],
+                generation: int, gens_without_improvement: int) -> None:
+        """Khôi phục trạng thái (quần thể đã sắp xếp, best, bộ đếm) của một island."""
+        self.population = self._from_routes(routes)
+        self.population.sort(key=lambda ind: ind.fitness, reverse=True)
+        self.best_ever = self.restore_individual(best_route)
+        self.generation = generation
+        self.gens_without_improvement = gens_without_improvement
+
+    def emigrants(self, count: int) -> list[list[int]]:
+        """
+        Route (POI id) của `count` cá thể tốt nhất. Id thuộc bài toán con —
+        mọi island của cùng request rút gọn ra cùng một bài toán con.
+        """
+        return [ind.ids.tolist() for ind in self.population[:count]]
+
+    def immigrate(self, routes: list[list[int]]) -> int:
+        """
+        Thay các cá thể kém nhất bằng cá thể di cư (bỏ qua bản trùng với
+        quần thể hiện tại). Trả về số cá thể đã nhận.
+        """
+        signatures = self._signatures(self.population)
+        accepted = [ind for ind in self._from_routes(routes)
+                    if not self._is_duplicate(ind, signatures)]
+        if not accepted:
+            return 0
+        accepted = accepted[:len(self.population) - self.elitism_rate]
+        self.population[len(self.population) - len(accepted):] = accepted
+        self.population.sort(key=lambda ind: ind.fitness, reverse=True)
+        if self.population[0].fitness - self.best_ever.fitness > self.improvement_threshold:
+            self.best_ever = self.population[0]
+            self.gens_without_improvement = 0
+        return len(accepted)
+
     # ══════════════════════════════════════════════════════════════════════════
     #  Main Loop — Early Stopping + Enhanced Logging
     # ══════════════════════════════════════════════════════════════════════════
-    def run(self) -> OptimizationResponse:
+    def generation_stats(self, duplicates: int = 0) -> GenerationStats:
+        """Best/Avg fitness, số lộ trình duy nhất... của quần thể hiện tại."""
+        best_fit = self.population[0].fitness
+        avg_fit = sum(ind.fitness for ind in self.population) / len(self.population)
+
+        # Đếm số lộ trình duy nhất (unique routes) theo chữ ký đã cache
+        unique_routes = len(self._signatures(self.population))
+
+        return GenerationStats(
+            generation=self.generation,
+            best_fitness=best_fit,
+            avg_fitness=avg_fit,
+            unique_routes=unique_routes,
+            wait=self.population[0].total_wait,
+            stagnation=self.gens_without_improvement,
+            duplicates=duplicates,
+        )
+
+    def _log_summary(self, best: Individual, elapsed: float, stop_reason: str) -> None:
+        """Một record INFO cho mỗi lời giải (kèm dữ liệu có cấu trúc)."""
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        summary = {
+            "dataset": self.user_prefs.dataset,
+            "generations": self.generation,
+            "max_generations": self.generations,
+            "stop_reason": stop_reason,
+            "best_fitness": round(best.fitness, 4),
+            "total_score": round(best.total_score, 4),
+            "total_wait": round(best.total_wait, 2),
+            "pois": sum(len(tour) for tour in best.tours()),
+            "candidates": self.problem.candidates,
+            "route": [self.problem.original_ids[pid] for pid in best.ids],
+            "elapsed_s": round(elapsed, 4),
+        }
+        logger.info("Solve finished: %d/%d generations (%s), fitness = %.2f, %d POIs, %.3fs",
+                    self.generation, self.generations, stop_reason, best.fitness,
+                    summary["pois"], elapsed, extra={"solve": summary})
+
+    def run(self, on_progress: Optional[ProgressCallback] = None,
+            should_stop: Optional[Callable[[], bool]] = None) -> OptimizationResponse:
         """
-        Chạy vòng lặp tiến hóa chính của Hybrid GA.
+        Chạy vòng lặp tiến hóa chính của Hybrid GA (lặp `step()`).
+
+        `on_progress(stats, best)` (tùy chọn) được gọi sau khởi tạo và sau mỗi
+        thế hệ; `best` là OptimizationResponse của best-ever mới (hoặc None).
+        `should_stop()` (tùy chọn) được kiểm tra trước mỗi thế hệ; trả về True
+        → dừng ngay (hủy job) và trả về best-so-far.
+
+        ★ TIME BUDGET (anytime) ★
+          Nếu có time_budget_ms (request hoặc engine), dừng khi hết giờ và
+          trả về best-so-far; khởi tạo quần thể cũng bị cắt bớt nếu cần.
 
         ★ EARLY STOPPING ★
           Nếu best fitness không cải thiện (>= threshold) trong
           `stagnation_limit` thế hệ liên tiếp → dừng sớm.
           Giúp API phản hồi nhanh hơn khi thuật toán đã hội tụ.
 
-        Log mỗi thế hệ:
-          • Best Fitness / Average Fitness
-          • Unique Routes (diversity)
-          • Wait Time (best individual)
-          • Stagnation counter (bao nhiêu gen chưa cải thiện)
+        Logging:
+          • INFO – một bản tóm tắt mỗi lời giải (số thế hệ, lý do dừng,
+            fitness, số POI, thời gian) kèm trường `solve` cho log JSON.
+          • DEBUG – thêm thống kê mỗi thế hệ (Best/Avg fitness, Unique
+            routes, Wait, Stagnation); chỉ được tính khi DEBUG bật.
         """
         start_time = time.perf_counter()
+        debug = logger.isEnabledFor(logging.DEBUG)
 
+        self.start_clock()
         self.initialize_population()
-        best_ever = self.population[0]
-        gens_without_improvement = 0
-        actual_gens = 0
-
-        for gen in range(self.generations):
-            actual_gens = gen + 1
-
-            new_population: list[Individual] = list(
-                self.population[:self.elitism_rate]
-            )
-
-            duplicates_replaced = 0
-
-            while len(new_population) < self.population_size:
-                p1, p2 = self.select_parents(self.population)
-                child = self.crossover(p1, p2)
-                child = self.mutate(child)
-                child = self._repair(child)
-                calculate_fitness(child, self.user_prefs)
-
-                # ── Diversity Check ──────────────────────────────────────────
-                if self._is_duplicate(child, new_population):
-                    child = self._create_diverse_individual()
-                    duplicates_replaced += 1
-
-                new_population.append(child)
+        reported = None
+        if on_progress is not None:
+            reported = self.best_ever
+            on_progress(self.generation_stats(),
+                        self._build_response(reported, time.perf_counter() - start_time))
+
+        stop_reason = "max_generations"
+        while self.generation < self.generations:
+            if should_stop is not None and should_stop():
+                stop_reason = "cancelled"
+                break
 
-            new_population.sort(key=lambda ind: ind.fitness, reverse=True)
-            self.population = new_population
+            if self.expired:
+                stop_reason = "time_budget"
+                break
 
-            # ── Cập nhật Best Ever + Early Stopping ───────────────────────────
-            improvement = self.population[0].fitness - best_ever.fitness
-            if improvement > self.improvement_threshold:
-                best_ever = self.population[0]
-                gens_without_improvement = 0
-            else:
-                gens_without_improvement += 1
-
-            # ── Enhanced Logging ──────────────────────────────────────────────
-            best_fit = self.population[0].fitness
-            avg_fit = sum(ind.fitness for ind in self.population) / len(self.population)
-
-            # Đếm số lộ trình duy nhất (unique routes)
-            unique_routes = len({
-                frozenset(p.id for p in ind.route[1:-1])
-                for ind in self.population
-            })
-
-            print(
-                f"[HGA] Gen {gen + 1:>3}/{self.generations} | "
-                f"Best = {best_fit:8.2f} | "
-                f"Avg = {avg_fit:8.2f} | "
-                f"Unique = {unique_routes:>2}/{self.population_size} | "
-                f"Wait = {self.population[0].total_wait:6.1f} | "
-                f"Stag = {gens_without_improvement:>2}/{self.stagnation_limit} | "
-                f"Dup = {duplicates_replaced}"
-            )
+            duplicates_replaced = self.step()
+
+            # ── Thống kê thế hệ: chỉ tính khi cần (DEBUG log / progress) ──────
+            if debug or on_progress is not None:
+                stats = self.generation_stats(duplicates_replaced)
+                if debug:
+                    logger.debug(
+                        "Gen %3d/%d | Best = %8.2f | Avg = %8.2f | Unique = %2d/%d | "
+                        "Wait = %6.1f | Stag = %2d/%d | Dup = %d",
+                        stats.generation, self.generations, stats.best_fitness,
+                        stats.avg_fitness, stats.unique_routes, self.population_size,
+                        stats.wait, stats.stagnation, self.stagnation_limit, stats.duplicates,
+                    )
+
+            # ── Progress: thống kê + best-ever mới (nếu có) ───────────────────
+            if on_progress is not None:
+                improved = None
+                if self.best_ever is not reported:
+                    reported = self.best_ever
+                    improved = self._build_response(reported, time.perf_counter() - start_time)
+                on_progress(stats, improved)
 
             # ── Early Stopping Check ──────────────────────────────────────────
-            if gens_without_improvement >= self.stagnation_limit:
-                print(
-                    f"\n[HGA] ★ EARLY STOPPING ★ "
-                    f"Best fitness không cải thiện trong "
-                    f"{self.stagnation_limit} thế hệ liên tiếp. "
-                    f"Dừng tại gen {gen + 1}/{self.generations}."
-                )
+            if self.converged:
+                stop_reason = "converged"
                 break
 
         elapsed = time.perf_counter() - start_time
+        best_ever = self.best_ever
+        self._log_summary(best_ever, elapsed, stop_reason)
 
-        print(f"\n[HGA] ═══ KẾT QUẢ CUỐI CÙNG ═══")
-        print(f"      Generations run   = {actual_gens}/{self.generations}")
-        print(f"      Best-ever fitness = {best_ever.fitness:.2f}")
-        print(f"      Total wait time   = {best_ever.total_wait:.1f}")
-        print(f"      Route IDs   : {[p.id for p in best_ever.route]}")
-        print(f"      Route length: {len(best_ever.route)} nodes "
-              f"({len(best_ever.route) - 2} POIs + 2 Depot)")
-        print(f"      Execution time: {elapsed:.4f}s")
-
-        return self._build_response(best_ever, elapsed)
\ No newline at end of file
+        response = self._build_response(best_ever, elapsed)
+        if self.profiler is not None:
+            response.profile = self.profiler.snapshot()
+        return response
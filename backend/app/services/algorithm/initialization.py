@@ -5,18 +5,33 @@ Implements two strategies from Botelho et al. (2010) and Labadie et al. (2012):
   • Strategy 1 – Randomized Insertion Heuristic  (80% of population, 40 individuals)
   • Strategy 2 – Pure Random Initialization        (20% of population, 10 individuals)
 
-Total population size: 50 (fixed).
+Total population size: 50 (fixed; truncated only when a time budget runs out).
+The 40 heuristic builds share one _LabadieBuilder (weighted scores, first
+step, Top-k selection) — see its docstring.
 """
 
+import heapq
+import logging
 import random
-from typing import List
+import time
+from operator import itemgetter
+from typing import List, Optional
 
 from app.models.domain import POI, Individual
 from app.models.schemas import UserPreferences
 from app.services.algorithm.fitness import (
+    DistanceMatrix,
     get_travel_time,
-    try_add_poi,
 )
+from app.services.algorithm.poi_index import PoiIndex, get_poi_index
+from app.services.algorithm.schedule import (
+    can_insert,
+    can_insert_many,
+    compute_schedule,
+    insert_poi,
+)
+
+logger = logging.getLogger(__name__)
 
 
 # ─── Constants ───────────────────────────────────────────────────────────────
@@ -31,7 +46,7 @@ RCL_SIZE        = 3    # Top-k candidates in Restricted Candidate List
 # =============================================================================
 
 def _labadie_ratio(poi: POI, current_location: POI,
-                   user_prefs: UserPreferences) -> float:
+                   user_prefs: UserPreferences, dist: DistanceMatrix) -> float:
     """
     Labadie desirability ratio:
         ratio = (POI.score × interest_weight) / distance(current, POI)
@@ -42,62 +57,135 @@ def _labadie_ratio(poi: POI, current_location: POI,
     interest_weight = user_prefs.interest_weights.get(poi.category, 0.0)
     numerator = poi.base_score * interest_weight
 
-    dist = get_travel_time(current_location, poi)
-    if dist == 0:
+    travel = get_travel_time(current_location, poi, dist)
+    if travel == 0:
         return float('inf')
 
-    return numerator / dist
+    return numerator / travel
+
+
+class _LabadieBuilder:
+    """
+    Shared state of the heuristic builds of one population.
+
+    Mọi thứ không phụ thuộc vào từng cá thể được tính MỘT lần và dùng chung
+    cho cả 40 lần dựng:
+      • score × interest_weight của mọi POI (list theo id, từ PoiColumns)
+      • tập POI đến được từ điểm xuất phát (PoiIndex, đã cache)
+      • RCL của bước đầu tiên — route [Depot, End] như nhau ở mọi lần dựng
+        nên ứng viên và tỷ lệ Labadie của bước này cũng như nhau.
+
+    Trong một ngày, POI đã không chèn được vào cuối route thì cũng không
+    chèn được ở các bước sau (giờ rời điểm cuối chỉ tăng, ngân sách còn lại
+    chỉ giảm — cùng giả thiết bất đẳng thức tam giác với PoiIndex), nên nó
+    bị loại khỏi các lần thử còn lại của ngày đó. Mỗi bước chỉ giữ Top-k
+    bằng heapq.nlargest (tương đương sort ổn định rồi cắt, không sort cả
+    danh sách).
+    """
+
+    def __init__(self, pois: List[POI], depot: POI, user_prefs: UserPreferences,
+                 dist: DistanceMatrix, index: PoiIndex, end_depot: POI):
+        self.depot = depot
+        self.end_depot = end_depot
+        self.user_prefs = user_prefs
+        self.dist = dist
+        self.index = index
+        self.poi_map = {p.id: p for p in pois}
+        self.candidates = frozenset(self.poi_map) - {depot.id, end_depot.id}
+        self.scores: list[float] = dist.columns.weighted_scores(user_prefs).tolist()
+        self.start_reachable = index.reachable_from_start(depot.id, user_prefs.start_time_minutes)
+        self._first_step: Optional[tuple[list[POI], frozenset[int]]] = None
+
+    def _rcl(self, ind: Individual, tail: int, current: POI,
+             unvisited: set[int], dead: set[int]) -> list[POI]:
+        """Top-k candidates by Labadie ratio; POIs that cannot be appended go to `dead`."""
+        if current.id == self.depot.id:     # Đầu ngày (route[0] hoặc separator)
+            reachable = self.start_reachable
+        else:
+            reachable = self.index.reachable[current.id]
+
+        poi_map, scores = self.poi_map, self.scores
+        pool = [poi_map[pid] for pid in reachable if pid in unvisited and pid not in dead]
+        row = self.dist.rows[current.id]
+        candidates = []
+        for poi, ok in zip(pool, can_insert_many(ind, tail, pool, self.user_prefs, self.dist)):
+            if ok:
+                travel = row[poi.id]
+                candidates.append((poi, scores[poi.id] / travel if travel else float('inf')))
+            else:
+                dead.add(poi.id)
+        return [poi for poi, _ in heapq.nlargest(RCL_SIZE, candidates, key=itemgetter(1))]
+
+    def build(self) -> Individual:
+        user_prefs, dist = self.user_prefs, self.dist
+        depot = self.depot
+        ind = Individual(route=[depot, self.end_depot])
+        compute_schedule(ind, user_prefs, dist)
+        route = ind.route
+        unvisited = set(self.candidates)
+        days_left = user_prefs.days - 1
+
+        if self._first_step is None:
+            dead: set[int] = set()
+            self._first_step = (self._rcl(ind, 1, depot, unvisited, dead), frozenset(dead))
+        rcl, first_dead = self._first_step
+        dead = set(first_dead)
+
+        while True:
+            if not rcl:
+                if days_left:           # Hết chỗ trong ngày → sang ngày sau
+                    insert_poi(ind, len(route) - 1, depot, user_prefs, dist)
+                    days_left -= 1
+                    dead.clear()
+                else:
+                    break               # No feasible POI left
+            else:
+                # --- Random pick from RCL ---
+                chosen_poi = random.choice(rcl)
+                insert_poi(ind, len(route) - 1, chosen_poi, user_prefs, dist)
+                unvisited.discard(chosen_poi.id)
+
+            if not unvisited:
+                break
+            tail = len(route) - 1
+            rcl = self._rcl(ind, tail, route[tail - 1], unvisited, dead)
+
+        for _ in range(days_left):          # Các ngày còn lại để trống
+            insert_poi(ind, len(route) - 1, depot, user_prefs, dist)
+        return ind
 
 
 def _create_heuristic_individual(
     pois: List[POI],
     depot: POI,
     user_prefs: UserPreferences,
+    dist: DistanceMatrix,
+    index: Optional[PoiIndex] = None,
+    end_depot: Optional[POI] = None,
 ) -> Individual:
     """
     Build ONE individual using the Randomized Insertion Heuristic:
-      1. Start with route = [Depot].
+      1. Start with route = [Depot, End] and its schedule (End = `end_depot`,
+         default `depot`).
       2. Maintain a set of unvisited POIs (all non-depot POIs).
       3. Repeat:
-         a. Filter unvisited POIs → keep only those passing `try_add_poi`.
+         a. Filter unvisited POIs → keep only those that can be inserted
+            before the trailing Depot (O(1) `can_insert` on the schedule).
+            Only POIs whose time window is reachable from the current stop
+            (`PoiIndex`) are tried at all.
          b. Compute Labadie ratio for each valid candidate.
-         c. Sort descending → build RCL from Top-k.
-         d. Pick one random POI from the RCL → append to route.
-      4. When no more valid POIs can be added, append Depot and return.
+         c. Keep the Top-k by ratio → Restricted Candidate List.
+         d. Pick one random POI from the RCL → insert before the Depot.
+      4. When no more valid POIs can be added, close the day: for a
+         multi-day trip insert a separator (the Depot) and continue with
+         the next day; after the last day, return.
+
+    initialize_population() dùng chung một _LabadieBuilder cho mọi cá thể;
+    hàm này dựng builder riêng cho một lần gọi.
     """
-    route: List[POI] = [depot]
-    unvisited = {p.id for p in pois if p.id != depot.id}
-    poi_map = {p.id: p for p in pois}
-
-    while unvisited:
-        current = route[-1]
-
-        # --- Filter: only POIs that can be feasibly inserted ---
-        candidates = []
-        for pid in list(unvisited):
-            poi = poi_map[pid]
-            if try_add_poi(route, poi, user_prefs):
-                ratio = _labadie_ratio(poi, current, user_prefs)
-                candidates.append((poi, ratio))
-
-        if not candidates:
-            break  # No feasible POI left
-
-        # --- Sort by desirability ratio (descending) ---
-        candidates.sort(key=lambda x: x[1], reverse=True)
-
-        # --- Restricted Candidate List (Top-k) ---
-        rcl = candidates[:RCL_SIZE]
-
-        # --- Random pick from RCL ---
-        chosen_poi, _ = random.choice(rcl)
-
-        route.append(chosen_poi)
-        unvisited.discard(chosen_poi.id)
-
-    # Close route at Depot
-    route.append(depot)
-    return Individual(route=route)
+    if index is None:
+        index = get_poi_index(dist)
+    return _LabadieBuilder(pois, depot, user_prefs, dist, index, end_depot or depot).build()
 
 
 # =============================================================================
@@ -108,25 +196,37 @@ def _create_random_individual(
     pois: List[POI],
     depot: POI,
     user_prefs: UserPreferences,
+    dist: DistanceMatrix,
+    end_depot: Optional[POI] = None,
 ) -> Individual:
     """
     Build ONE individual using Pure Random insertion:
-      1. Start with route = [Depot].
+      1. Start with route = [Depot, End] and its schedule.
       2. Shuffle all non-depot POIs randomly.
-      3. Iterate: if adding the POI satisfies constraints, append it.
-      4. When done, append Depot and return.
+      3. Iterate: if inserting the POI before the trailing Depot satisfies
+         constraints (O(1) `can_insert`), insert it.
+      4. Multi-day: close the day with a separator (the Depot) and repeat
+         step 3 on the POIs not inserted yet.
     """
-    route: List[POI] = [depot]
-    candidates = [p for p in pois if p.id != depot.id]
+    end_depot = end_depot or depot
+    ind = Individual(route=[depot, end_depot])
+    compute_schedule(ind, user_prefs, dist)
+    candidates = [p for p in pois if p.id != depot.id and p.id != end_depot.id]
     random.shuffle(candidates)
 
-    for poi in candidates:
-        if try_add_poi(route, poi, user_prefs):
-            route.append(poi)
+    for day in range(user_prefs.days):
+        if day:
+            insert_poi(ind, len(ind.route) - 1, depot, user_prefs, dist)
+        skipped = []
+        for poi in candidates:
+            tail = len(ind.route) - 1
+            if can_insert(ind, tail, poi, user_prefs, dist):
+                insert_poi(ind, tail, poi, user_prefs, dist)
+            else:
+                skipped.append(poi)
+        candidates = skipped
 
-    # Close route at Depot
-    route.append(depot)
-    return Individual(route=route)
+    return ind
 
 
 # =============================================================================
@@ -136,55 +236,93 @@ def _create_random_individual(
 def initialize_population(
     pois: List[POI],
     user_prefs: UserPreferences,
+    dist: DistanceMatrix,
+    deadline: Optional[float] = None,
+    depot: Optional[POI] = None,
+    end_depot: Optional[POI] = None,
+    index: Optional[PoiIndex] = None,
 ) -> List[Individual]:
     """
     Generate the initial population of 50 individuals:
       • 40 via Randomized Insertion Heuristic  (high quality + diversity)
       • 10 via Pure Random                     (exploration / diversity)
 
+    If `deadline` (time.perf_counter()) passes, construction stops early and
+    the population is truncated — it always holds at least one individual.
+
     Every route is guaranteed to:
-      ✓ Start and end at the Depot (POI id == 0)
-      ✓ Pass check_constraints before any POI is appended
+      ✓ Start at user_prefs.start_node_id and end at user_prefs.end_node
+        (start_node_id unless end_node_id is given)
+      ✓ Stay feasible (same rules as check_constraints) after every insertion
 
     Parameters
     ----------
     pois : list[POI]
-        All available Points of Interest (including the depot at index 0).
+        All available Points of Interest (including the start / end nodes).
     user_prefs : UserPreferences
         User constraints (budget, time window, interests).
+    dist : DistanceMatrix
+        Pre-computed travel times for `pois`.
+    deadline : float, optional
+        Wall-clock limit (time.perf_counter()) for construction.
+    depot, end_depot : POI, optional
+        Start / end POI objects (e.g. PoiCatalogue.endpoint views); looked
+        up in `pois` by user_prefs.start_node_id / end_node when omitted.
+    index : PoiIndex, optional
+        Candidate index of `dist` (default: the cached index of `dist`).
 
     Returns
     -------
     list[Individual]
-        Population of size 50.
+        Population of size 50 (fewer if the deadline was hit).
     """
-    depot = next((p for p in pois if p.id == 0), None)
-    if depot is None:
-        raise ValueError("Depot (POI id=0) not found in the POI list.")
+    if depot is None or end_depot is None:
+        by_id = {p.id: p for p in pois}
+        depot = depot or by_id.get(user_prefs.start_node_id)
+        end_depot = end_depot or by_id.get(user_prefs.end_node)
+    if depot is None or end_depot is None:
+        raise ValueError(
+            f"Start / end node ({user_prefs.start_node_id} → {user_prefs.end_node}) "
+            f"not found in the POI list."
+        )
 
     population: List[Individual] = []
+    if index is None:
+        index = get_poi_index(dist)
 
-    # --- Strategy 1: Heuristic individuals ---
+    def expired() -> bool:
+        return deadline is not None and time.perf_counter() >= deadline
+
+    # --- Strategy 1: Heuristic individuals (dùng chung trạng thái dựng) ---
+    builder = _LabadieBuilder(pois, depot, user_prefs, dist, index, end_depot)
     for i in range(HEURISTIC_COUNT):
-        ind = _create_heuristic_individual(pois, depot, user_prefs)
-        population.append(ind)
+        if population and expired():
+            break
+        population.append(builder.build())
+    heuristic_count = len(population)
 
     # --- Strategy 2: Random individuals ---
     for i in range(RANDOM_COUNT):
-        ind = _create_random_individual(pois, depot, user_prefs)
+        if expired():
+            break
+        ind = _create_random_individual(pois, depot, user_prefs, dist, end_depot)
         population.append(ind)
 
-    assert len(population) == POPULATION_SIZE, (
+    assert len(population) == POPULATION_SIZE or expired(), (
         f"Expected {POPULATION_SIZE} individuals, got {len(population)}"
     )
 
-    # --- Summary log ---
-    heuristic_lens = [len(ind.route) for ind in population[:HEURISTIC_COUNT]]
-    random_lens = [len(ind.route) for ind in population[HEURISTIC_COUNT:]]
-    print(f"[Init] Population created: {POPULATION_SIZE} individuals")
-    print(f"       Heuristic ({HEURISTIC_COUNT}): avg route length = "
-          f"{sum(heuristic_lens)/len(heuristic_lens):.1f}")
-    print(f"       Random    ({RANDOM_COUNT}):  avg route length = "
-          f"{sum(random_lens)/len(random_lens):.1f}")
+    # --- Summary log (chỉ tính khi DEBUG) ---
+    if logger.isEnabledFor(logging.DEBUG):
+        heuristic_lens = [len(ind.route) for ind in population[:heuristic_count]]
+        random_lens = [len(ind.route) for ind in population[heuristic_count:]]
+        truncated = " (truncated by time budget)" if len(population) < POPULATION_SIZE else ""
+        logger.debug(
+            "Population created: %d individuals%s | Heuristic (%d): avg route length = %.1f"
+            " | Random (%d): avg route length = %.1f",
+            len(population), truncated,
+            len(heuristic_lens), sum(heuristic_lens) / max(len(heuristic_lens), 1),
+            len(random_lens), sum(random_lens) / max(len(random_lens), 1),
+        )
 
     return population
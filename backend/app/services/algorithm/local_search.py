@@ -0,0 +1,243 @@
+"""
+Local Search (Memetic stage) cho Hybrid GA.
+
+Áp dụng lên các cá thể ưu tú (elites) sau mỗi thế hệ, trong giới hạn thời
+gian, theo kiểu Variable Neighborhood Descent với 3 lân cận:
+
+  1. 2-opt (best-improvement)  – đảo đoạn route[i..j] để tạo cạnh mới
+                                 (route[i-1], route[j]) với route[j] nằm trong
+                                 danh sách láng giềng gần nhất của route[i-1].
+  2. Or-opt (relocate)         – dời một đoạn 1..3 POI liên tiếp tới trước/sau
+                                 một láng giềng gần của POI đầu đoạn.
+  3. Swap-in / Swap-out        – chèn POI chưa đi (gần route[k-1]) vào trước
+                                 route[k], hoặc thay route[k] bằng POI đó.
+
+Mỗi lân cận chỉ xét k láng giềng gần nhất (DistanceMatrix.neighbors) nên mỗi
+lượt sinh O(n·k) bước ứng viên thay vì O(n²). Mỗi bước được chấm bằng delta
+evaluation — mô phỏng tiếp từ prefix cache trên phần đuôi, O(n − i) — nên
+một lượt tốn O(n²·k) trong trường hợp xấu nhất (cửa sổ thời gian khiến mọi
+thay đổi lan tới cuối route). Bước ứng viên chỉ lưu (delta, tham số); route
+mới chỉ được dựng cho bước được chọn. Bước cải thiện tốt nhất được áp dụng
+nếu route vẫn thỏa check_constraints (khi route ban đầu khả thi). Sau mỗi
+bước cải thiện, quay lại lân cận đầu tiên.
+
+Chuyến đi nhiều ngày: separator (Depot lặp lại) không phải đích của láng
+giềng và không bị thay bởi Swap-out, nhưng vẫn di chuyển theo đoạn bị đảo /
+dời — nên 2-opt và Or-opt cũng chuyển POI giữa các tour trong ngày.
+"""
+
+import time
+from typing import Callable, Mapping, Optional
+
+from app.models.domain import POI, Individual
+from app.models.schemas import UserPreferences
+from app.services.algorithm.fitness import DistanceMatrix, check_constraints
+from app.services.algorithm.delta import (
+    compute_prefix,
+    delta_insert,
+    delta_or_opt,
+    delta_tail,
+    delta_two_opt,
+    ensure_prefix,
+    or_opt_route,
+)
+
+# ─── Constants ───────────────────────────────────────────────────────────────
+NEIGHBOR_COUNT  = 10     # k láng giềng gần nhất cho mỗi POI
+OR_OPT_MAX_LEN  = 3      # Độ dài đoạn tối đa cho Or-opt
+MIN_IMPROVEMENT = 1e-6   # Delta tối thiểu để tính là cải thiện
+
+# Một bước di chuyển ứng viên: (delta, a, b, c) — a, b, c là tham số của bước
+# theo từng lân cận; route mới chỉ được dựng (Builder) khi bước được chọn.
+Move = tuple[float, int, int, int]
+Builder = Callable[[list[POI], int, int, int], list[POI]]
+
+
+# =============================================================================
+#  Neighborhoods — mỗi hàm trả về danh sách bước CẢI THIỆN
+# =============================================================================
+
+def _interior_positions(route: list[POI]) -> dict[int, int]:
+    separator = route[0].id
+    return {route[k].id: k for k in range(1, len(route) - 1) if route[k].id != separator}
+
+
+def _two_opt_moves(ind: Individual, neighbors: list[list[int]],
+                   user_prefs: UserPreferences, dist: DistanceMatrix) -> list[Move]:
+    """Moves (delta, i, j, 0): reverse route[i..j]."""
+    route = ind.route
+    pos = _interior_positions(route)
+    moves: list[Move] = []
+
+    for i in range(1, len(route) - 2):
+        for c_id in neighbors[route[i - 1].id]:
+            j = pos.get(c_id)
+            if j is None or j <= i:
+                continue
+            delta = delta_two_opt(ind, i, j, user_prefs, dist)
+            if delta > MIN_IMPROVEMENT:
+                moves.append((delta, i, j, 0))
+    return moves
+
+
+def _build_two_opt(route: list[POI], i: int, j: int, _: int) -> list[POI]:
+    return route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+
+
+def _or_opt_moves(ind: Individual, neighbors: list[list[int]],
+                  user_prefs: UserPreferences, dist: DistanceMatrix) -> list[Move]:
+    """
+    Moves (delta, i, seg_len, at): move route[i:i+seg_len] to position `at`
+    of the route without the segment.
+    """
+    route = ind.route
+    n = len(route)
+    pos = _interior_positions(route)
+    moves: list[Move] = []
+
+    for seg_len in range(1, OR_OPT_MAX_LEN + 1):
+        for i in range(1, n - seg_len):
+            end = i + seg_len
+            for c_id in neighbors[route[i].id]:
+                p = pos.get(c_id)
+                if p is None or i <= p < end:
+                    continue  # Không phải POI interior, hoặc nằm trong đoạn
+                # Vị trí của c trong route đã bỏ đoạn
+                q = p if p < i else p - seg_len
+                # Chèn đoạn ngay trước hoặc ngay sau láng giềng c
+                for at in (q, q + 1):
+                    if at == i:
+                        continue  # Trùng vị trí cũ
+                    delta = delta_or_opt(ind, i, seg_len, at, user_prefs, dist)
+                    if delta > MIN_IMPROVEMENT:
+                        moves.append((delta, i, seg_len, at))
+    return moves
+
+
+def _swap_moves(ind: Individual, neighbors: list[list[int]],
+                poi_map: Mapping[int, POI],
+                user_prefs: UserPreferences, dist: DistanceMatrix) -> list[Move]:
+    """Moves (delta, k, u_id, out): insert u before route[k] (out=0) or replace it (out=1)."""
+    route = ind.route
+    n = len(route)
+    visited = set(ind.ids)
+    moves: list[Move] = []
+
+    for k in range(1, n):
+        for u_id in neighbors[route[k - 1].id]:
+            if u_id in visited:
+                continue
+            u = poi_map[u_id]
+
+            # Swap-in: chèn u trước route[k]
+            delta = delta_insert(ind, k, u, user_prefs, dist)
+            if delta > MIN_IMPROVEMENT:
+                moves.append((delta, k, u_id, 0))
+
+            # Swap-out: thay route[k] bằng u (chỉ với POI interior, không phải separator)
+            if k < n - 1 and route[k].id != route[0].id:
+                delta = delta_tail(ind, k, [u] + route[k + 1:], user_prefs, dist)
+                if delta > MIN_IMPROVEMENT:
+                    moves.append((delta, k, u_id, 1))
+    return moves
+
+
+# =============================================================================
+#  PUBLIC API
+# =============================================================================
+
+def improve_individual(
+    ind: Individual,
+    poi_map: Mapping[int, POI],
+    user_prefs: UserPreferences,
+    dist: DistanceMatrix,
+    deadline: float,
+    neighbor_count: int = NEIGHBOR_COUNT,
+) -> bool:
+    """
+    Run VND (2-opt → Or-opt → Swap-in/out) on `ind` in place until no
+    neighborhood improves or `deadline` (time.perf_counter()) passes.
+
+    Fitness fields and caches of `ind` are kept up to date.
+    Returns True if the route was improved.
+    """
+    if ind.local_optimum:
+        return False
+
+    neighbors = dist.neighbors(neighbor_count)
+    ensure_prefix(ind, user_prefs, dist)
+    require_feasible = check_constraints(ind.route, user_prefs, dist)
+
+    def build_swap(route: list[POI], k: int, u_id: int, out: int) -> list[POI]:
+        return route[:k] + [poi_map[u_id]] + route[k + out:]
+
+    neighborhoods: list[tuple[Callable[[], list[Move]], Builder]] = [
+        (lambda: _two_opt_moves(ind, neighbors, user_prefs, dist), _build_two_opt),
+        (lambda: _or_opt_moves(ind, neighbors, user_prefs, dist), or_opt_route),
+        (lambda: _swap_moves(ind, neighbors, poi_map, user_prefs, dist), build_swap),
+    ]
+
+    improved = False
+    level = 0
+    while level < len(neighborhoods):
+        if time.perf_counter() >= deadline:
+            return improved
+
+        generate, build = neighborhoods[level]
+        accepted = _best_feasible(ind.route, generate(), build, require_feasible,
+                                  user_prefs, dist)
+        if accepted is None:
+            level += 1
+            continue
+
+        ind.route = accepted
+        compute_prefix(ind, user_prefs, dist)
+        improved = True
+        level = 0
+
+    ind.local_optimum = True
+    return improved
+
+
+def _best_feasible(route: list[POI], moves: list[Move], build: Builder,
+                   require_feasible: bool, user_prefs: UserPreferences,
+                   dist: DistanceMatrix) -> Optional[list[POI]]:
+    moves.sort(key=lambda m: m[0], reverse=True)
+    for _, a, b, c in moves:
+        candidate = build(route, a, b, c)
+        if not require_feasible or check_constraints(candidate, user_prefs, dist):
+            return candidate
+    return None
+
+
+def improve_elites(
+    population: list[Individual],
+    count: int,
+    poi_map: Mapping[int, POI],
+    user_prefs: UserPreferences,
+    dist: DistanceMatrix,
+    budget_ms: float,
+) -> int:
+    """
+    Apply `improve_individual` to the first `count` individuals of a
+    population sorted by fitness, sharing one wall-clock budget.
+
+    Each elite is searched on a copy; an improved copy REPLACES the elite in
+    `population`, so the original object (which may also be the engine's
+    best_ever, or an emigrant) never changes under its other references.
+    Returns the number of improved individuals.
+    """
+    deadline = time.perf_counter() + budget_ms / 1000.0
+    improved = 0
+    for k, ind in enumerate(population[:count]):
+        if time.perf_counter() >= deadline:
+            break
+        if ind.local_optimum:
+            continue
+        trial = ind.copy()
+        if improve_individual(trial, poi_map, user_prefs, dist, deadline):
+            population[k] = trial
+            improved += 1
+        else:
+            ind.local_optimum = trial.local_optimum
+    return improved
@@ -0,0 +1,182 @@
+"""
+Matrix Store — ma trận thời gian di chuyển trên đĩa cho catalogue lớn.
+
+Ma trận dense float64 trong RAM (+ list-of-lists `rows`) chỉ hợp với vài
+nghìn POI: với 20k POI nó chiếm ~3 GB dạng Python float. Module này dựng
+ma trận MỘT lần ra file rồi để mọi worker map read-only (page cache của OS
+được chia sẻ giữa các process, khởi động gần như tức thì):
+
+  • mmap   – ma trận dense float32 `<tên>-<key>.f32.npy` (N² × 4 byte),
+             mở bằng np.load(mmap_mode='r').
+  • sparse – chỉ lưu k láng giềng gần nhất của mỗi POI
+             (`<tên>-<key>.knn.ids.npy` / `.knn.times.npy`, N × k); cặp
+             (i, j) ngoài danh sách dùng khoảng cách Euclid tính từ tọa độ.
+             Các file có thể được sinh bởi công cụ định tuyến bên ngoài
+             (thời gian đường bộ thật) miễn là cùng bố cục.
+
+Tên file chứa dataset key (dấu vân tay nội dung POI) nên dữ liệu đổi là
+tự dùng file mới. File được dựng theo từng khối hàng (bộ nhớ tạm bị chặn)
+và ghi ra tệp tạm rồi os.replace().
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from app.services.algorithm.fitness import DistanceMatrix, PoiColumns
+
+logger = logging.getLogger(__name__)
+
+# ─── Constants ───────────────────────────────────────────────────────────────
+MATRIX_MODES = ('dense', 'mmap', 'sparse')
+DEFAULT_SPARSE_K = 64
+_BUILD_CHUNK_ROWS = 1024   # Số hàng tính mỗi khối khi dựng file
+
+
+def _euclidean_block(columns: PoiColumns, lo: int, hi: int) -> np.ndarray:
+    dx = columns.x[lo:hi, None] - columns.x[None, :]
+    dy = columns.y[lo:hi, None] - columns.y[None, :]
+    return np.sqrt(dx * dx + dy * dy)
+
+
+class SparseTravelTimes:
+    """
+    Read-only N×N array-like backed by k-nearest travel times per row, with
+    Euclidean fallback for every other pair.
+
+    Supports the indexing DistanceMatrix users need: `a[i]`, `a[lo:hi]`
+    (float64 rows) and `a[I, J]` (element-wise pairs).
+    """
+
+    def __init__(self, columns: PoiColumns, ids: np.ndarray, times: np.ndarray):
+        self.columns = columns
+        self.ids = ids          # (N, k) int32 — láng giềng, gần trước
+        self.times = times      # (N, k) float32 — thời gian tới từng láng giềng
+        self.shape = (columns.size, columns.size)
+        self.dtype = np.dtype(np.float64)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def tolist(self) -> list[list[float]]:
+        return self._rows(0, self.shape[0]).tolist()
+
+    def _rows(self, lo: int, hi: int) -> np.ndarray:
+        block = _euclidean_block(self.columns, lo, hi)
+        block[np.arange(hi - lo)[:, None], self.ids[lo:hi]] = self.times[lo:hi]
+        return block
+
+    def __getitem__(self, item):
+        if isinstance(item, tuple):
+            rows, cols = (np.asarray(a) for a in item)
+            x, y = self.columns.x, self.columns.y
+            dx = x[rows] - x[cols]
+            dy = y[rows] - y[cols]
+            fallback = np.sqrt(dx * dx + dy * dy)
+            match = self.ids[rows] == cols[..., None]
+            known = np.take_along_axis(self.times[rows], match.argmax(axis=-1)[..., None],
+                                       axis=-1)[..., 0]
+            return np.where(match.any(axis=-1), known, fallback)
+        if isinstance(item, slice):
+            lo, hi, step = item.indices(self.shape[0])
+            if step != 1:
+                raise IndexError("SparseTravelTimes only supports contiguous row slices")
+            return self._rows(lo, hi)
+        i = int(item)
+        return self._rows(i, i + 1)[0]
+
+
+# =============================================================================
+#  File layout
+# =============================================================================
+
+def dense_path(directory: Path, name: str, key: str) -> Path:
+    return directory / f"{name}-{key}.f32.npy"
+
+
+def sparse_paths(directory: Path, name: str, key: str) -> tuple[Path, Path]:
+    return (directory / f"{name}-{key}.knn.ids.npy",
+            directory / f"{name}-{key}.knn.times.npy")
+
+
+def _tmp(path: Path) -> Path:
+    return path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+
+def build_dense_file(columns: PoiColumns, path: Path) -> None:
+    """Write the float32 Euclidean matrix of `columns` to `path` (.npy)."""
+    n = columns.size
+    tmp = _tmp(path)
+    out = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float32, shape=(n, n))
+    for lo in range(0, n, _BUILD_CHUNK_ROWS):
+        hi = min(lo + _BUILD_CHUNK_ROWS, n)
+        out[lo:hi] = _euclidean_block(columns, lo, hi)
+    out.flush()
+    del out
+    os.replace(tmp, path)
+
+
+def build_sparse_files(columns: PoiColumns, paths: tuple[Path, Path], k: int) -> None:
+    """Write the k nearest neighbors (ids + travel times) of every POI."""
+    n = columns.size
+    k = min(k, max(n - 1, 0))
+    ids = np.empty((n, k), dtype=np.int32)
+    times = np.empty((n, k), dtype=np.float32)
+    for lo in range(0, n, _BUILD_CHUNK_ROWS):
+        hi = min(lo + _BUILD_CHUNK_ROWS, n)
+        block = _euclidean_block(columns, lo, hi)
+        block[np.arange(hi - lo), np.arange(lo, hi)] = np.inf   # bỏ chính nó
+        if k > 0:
+            nearest = np.argpartition(block, k - 1, axis=1)[:, :k]
+            near_t = np.take_along_axis(block, nearest, axis=1)
+            order = near_t.argsort(axis=1, kind='stable')
+            ids[lo:hi] = np.take_along_axis(nearest, order, axis=1)
+            times[lo:hi] = np.take_along_axis(near_t, order, axis=1)
+
+    for path, array in zip(paths, (ids, times)):
+        tmp = _tmp(path)
+        with open(tmp, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp, path)
+
+
+# =============================================================================
+#  Open (build on first use)
+# =============================================================================
+
+def open_matrix(mode: str, directory: Path, name: str, key: str,
+                columns: PoiColumns, sparse_k: int = DEFAULT_SPARSE_K,
+                build: bool = True) -> Optional[DistanceMatrix]:
+    """
+    Memory-map the on-disk matrix of dataset `name` in `mode` ('mmap' or
+    'sparse'), building the file(s) first if missing and `build` is set.
+    Returns None if the files do not exist and `build` is False.
+    """
+    if mode not in MATRIX_MODES or mode == 'dense':
+        raise ValueError(f"Unsupported matrix mode {mode!r}; expected 'mmap' or 'sparse'")
+
+    directory.mkdir(parents=True, exist_ok=True)
+    if mode == 'mmap':
+        path = dense_path(directory, name, key)
+        if not path.is_file():
+            if not build:
+                return None
+            build_dense_file(columns, path)
+            logger.info("Built %d×%d float32 matrix → %s", columns.size, columns.size, path.name)
+        array = np.load(path, mmap_mode='r')
+        return DistanceMatrix(key, array, columns, path=str(path))
+
+    paths = sparse_paths(directory, name, key)
+    ids_path, times_path = paths
+    if not (ids_path.is_file() and times_path.is_file()):
+        if not build:
+            return None
+        build_sparse_files(columns, paths, sparse_k)
+        logger.info("Built %d-NN sparse matrix for %d POIs → %s",
+                    sparse_k, columns.size, ids_path.name)
+    array = SparseTravelTimes(columns, np.load(ids_path, mmap_mode='r'),
+                              np.load(times_path, mmap_mode='r'))
+    return DistanceMatrix(key, array, columns, path=str(ids_path))
@@ -0,0 +1,94 @@
+"""
+POI Index — k láng giềng gần nhất + tương thích khung giờ (time window).
+
+Được dựng MỘT lần cho mỗi DistanceMatrix (cache theo dataset key), để các
+bước sinh ứng viên (Labadie heuristic, Insertion Mutation) chỉ thử những POI
+có thể chèn được thay vì quét toàn bộ catalogue mỗi lần:
+
+  • nearest[i]    – k POI gần i nhất (gần trước).
+  • reachable[i]  – các POI j (tăng dần theo id) có thể đi NGAY SAU i mà vẫn
+                    kịp giờ đóng cửa, kể cả khi bắt đầu tham quan i sớm nhất:
+                        open_i + duration_i + t(i, j) ≤ close_j
+                    Đây là điều kiện CẦN (không loại nhầm POI khả thi), vì giờ
+                    rời i luôn ≥ open_i + duration_i.
+  • reachable_from_start() – như trên cho điểm xuất phát route[0], nơi ta rời
+                    đi ngay tại start_time của request (không cộng duration).
+                    Kết quả được cache theo (điểm xuất phát, start_time) —
+                    request xuất phát từ cùng khách sạn / cùng giờ dùng lại.
+
+reachable được tính theo từng khối hàng NumPy nên bộ nhớ tạm bị chặn, dùng
+được cho catalogue hàng nghìn POI.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from app.services.algorithm.fitness import DistanceMatrix
+
+# ─── Constants ───────────────────────────────────────────────────────────────
+DEFAULT_K = 15      # Số láng giềng gần nhất cho mỗi POI
+_CHUNK_ROWS = 512   # Số hàng xử lý mỗi khối khi dựng reachable
+_START_CACHE_SIZE = 256   # Số cặp (điểm xuất phát, start_time) giữ lại mỗi index
+
+
+class PoiIndex:
+    """k-nearest-neighbor and time-window-compatibility lists per POI id."""
+
+    def __init__(self, dist: DistanceMatrix, k: int = DEFAULT_K):
+        cols = dist.columns
+        n = dist.size
+        self.k = min(k, max(n - 1, 0))
+        self.nearest: list[list[int]] = dist.neighbors(self.k)
+
+        earliest_departure = cols.open_time + cols.duration
+        reachable: list[list[int]] = []
+        for lo in range(0, n, _CHUNK_ROWS):
+            hi = min(lo + _CHUNK_ROWS, n)
+            block = (earliest_departure[lo:hi, None] + dist.array[lo:hi]
+                     <= cols.close_time[None, :])
+            block[np.arange(hi - lo), np.arange(lo, hi)] = False   # bỏ chính nó
+            reachable.extend(np.flatnonzero(row).tolist() for row in block)
+        self.reachable = reachable
+        self._dist = dist
+        self._start_cache: OrderedDict[tuple[int, float], tuple[int, ...]] = OrderedDict()
+        self._start_lock = threading.Lock()
+
+    def reachable_from_start(self, start_id: int, start_time: float) -> tuple[int, ...]:
+        """POI ids (ascending) whose window is still open when reached directly
+        from `start_id` leaving at `start_time` (LRU-cached per depot)."""
+        key = (start_id, start_time)
+        with self._start_lock:
+            cached = self._start_cache.get(key)
+            if cached is not None:
+                self._start_cache.move_to_end(key)
+                return cached
+
+        cols = self._dist.columns
+        ok = start_time + np.asarray(self._dist.array[start_id]) <= cols.close_time
+        ok[start_id] = False
+        result = tuple(np.flatnonzero(ok).tolist())
+
+        with self._start_lock:
+            self._start_cache[key] = result
+            if len(self._start_cache) > _START_CACHE_SIZE:
+                self._start_cache.popitem(last=False)
+        return result
+
+
+_INDEX_CACHE: dict[tuple[str, int], PoiIndex] = {}
+_INDEX_LOCK = threading.Lock()
+
+
+def get_poi_index(dist: DistanceMatrix, k: int = DEFAULT_K) -> PoiIndex:
+    """Return the cached PoiIndex of `dist`, building it on first use."""
+    key = (dist.key, k)
+    index = _INDEX_CACHE.get(key)
+    if index is None:
+        with _INDEX_LOCK:
+            index = _INDEX_CACHE.get(key)
+            if index is None:
+                index = PoiIndex(dist, k)
+                _INDEX_CACHE[key] = index
+    return index
@@ -0,0 +1,80 @@
+"""
+Solver Profiler — bộ đếm + đồng hồ theo từng pha của vòng lặp HGA.
+
+`instrument(engine)` bọc các method toán tử của MỘT instance engine
+(selection, crossover, mutation, repair, diversity, evaluation, local search,
+init) bằng hàm đo thời gian; code của step() không đổi. Mặc định TẮT — bật
+bằng HGA_PROFILING=1; khi tắt engine không có profiler nên không tốn gì thêm.
+
+Kết quả (`snapshot()`) là SolverProfile: tổng thời gian (ms) + số lần gọi mỗi
+pha và các bộ đếm (fitness_evaluations, duplicates_replaced, ...). Các pha có
+thể lồng nhau: `init` đã gồm lượt `evaluation` đầu tiên.
+"""
+
+import os
+import time
+from typing import Any, Callable, Mapping, Optional
+
+from app.models.schemas import SolverProfile
+
+PROFILING_ENABLED = os.getenv("HGA_PROFILING", "").strip().lower() in ("1", "true", "yes", "on")
+
+# Pha → tên method được bọc trên engine
+PHASE_METHODS = {
+    'init':         'initialize_population',
+    'selection':    'select_parents',
+    'crossover':    'crossover',
+    'mutation':     'mutate',
+    'repair':       '_repair',
+    'diversity':    '_is_duplicate',
+    'evaluation':   '_evaluate',
+    'local_search': '_local_search',
+}
+
+
+class SolverProfiler:
+    """Per-solve phase timers and counters."""
+
+    def __init__(self):
+        self.seconds: dict[str, float] = dict.fromkeys(PHASE_METHODS, 0.0)
+        self.calls: dict[str, int] = dict.fromkeys(PHASE_METHODS, 0)
+        self.counters: dict[str, int] = {}
+
+    def timed(self, phase: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        seconds, calls = self.seconds, self.calls
+        perf_counter = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            t0 = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                seconds[phase] += perf_counter() - t0
+                calls[phase] += 1
+        return wrapper
+
+    def instrument(self, engine: Any) -> None:
+        """Wrap the phase methods of `engine` (instance attributes only)."""
+        for phase, attr in PHASE_METHODS.items():
+            setattr(engine, attr, self.timed(phase, getattr(engine, attr)))
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, profile: Optional[Mapping[str, Any]]) -> None:
+        """Add a snapshot (as dict) of another profiler, e.g. from an island epoch."""
+        if not profile:
+            return
+        for phase, ms in profile.get("timings_ms", {}).items():
+            self.seconds[phase] = self.seconds.get(phase, 0.0) + ms / 1000.0
+        for phase, n in profile.get("calls", {}).items():
+            self.calls[phase] = self.calls.get(phase, 0) + n
+        for name, n in profile.get("counters", {}).items():
+            self.count(name, n)
+
+    def snapshot(self) -> SolverProfile:
+        return SolverProfile(
+            timings_ms={phase: round(s * 1000.0, 3) for phase, s in self.seconds.items()},
+            calls=dict(self.calls),
+            counters=dict(self.counters),
+        )
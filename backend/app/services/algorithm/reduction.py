@@ -0,0 +1,198 @@
+"""
+Problem Reduction — loại trước các POI không thể ghé và đánh lại chỉ số.
+
+Trước khi GA chạy, mỗi request được thu về một bài toán con gọn: chỉ giữ các
+POI mà một lộ trình khả thi CÓ THỂ chứa, theo các điều kiện cần (vectorized,
+O(N) mỗi request):
+
+  • score × interest_weight > 0  – POI không đem lại điểm (kể cả depot gốc
+                                   khi nó không phải điểm đầu/cuối)
+  • price ≤ budget
+  • start_time + t(start, i) ≤ close_i
+                                 – vẫn kịp giờ đóng cửa khi đi thẳng từ điểm
+                                   xuất phát
+  • max(start_time + t(start, i), open_i) + duration_i + t(i, end) ≤ end_time
+                                 – vòng start → i → end vừa trong ngày
+                                   (nhiều ngày: về end HOẶC về start)
+
+Hai điều kiện thời gian dựa trên bất đẳng thức tam giác của ma trận (đi
+thẳng không chậm hơn đi vòng) — cùng giả thiết với PoiIndex.
+
+Bài toán con đánh chỉ số lại 0..n-1: 0 = điểm xuất phát, 1 = điểm kết thúc
+(nếu khác), sau đó là các POI được giữ (tăng dần theo id gốc). Mọi cấu trúc
+theo id (ma trận, PoiColumns, PoiIndex, láng giềng, khóa Zobrist) thu nhỏ
+theo, nên mọi toán tử và mọi lượt quét mỗi thế hệ chỉ chạm các POI khả dĩ.
+`original_ids` ánh xạ ngược về id của catalogue cho response.
+
+Bài toán con được cache (LRU) theo (dataset, điểm đầu/cuối, tập POI giữ
+lại): các request khác sở thích nhưng cùng tập ứng viên dùng lại ma trận +
+index đã dựng.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Mapping
+
+import numpy as np
+
+from app.models.domain import POI, PoiCatalogue
+from app.models.schemas import UserPreferences
+from app.services.algorithm.fitness import DistanceMatrix, PoiColumns
+from app.services.algorithm.poi_index import PoiIndex
+
+# ─── Constants ───────────────────────────────────────────────────────────────
+_DENSE_MAX = 2048         # n lớn hơn → ma trận con là view (không copy n²)
+_CHUNK_ROWS = 256         # Số hàng mỗi khối khi trích ma trận con
+_CACHE_SIZE = 64          # Số bài toán con giữ lại mỗi process
+
+
+class SubTravelTimes:
+    """
+    Read-only n×n view of a parent travel-time array restricted to `ids`
+    (local index → parent index), for sub-problems too large to copy.
+
+    Supports the indexing DistanceMatrix users need: `a[i]`, `a[lo:hi]`
+    (float64 rows) and `a[I, J]` (element-wise pairs).
+    """
+
+    def __init__(self, parent, ids: np.ndarray):
+        self.parent = parent
+        self.ids = ids
+        self.shape = (len(ids), len(ids))
+        self.dtype = np.dtype(np.float64)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def tolist(self) -> list[list[float]]:
+        return self._rows(0, self.shape[0]).tolist()
+
+    def _rows(self, lo: int, hi: int) -> np.ndarray:
+        ids = self.ids
+        if isinstance(self.parent, np.ndarray):
+            return np.asarray(self.parent[ids[lo:hi, None], ids[None, :]], dtype=np.float64)
+        # Array-like khác (VD: SparseTravelTimes) — lấy từng hàng gốc
+        return np.array([np.asarray(self.parent[i])[ids] for i in ids[lo:hi]],
+                        dtype=np.float64).reshape(hi - lo, len(ids))
+
+    def __getitem__(self, item):
+        if isinstance(item, tuple):
+            rows, cols = (np.asarray(a) for a in item)
+            return np.asarray(self.parent[self.ids[rows], self.ids[cols]], dtype=np.float64)
+        if isinstance(item, slice):
+            lo, hi, step = item.indices(self.shape[0])
+            if step != 1:
+                raise IndexError("SubTravelTimes only supports contiguous row slices")
+            return self._rows(lo, hi)
+        i = int(item)
+        return self._rows(i, i + 1)[0]
+
+
+class SubProblem:
+    """
+    Reindexed candidate set of one request.
+
+    `pois[k].id == k`; `pois[0]` is the start node and `end_depot` the end
+    node (`pois[1]` when distinct), both as PoiCatalogue.endpoint views.
+    `original_ids[k]` is the catalogue id of local POI k.
+    """
+
+    __slots__ = ('pois', 'by_id', 'original_ids', 'depot', 'end_depot', 'dist', 'index')
+
+    def __init__(self, pois: list[POI], original_ids: tuple[int, ...], distinct_end: bool,
+                 dist: DistanceMatrix, index: PoiIndex):
+        self.pois: tuple[POI, ...] = tuple(pois)
+        self.by_id: Mapping[int, POI] = MappingProxyType({p.id: p for p in self.pois})
+        self.original_ids = original_ids
+        self.depot = self.pois[0]
+        self.end_depot = self.pois[1] if distinct_end else self.depot
+        self.dist = dist
+        self.index = index
+
+    @property
+    def candidates(self) -> int:
+        """Number of visitable POIs (endpoints excluded)."""
+        return len(self.pois) - (1 if self.end_depot is self.depot else 2)
+
+    def __repr__(self):
+        return (f"SubProblem(candidates={self.candidates}, "
+                f"start={self.original_ids[0]}, key={self.dist.key})")
+
+
+def candidate_mask(dist: DistanceMatrix, user_prefs: UserPreferences,
+                   start_id: int, end_id: int) -> np.ndarray:
+    """Boolean mask over catalogue ids of POIs that pass every pruning rule."""
+    cols = dist.columns
+    n = dist.size
+    everyone = np.arange(n)
+    start_time = user_prefs.start_time_minutes
+
+    arrival = start_time + np.asarray(dist.array[start_id], dtype=np.float64)
+    ready = np.maximum(arrival, cols.open_time) + cols.duration
+    back = np.asarray(dist.array[everyone, np.full(n, end_id)], dtype=np.float64)
+    if user_prefs.days > 1 and end_id != start_id:
+        # Các ngày trước về start_node_id — chỉ cần MỘT ngày khả thi
+        back = np.minimum(back, dist.array[everyone, np.full(n, start_id)])
+
+    keep = ((cols.weighted_scores(user_prefs) > 0)
+            & (cols.price <= user_prefs.budget)
+            & (arrival <= cols.close_time)
+            & (ready + back <= user_prefs.end_time_minutes))
+    keep[[start_id, end_id]] = False
+    return keep
+
+
+def _sub_matrix(parent, ids: np.ndarray, key: str, pois: list[POI]) -> DistanceMatrix:
+    view = SubTravelTimes(parent, ids)
+    n = len(ids)
+    if n > _DENSE_MAX:
+        return DistanceMatrix(key, view, PoiColumns(pois))
+    array = np.empty((n, n), dtype=np.float64)
+    for lo in range(0, n, _CHUNK_ROWS):
+        hi = min(lo + _CHUNK_ROWS, n)
+        array[lo:hi] = view[lo:hi]
+    return DistanceMatrix(key, array, PoiColumns(pois))
+
+
+_SUB_CACHE: OrderedDict[str, SubProblem] = OrderedDict()
+_SUB_LOCK = threading.Lock()
+
+
+def reduce_problem(catalogue: PoiCatalogue, dist: DistanceMatrix,
+                   user_prefs: UserPreferences) -> SubProblem:
+    """
+    The pruned, reindexed sub-problem of `user_prefs` on `catalogue`.
+    Raises KeyError if the start / end node is not in the catalogue.
+    """
+    start = catalogue.endpoint(user_prefs.start_node_id)
+    end = start if user_prefs.end_node == start.id else catalogue.endpoint(user_prefs.end_node)
+
+    kept = np.flatnonzero(candidate_mask(dist, user_prefs, start.id, end.id))
+    endpoints = [start.id] if end is start else [start.id, end.id]
+    ids = np.concatenate([np.array(endpoints, dtype=np.intp), kept.astype(np.intp)])
+    digest = hashlib.sha1(ids.tobytes() + bytes([len(endpoints)])).hexdigest()[:12]
+    key = f"{dist.key}-{digest}"
+
+    with _SUB_LOCK:
+        sub = _SUB_CACHE.get(key)
+        if sub is not None:
+            _SUB_CACHE.move_to_end(key)
+            return sub
+
+    views = {start.id: start, end.id: end}
+    pois = []
+    for local, pid in enumerate(ids.tolist()):
+        p = views.get(pid) or catalogue.by_id[pid]
+        pois.append(POI(id=local, x=p.x, y=p.y, score=p.base_score,
+                        open_time=p.open_time, close_time=p.close_time,
+                        duration=p.duration, category=p.category, price=p.price))
+    matrix = _sub_matrix(dist.array, ids, key, pois)
+    sub = SubProblem(pois, tuple(ids.tolist()), end is not start, matrix, PoiIndex(matrix))
+
+    with _SUB_LOCK:
+        _SUB_CACHE[key] = sub
+        if len(_SUB_CACHE) > _CACHE_SIZE:
+            _SUB_CACHE.popitem(last=False)
+    return sub
@@ -0,0 +1,329 @@
+"""
+Route Schedule — Forward Time Slack bookkeeping cho TOPTW.
+
+Thay vì mô phỏng lại toàn bộ route (check_constraints, O(n)) cho MỖI vị trí
+chèn thử, mỗi Individual giữ sẵn lịch trình của route hiện tại:
+
+  • arrival[k]       – thời điểm đến vị trí k (trước khi chờ mở cửa)
+  • wait[k]          – thời gian chờ tại k
+  • start[k]         – thời điểm bắt đầu tham quan = max(arrival, open_time)
+  • latest_start[k]  – thời điểm bắt đầu muộn nhất tại k mà mọi điểm phía
+                       sau vẫn kịp giờ đóng cửa.
+                       MaxShift_k (forward slack) = latest_start[k] − start[k]
+  • route_cost       – tổng giá vé của route
+  • tw_violations    – số vị trí đến sau close_time
+
+Với bảng này, việc chèn POI j giữa k và k+1 được kiểm tra trong O(1):
+    start_j        = max(departure_k + t(k,j), open_j)       ≤ close_j
+    start_{k+1}'   = max(start_j + dur_j + t(j,k+1), open_{k+1})
+                                                             ≤ latest_start[k+1]
+    route_cost + price_j                                     ≤ budget
+
+Khi chèn/xóa thật, thời gian chỉ được lan truyền tiến cho tới khi start
+trùng lại giá trị cũ, và latest_start chỉ cập nhật lùi cho các vị trí phía
+trước — không tính lại toàn route.
+
+Ngữ nghĩa khả thi giống hệt check_constraints (time windows + budget; điểm
+xuất phát route[0] không xét time window và không cộng duration). Các giá
+trị tiến (arrival/wait/start) được tính đúng thứ tự phép toán như
+check_constraints nên trùng khớp từng bit; riêng latest_start là phép trừ
+lùi, nên khi biên an toàn < _EPS ta kiểm tra lại bằng lan truyền tiến.
+
+Nhiều ngày: separator (Depot xuất phát lặp lại ở interior) là điểm cuối của
+một ngày và điểm xuất phát của ngày sau — rời đi lúc start[0] (start_time),
+latest_start của nó là close_time của depot, nên lịch mỗi ngày độc lập và
+chèn/xóa chỉ lan truyền trong ngày bị sửa.
+"""
+
+from app.models.domain import POI, Individual
+from app.models.schemas import UserPreferences
+from app.services.algorithm.fitness import DistanceMatrix
+
+_EPS = 1e-9
+
+
+def _is_separator(route: list[POI], k: int) -> bool:
+    """Interior position k holds the start depot (day boundary)."""
+    return route[k].id == route[0].id and 0 < k < len(route) - 1
+
+
+# =============================================================================
+#  Full build — O(n)
+# =============================================================================
+
+def compute_schedule(ind: Individual, user_prefs: UserPreferences,
+                     dist: DistanceMatrix) -> None:
+    """(Re)build every schedule array of `ind` from scratch."""
+    route = ind.route
+    rows = dist.rows
+    n = len(route)
+
+    arrival = [0.0] * n
+    wait = [0.0] * n
+    start = [0.0] * n
+    cost = 0.0
+    violations = 0
+
+    current_time = user_prefs.start_time_minutes
+    if n:
+        arrival[0] = start[0] = current_time
+        separator = route[0].id
+
+    for k in range(1, n):
+        prev = route[k - 1]
+        poi = route[k]
+        a = current_time + rows[prev.id][poi.id]
+        arrival[k] = a
+        if a < poi.open_time:
+            wait[k] = poi.open_time - a
+            a = poi.open_time
+        start[k] = a
+        if a > poi.close_time:
+            violations += 1
+        current_time = a + poi.duration
+        cost += poi.price
+        if poi.id == separator and k < n - 1:
+            current_time = start[0]     # Ngày mới
+
+    ind.arrival = arrival
+    ind.wait = wait
+    ind.start = start
+    ind.latest_start = [0.0] * n
+    ind.route_cost = cost
+    ind.tw_violations = violations
+    if n:
+        ind.latest_start[n - 1] = route[n - 1].close_time
+        _update_latest(ind, n - 2, dist, stop_early=False)
+    ind.schedule_valid = True
+
+
+def ensure_schedule(ind: Individual, user_prefs: UserPreferences,
+                    dist: DistanceMatrix) -> None:
+    """Build the schedule only if the route changed since the last build."""
+    if not ind.schedule_valid:
+        compute_schedule(ind, user_prefs, dist)
+
+
+def is_feasible(ind: Individual, user_prefs: UserPreferences) -> bool:
+    """O(1) equivalent of check_constraints(ind.route, ...) on a built schedule."""
+    return (len(ind.route) >= 2
+            and ind.tw_violations == 0
+            and ind.route_cost <= user_prefs.budget)
+
+
+def max_shift(ind: Individual, k: int) -> float:
+    """Forward time slack of position k."""
+    return ind.latest_start[k] - ind.start[k]
+
+
+# =============================================================================
+#  O(1) feasibility tests
+# =============================================================================
+
+def _departure(ind: Individual, k: int) -> float:
+    # route[0] (và separator) là điểm xuất phát: rời đi ngay tại start_time
+    # (giống check_constraints)
+    if k == 0 or _is_separator(ind.route, k):
+        return ind.start[0]
+    return ind.start[k] + ind.route[k].duration
+
+
+def can_insert(ind: Individual, pos: int, poi: POI,
+               user_prefs: UserPreferences, dist: DistanceMatrix) -> bool:
+    """
+    Can `poi` be inserted just before route[pos] (1 ≤ pos ≤ len-1) while
+    keeping the route feasible?  O(1) on a valid schedule.
+    """
+    if not is_feasible(ind, user_prefs):
+        return False
+    if ind.route_cost + poi.price > user_prefs.budget:
+        return False
+
+    route = ind.route
+    rows = dist.rows
+    prev = route[pos - 1]
+    nxt = route[pos]
+
+    a = _departure(ind, pos - 1) + rows[prev.id][poi.id]
+    if a < poi.open_time:
+        a = poi.open_time
+    if a > poi.close_time:
+        return False
+
+    departure = a + poi.duration
+    a_next = departure + rows[poi.id][nxt.id]
+    if a_next < nxt.open_time:
+        a_next = nxt.open_time
+
+    margin = ind.latest_start[pos] - a_next
+    if margin > _EPS:
+        return True
+    if margin < -_EPS:
+        return False
+    # Sát biên → xác nhận bằng lan truyền tiến (chính xác như check_constraints)
+    return _propagate_ok(ind, pos, poi, departure, dist)
+
+
+def can_insert_many(ind: Individual, pos: int, pois: list[POI],
+                    user_prefs: UserPreferences, dist: DistanceMatrix) -> list[bool]:
+    """
+    `[can_insert(ind, pos, p, ...) for p in pois]` with the per-position work
+    (route feasibility, departure from route[pos-1], latest start of
+    route[pos]) done once — for scanning many candidates at one position.
+    """
+    if not is_feasible(ind, user_prefs):
+        return [False] * len(pois)
+
+    route = ind.route
+    rows = dist.rows
+    nxt = route[pos]
+    nxt_id, nxt_open = nxt.id, nxt.open_time
+    prev_row = rows[route[pos - 1].id]
+    departure_prev = _departure(ind, pos - 1)
+    latest = ind.latest_start[pos]
+    cost, budget = ind.route_cost, user_prefs.budget
+
+    result = []
+    for poi in pois:
+        if cost + poi.price > budget:
+            result.append(False)
+            continue
+        a = departure_prev + prev_row[poi.id]
+        if a < poi.open_time:
+            a = poi.open_time
+        if a > poi.close_time:
+            result.append(False)
+            continue
+        departure = a + poi.duration
+        a_next = departure + rows[poi.id][nxt_id]
+        if a_next < nxt_open:
+            a_next = nxt_open
+        margin = latest - a_next
+        if margin > _EPS:
+            result.append(True)
+        elif margin < -_EPS:
+            result.append(False)
+        else:
+            result.append(_propagate_ok(ind, pos, poi, departure, dist))
+    return result
+
+
+def _propagate_ok(ind: Individual, pos: int, prev: POI, departure: float,
+                  dist: DistanceMatrix) -> bool:
+    route = ind.route
+    rows = dist.rows
+    for k in range(pos, len(route)):
+        poi = route[k]
+        a = departure + rows[prev.id][poi.id]
+        if a < poi.open_time:
+            a = poi.open_time
+        if a > poi.close_time:
+            return False
+        if a == ind.start[k] or _is_separator(route, k):
+            return True  # Đồng bộ lại lịch cũ / hết ngày → phần sau không đổi
+        departure = a + poi.duration
+        prev = poi
+    return True
+
+
+# =============================================================================
+#  Incremental updates
+# =============================================================================
+
+def insert_poi(ind: Individual, pos: int, poi: POI,
+               user_prefs: UserPreferences, dist: DistanceMatrix) -> None:
+    """Insert `poi` before route[pos] and update the schedule incrementally."""
+    ind.route.insert(pos, poi)
+    ind.toggle_visit(poi)
+    ind.prefix_valid = False
+    ind.arrival.insert(pos, 0.0)
+    ind.wait.insert(pos, 0.0)
+    ind.start.insert(pos, 0.0)              # placeholder, ghi đè trong _propagate
+    ind.latest_start.insert(pos, 0.0)
+    ind.route_cost += poi.price
+    _propagate(ind, pos, dist, new_index=pos)
+    _update_latest(ind, pos, dist)
+
+
+def remove_poi(ind: Individual, pos: int, user_prefs: UserPreferences,
+               dist: DistanceMatrix) -> POI:
+    """Remove route[pos] (interior) and update the schedule incrementally."""
+    poi = ind.route.pop(pos)
+    ind.toggle_visit(poi)
+    ind.prefix_valid = False
+    ind.arrival.pop(pos)
+    ind.wait.pop(pos)
+    old_start = ind.start.pop(pos)
+    ind.latest_start.pop(pos)
+    ind.route_cost -= poi.price
+    if old_start > poi.close_time:
+        ind.tw_violations -= 1
+    _propagate(ind, pos, dist)
+    _update_latest(ind, pos - 1, dist)
+    return poi
+
+
+def _propagate(ind: Individual, pos: int, dist: DistanceMatrix,
+               new_index: int = -1) -> None:
+    """
+    Recompute arrival/wait/start forward from `pos` until a position's start
+    time equals its previous value (then everything after is unchanged).
+    `new_index` marks a freshly inserted slot with no previous value.
+    """
+    route = ind.route
+    rows = dist.rows
+    departure = _departure(ind, pos - 1)
+    prev = route[pos - 1]
+    separator = route[0].id
+    last = len(route) - 1
+
+    for k in range(pos, len(route)):
+        poi = route[k]
+        a = departure + rows[prev.id][poi.id]
+        ind.arrival[k] = a
+        if a < poi.open_time:
+            ind.wait[k] = poi.open_time - a
+            a = poi.open_time
+        else:
+            ind.wait[k] = 0.0
+
+        if k == new_index:
+            if a > poi.close_time:
+                ind.tw_violations += 1
+        else:
+            old = ind.start[k]
+            if old == a:
+                ind.start[k] = a
+                return
+            ind.tw_violations += (a > poi.close_time) - (old > poi.close_time)
+        ind.start[k] = a
+
+        if poi.id == separator and k < last:
+            departure = ind.start[0]    # Ngày mới
+        else:
+            departure = a + poi.duration
+        prev = poi
+
+
+def _update_latest(ind: Individual, pos: int, dist: DistanceMatrix,
+                   stop_early: bool = True) -> None:
+    """
+    Recompute latest_start backwards from `pos` down to 0.
+    Stops as soon as a value is unchanged (earlier ones cannot change).
+    """
+    route = ind.route
+    rows = dist.rows
+    latest = ind.latest_start
+    separator = route[0].id
+    for k in range(pos, -1, -1):
+        poi = route[k]
+        nxt = route[k + 1]
+        if k and poi.id == separator:
+            value = poi.close_time      # Ngày sau bắt đầu lại từ depot
+        else:
+            value = latest[k + 1] - rows[poi.id][nxt.id]
+            if k:
+                value = min(poi.close_time, value - poi.duration)
+        if stop_early and k != pos and latest[k] == value:
+            return
+        latest[k] = value
@@ -1,9 +1,42 @@
-import os
+"""
+Data Loader — registry các bộ dữ liệu Solomon + cache nhị phân trên đĩa.
+
+  • Mọi file `<tên>.csv` trong HGA_DATA_DIR (mặc định backend/data/solomon_instances)
+    là một dataset, tra theo tên (VD: C101, R101, RC101) qua get_catalogue(name).
+  • Lần đầu, CSV được parse và gán category/price, rồi lưu cùng ma trận khoảng
+    cách thành file cột `.npz` trong HGA_CACHE_DIR (mặc định <data>/.cache).
+    Các lần khởi động sau chỉ đọc file `.npz` (không parse CSV, không dựng O(N²)).
+  • Cache tự bị bỏ qua khi CSV nguồn đổi (kích thước / mtime), khi định dạng
+    hoặc bảng gán category/price thay đổi.
+  • HGA_MATRIX_MODE=mmap|sparse: ma trận không nằm trong .npz mà được map từ
+    file float32 / k-NN riêng (xem algorithm/matrix_store.py) — dùng cho
+    catalogue lớn. Dựng trước (offline) bằng:
+        python -m app.services.data_loader C101 R101 [--mode mmap] [--k 64]
+"""
+
 import csv
-import copy
+import hashlib
+import json
+import logging
+import os
 import random
+import re
+import threading
+from pathlib import Path
 from typing import Optional, List
-from app.models.domain import POI
+
+import numpy as np
+
+from app.models.domain import POI, PoiCatalogue
+from app.services.algorithm import matrix_store
+from app.services.algorithm.fitness import (
+    DistanceMatrix,
+    PoiColumns,
+    build_distance_matrix,
+    register_distance_matrix,
+)
+
+logger = logging.getLogger(__name__)
 
 # --- DANH SÁCH CATEGORY CHUẨN ---
 # Dùng bộ này cho toàn bộ hệ thống
@@ -41,90 +74,308 @@ CATEGORY_PRICE_TIERS: dict[str, list[float]] = {
 }
 
 
+# ─── Vị trí dữ liệu ──────────────────────────────────────────────────────────
+_BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+DATA_DIR        = Path(os.getenv("HGA_DATA_DIR", "").strip()
+                       or _BACKEND_DIR / 'data' / 'solomon_instances')
+CACHE_DIR       = Path(os.getenv("HGA_CACHE_DIR", "").strip() or DATA_DIR / '.cache')
+DEFAULT_DATASET = os.getenv("HGA_DEFAULT_DATASET", "").strip() or 'C101'
+
+MATRIX_MODE     = os.getenv("HGA_MATRIX_MODE", "").strip() or 'dense'
+if MATRIX_MODE not in matrix_store.MATRIX_MODES:
+    raise ValueError(f"HGA_MATRIX_MODE={MATRIX_MODE!r} is not one of "
+                     f"{', '.join(matrix_store.MATRIX_MODES)}")
+MATRIX_SPARSE_K = int(os.getenv("HGA_MATRIX_SPARSE_K", "").strip()
+                      or matrix_store.DEFAULT_SPARSE_K)
+
+DATASET_NAME_PATTERN = r'^[A-Za-z0-9][A-Za-z0-9_.-]*$'
+_CACHE_FORMAT = 1   # Tăng khi đổi cấu trúc file .npz
+
+
+class UnknownDatasetError(KeyError):
+    """Không có dataset nào với tên đã cho."""
+
+
 # =============================================================================
 #  IN-MEMORY CACHE  (Singleton Pattern)
 # =============================================================================
 #
-#  Đọc file CSV từ disk đúng 1 lần duy nhất → lưu vào RAM.
-#  Các request sau chỉ lấy deep copy từ bộ nhớ, tránh disk I/O lặp lại.
+#  Đọc file CSV từ disk đúng 1 lần duy nhất → lưu vào RAM dưới dạng
+#  PoiCatalogue (tuple POI + bảng tra id → POI).
 #
-#  Tại sao deep copy mà không phải shallow copy?
-#    → GA engine MUTATE các object POI trong quá trình chạy (route manipulation).
-#    → Nếu dùng shallow copy, nhiều request đồng thời sẽ chia sẻ cùng
-#      object POI → race condition, data corruption.
-#    → Deep copy đảm bảo mỗi request có bản sao riêng, an toàn hoàn toàn.
+#  Tại sao KHÔNG cần deep copy?
+#    → POI là object bất biến (__slots__, chặn __setattr__): các toán tử GA
+#      chỉ sắp xếp lại THAM CHIẾU tới POI trong route, không sửa thuộc tính.
+#    → Catalogue là tuple + MappingProxy → không request nào thêm/xóa được.
+#    → Vì vậy mọi request đồng thời dùng chung cùng một catalogue, không tốn
+#      chi phí copy và không tạo rác cho GC.
 #
 # =============================================================================
 
-_POI_CACHE: Optional[List[POI]] = None
+_CATALOGUES: dict[str, PoiCatalogue] = {}
+_CATALOGUE_LOCK = threading.Lock()
+
+
+def _parse_csv(file_path: Path) -> List[POI]:
+    """Parse một file Solomon thành list[POI] (gán category + price theo PID)."""
+    pois = []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            cust_no = int(row.get('CUST NO.', 0))
+
+            # --- Remap: CUST NO. 1 → Depot (id=0), others → id = CUST NO. - 1 ---
+            pid = cust_no - 1
+
+            # --- LOGIC GÁN CATEGORY + PRICE ---
+            if pid == 0:
+                cat = "depot"
+                price = 0.0
+            else:
+                # Gán category + price cố định theo PID (seed đảm bảo tái lập)
+                rng = random.Random(pid)
+                cat = rng.choices(CATEGORIES, weights=CATEGORY_WEIGHTS, k=1)[0]
 
+                # Gán giá vé theo category tier
+                price = rng.choice(CATEGORY_PRICE_TIERS[cat])
 
-def _load_from_disk() -> List[POI]:
+            poi = POI(
+                id=pid,
+                x=float(row.get('XCOORD.', 0)),
+                y=float(row.get('YCOORD.', 0)),
+                score=float(row.get('DEMAND', 0)),
+                open_time=float(row.get('READY TIME', 0)),
+                close_time=float(row.get('DUE DATE', 0)),
+                duration=float(row.get('SERVICE TIME', 0)),
+                category=cat,
+                price=price
+            )
+            pois.append(poi)
+    return pois
+
+
+def _load_from_disk(filename: str = 'C101.csv') -> List[POI]:
     """
-    Internal: Đọc file C101.csv từ disk và parse thành list[POI].
-    Chỉ được gọi 1 lần duy nhất bởi load_solomon_c101().
+    Internal: Đọc file Solomon (mặc định C101.csv) từ DATA_DIR và parse thành
+    list[POI]. Không dùng cache nhị phân; lỗi đọc file → list rỗng.
     """
-    file_path = os.path.join(os.getcwd(), 'data', 'solomon_instances', 'C101.csv')
-
-    pois = []
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                cust_no = int(row.get('CUST NO.', 0))
-
-                # --- Remap: CUST NO. 1 → Depot (id=0), others → id = CUST NO. - 1 ---
-                pid = cust_no - 1
-
-                # --- LOGIC GÁN CATEGORY + PRICE ---
-                if pid == 0:
-                    cat = "depot"
-                    price = 0.0
-                else:
-                    # Gán category + price cố định theo PID (seed đảm bảo tái lập)
-                    rng = random.Random(pid)
-                    cat = rng.choices(CATEGORIES, weights=CATEGORY_WEIGHTS, k=1)[0]
-
-                    # Gán giá vé theo category tier
-                    price = rng.choice(CATEGORY_PRICE_TIERS[cat])
-
-                poi = POI(
-                    id=pid,
-                    x=float(row.get('XCOORD.', 0)),
-                    y=float(row.get('YCOORD.', 0)),
-                    score=float(row.get('DEMAND', 0)),
-                    open_time=float(row.get('READY TIME', 0)),
-                    close_time=float(row.get('DUE DATE', 0)),
-                    duration=float(row.get('SERVICE TIME', 0)),
-                    category=cat,
-                    price=price
-                )
-                pois.append(poi)
+        pois = _parse_csv(DATA_DIR / filename)
     except Exception as e:
-        print(f"[DataLoader] Error reading Solomon data: {e}")
+        logger.error("Error reading Solomon data: %s", e)
         return []
 
-    print(f"[DataLoader] Loaded {len(pois)} POIs from C101.csv "
-          f"(Depot id=0 at ({pois[0].x}, {pois[0].y}))")
+    logger.info("Loaded %d POIs from %s (Depot id=0 at (%s, %s))",
+                len(pois), filename, pois[0].x, pois[0].y)
     return pois
 
 
-def load_solomon_c101() -> list[POI]:
-    """
-    Load Solomon C101 benchmark dataset — CÓ CACHE.
+# =============================================================================
+#  BINARY CACHE  (.npz columnar)
+# =============================================================================
+#
+#  Mỗi dataset → một file <CACHE_DIR>/<tên>.npz gồm các cột POI (id, x, y,
+#  score, open/close, duration, price, category) ĐÃ gán category/price, cộng
+#  ma trận khoảng cách N×N (chỉ ở chế độ dense). `meta` (JSON) ghi phiên bản định dạng, dấu vân
+#  tay bảng gán category/price và kích thước + mtime của CSV nguồn.
+#
+#  File được ghi ra tệp tạm rồi os.replace() → không bao giờ đọc phải file
+#  ghi dở khi nhiều process khởi động cùng lúc.
+#
+# =============================================================================
+
+def _derivation_key() -> str:
+    """Fingerprint of the category/price assignment tables."""
+    payload = json.dumps([CATEGORIES, CATEGORY_WEIGHTS, CATEGORY_PRICE_TIERS], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def _source_meta(source: Path) -> dict:
+    stat = source.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _cache_path(name: str) -> Path:
+    return CACHE_DIR / f"{name}.npz"
 
-    Lần gọi đầu tiên: đọc từ disk → lưu vào _POI_CACHE.
-    Các lần gọi sau : trả deep copy từ RAM (không đọc disk).
 
-    Returns a list of POI objects. POI with id=0 is always the Depot.
+def _read_cache(name: str, source: Optional[Path]
+                ) -> Optional[tuple[List[POI], Optional[np.ndarray]]]:
     """
-    global _POI_CACHE
+    POIs + distance matrix (None if stored without one) from the binary
+    cache, or None if missing/stale.
+    """
+    path = _cache_path(name)
+    if not path.is_file():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get("format") != _CACHE_FORMAT or meta.get("derivation") != _derivation_key():
+                return None
+            if source is not None and meta.get("source") != _source_meta(source):
+                return None
+            columns = {field: data[field].tolist() for field in
+                       ('id', 'x', 'y', 'score', 'open_time', 'close_time',
+                        'duration', 'price', 'category')}
+            # Chỉ chế độ dense mới đọc ma trận N×N từ .npz — mmap/sparse mở file
+            # riêng, không để bản float64 của cache cũ chiếm RAM mỗi worker
+            if MATRIX_MODE != 'dense':
+                matrix = None
+            elif 'matrix' in data.files:
+                matrix = np.array(data['matrix'], dtype=np.float64)
+            elif source is not None:
+                return None     # Ghi ở chế độ mmap/sparse → dựng lại kèm ma trận
+            else:
+                matrix = None
+    except Exception as e:
+        logger.warning("Ignoring unreadable cache %s: %s", path.name, e)
+        return None
+
+    pois = [
+        POI(id=pid, x=x, y=y, score=score, open_time=open_t, close_time=close_t,
+            duration=duration, category=cat, price=price)
+        for pid, x, y, score, open_t, close_t, duration, price, cat in zip(
+            columns['id'], columns['x'], columns['y'], columns['score'],
+            columns['open_time'], columns['close_time'], columns['duration'],
+            columns['price'], columns['category'])
+    ]
+    return pois, matrix
+
+
+def _write_cache(name: str, source: Path, pois: List[POI],
+                 matrix: Optional[DistanceMatrix]) -> None:
+    """Persist POI columns (+ matrix) atomically (best effort: lỗi ghi chỉ được log)."""
+    path = _cache_path(name)
+    tmp = path.with_name(f".{path.stem}.{os.getpid()}.tmp.npz")
+    meta = {"format": _CACHE_FORMAT, "derivation": _derivation_key(),
+            "source": _source_meta(source)}
+    extra = {} if matrix is None else {"matrix": np.asarray(matrix.array, dtype=np.float64)}
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            tmp,
+            meta=np.array(json.dumps(meta)),
+            id=np.array([p.id for p in pois], dtype=np.int64),
+            x=np.array([p.x for p in pois], dtype=np.float64),
+            y=np.array([p.y for p in pois], dtype=np.float64),
+            score=np.array([p.base_score for p in pois], dtype=np.float64),
+            open_time=np.array([p.open_time for p in pois], dtype=np.float64),
+            close_time=np.array([p.close_time for p in pois], dtype=np.float64),
+            duration=np.array([p.duration for p in pois], dtype=np.float64),
+            price=np.array([p.price for p in pois], dtype=np.float64),
+            category=np.array([p.category for p in pois]),
+            **extra,
+        )
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("Could not write cache %s: %s", path, e)
+        tmp.unlink(missing_ok=True)
+
+
+# =============================================================================
+#  DATASET REGISTRY
+# =============================================================================
+
+def available_datasets() -> list[str]:
+    """Tên mọi dataset có thể nạp: CSV trong DATA_DIR hoặc file .npz đã dựng sẵn."""
+    names = {p.stem for p in DATA_DIR.glob('*.csv')}
+    names.update(p.stem for p in CACHE_DIR.glob('*.npz') if not p.name.startswith('.'))
+    return sorted(names)
+
+
+def _load_dataset(name: str) -> PoiCatalogue:
+    """Đọc dataset `name` (cache nhị phân nếu còn hợp lệ, ngược lại parse CSV)."""
+    if not re.match(DATASET_NAME_PATTERN, name):
+        raise UnknownDatasetError(name)
+    source = DATA_DIR / f"{name}.csv"
+    if not source.is_file():
+        source = None
+
+    cached = _read_cache(name, source)
+    if cached is not None:
+        pois, array = cached
+        catalogue = PoiCatalogue(name, pois)
+        logger.info("Loaded %d POIs from cache %s.npz", len(pois), name)
+    elif source is None:
+        raise UnknownDatasetError(name)
+    else:
+        array = None
+        catalogue = PoiCatalogue(name, _parse_csv(source))
+        logger.info("Loaded %d POIs from %s (Depot id=0 at (%s, %s))", len(catalogue),
+                    source.name, catalogue.pois[0].x, catalogue.pois[0].y)
+
+    matrix = _install_matrix(catalogue, array)
+    if cached is None:
+        _write_cache(name, source, list(catalogue.pois),
+                     matrix if MATRIX_MODE == 'dense' else None)
+    return catalogue
+
 
-    if _POI_CACHE is None:
-        _POI_CACHE = _load_from_disk()
-        print(f"[DataLoader] Cache initialized: {len(_POI_CACHE)} POIs in RAM")
+def _install_matrix(catalogue: PoiCatalogue, array: Optional[np.ndarray]) -> DistanceMatrix:
+    """Register the distance matrix of `catalogue` according to MATRIX_MODE."""
+    if MATRIX_MODE != 'dense':
+        matrix = matrix_store.open_matrix(
+            MATRIX_MODE, CACHE_DIR, catalogue.name, catalogue.key,
+            PoiColumns(catalogue.pois), sparse_k=MATRIX_SPARSE_K,
+        )
+    elif array is not None:
+        matrix = DistanceMatrix(catalogue.key, array, PoiColumns(catalogue.pois))
     else:
-        print(f"[DataLoader] Cache HIT — returning {len(_POI_CACHE)} POIs from RAM")
+        return build_distance_matrix(list(catalogue.pois), key=catalogue.key)
+    register_distance_matrix(matrix)
+    return matrix
+
+
+def get_catalogue(name: Optional[str] = None) -> PoiCatalogue:
+    """
+    Return the shared PoiCatalogue of dataset `name` (mặc định DEFAULT_DATASET) — CÓ CACHE.
+
+    Lần gọi đầu tiên: đọc từ cache nhị phân / CSV → lưu vào _CATALOGUES.
+    Các lần gọi sau : trả về CÙNG object (tham chiếu, không copy).
+    Raises UnknownDatasetError nếu không có dataset tên `name`.
+    """
+    name = name or DEFAULT_DATASET
+    catalogue = _CATALOGUES.get(name)
+    if catalogue is None:
+        with _CATALOGUE_LOCK:
+            catalogue = _CATALOGUES.get(name)
+            if catalogue is None:
+                catalogue = _load_dataset(name)
+                _CATALOGUES[name] = catalogue
+                logger.info("Cache initialized: %d POIs in RAM (%s)", len(catalogue), name)
+    return catalogue
+
+
+def load_solomon_c101() -> tuple[POI, ...]:
+    """
+    Load Solomon C101 benchmark dataset — CÓ CACHE.
+
+    Returns the shared, immutable tuple of POI objects (by reference).
+    POI with id=0 is always the Depot.
+    """
+    return get_catalogue('C101').pois
+
+
+# =============================================================================
+#  OFFLINE BUILD  (python -m app.services.data_loader <tên> ...)
+# =============================================================================
+
+if __name__ == '__main__':
+    import argparse
+
+    from app.logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(
+        description="Dựng trước cache nhị phân (.npz) và file ma trận của các dataset.")
+    parser.add_argument('names', nargs='*', help="Tên dataset (mặc định: tất cả)")
+    parser.add_argument('--mode', choices=matrix_store.MATRIX_MODES, default=MATRIX_MODE)
+    parser.add_argument('--k', type=int, default=MATRIX_SPARSE_K,
+                        help="Số láng giềng lưu mỗi POI ở chế độ sparse")
+    args = parser.parse_args()
 
-    # Deep copy để mỗi request có bản sao riêng, tránh race condition
-    return copy.deepcopy(_POI_CACHE)
\ No newline at end of file
+    configure_logging()
+    MATRIX_MODE, MATRIX_SPARSE_K = args.mode, args.k
+    for dataset in args.names or available_datasets():
+        get_catalogue(dataset)
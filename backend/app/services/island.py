@@ -0,0 +1,186 @@
+"""
+Island Model — nhiều quần thể HGA tiến hóa song song, trao đổi elite định kỳ.
+
+Mỗi island là một HybridGeneticAlgorithm độc lập (seed riêng) chạy trong
+solver pool, nên dùng chung catalogue POI + ma trận khoảng cách (shared memory)
+của worker. Quá trình chia thành các epoch:
+
+  1. Mỗi island chạy `interval` thế hệ (song song trên các worker).
+  2. Process cha gom trạng thái (quần thể dạng danh sách POI id — vài KB),
+     gửi `rate` elite của mỗi island sang island khác theo topology:
+       • ring   – island i → island (i + 1) mod n
+       • random – island i → một island khác chọn ngẫu nhiên
+  3. Lặp lại cho tới khi mọi island hội tụ (early stopping) hoặc hết
+     `generations` thế hệ.
+
+Trạng thái island được truyền qua lại giữa các epoch nên không cần kênh
+giao tiếp trực tiếp giữa các worker; với 1 worker mô hình vẫn chạy đúng
+(các island chỉ xen kẽ nhau).
+
+Cấu hình qua biến môi trường (HGA_ISLANDS ≤ 1 → tắt, chạy một quần thể):
+  HGA_ISLANDS, HGA_MIGRATION_INTERVAL, HGA_MIGRATION_RATE, HGA_MIGRATION_TOPOLOGY
+"""
+
+import asyncio
+import os
+import random
+import time
+from typing import NamedTuple, Optional
+
+from app.config import env_int
+from app.models.schemas import OptimizationResponse, UserPreferences
+from app.services.algorithm.hga_engine import HybridGeneticAlgorithm
+from app.services.algorithm.profiling import SolverProfiler
+from app.services.solver_pool import SolverPool
+
+TOPOLOGIES = ('ring', 'random')
+
+ISLAND_COUNT       = env_int("HGA_ISLANDS", 1)
+MIGRATION_INTERVAL = env_int("HGA_MIGRATION_INTERVAL", 10)
+MIGRATION_RATE     = env_int("HGA_MIGRATION_RATE", 2)
+MIGRATION_TOPOLOGY = os.getenv("HGA_MIGRATION_TOPOLOGY", "").strip() or 'ring'
+
+
+class IslandState(NamedTuple):
+    """Trạng thái picklable của một island giữa hai epoch."""
+    seed: int
+    routes: list[list[int]]        # Quần thể (POI id), tốt nhất trước; rỗng = chưa khởi tạo
+    best_route: list[int]
+    best_fitness: float
+    generation: int
+    gens_without_improvement: int
+    finished: bool
+    profile: Optional[dict] = None  # SolverProfile (dict) của epoch vừa chạy
+
+
+def island_config() -> dict:
+    """Island parameters (part of the result-cache key when enabled)."""
+    if ISLAND_COUNT <= 1:
+        return {}
+    return {
+        "islands": ISLAND_COUNT,
+        "migration_interval": MIGRATION_INTERVAL,
+        "migration_rate": MIGRATION_RATE,
+        "migration_topology": MIGRATION_TOPOLOGY,
+    }
+
+
+# =============================================================================
+#  Worker-side functions (chạy trong process con)
+# =============================================================================
+
+def run_island_epoch(user_prefs: UserPreferences, state: IslandState,
+                     immigrants: list[list[int]], generations: int,
+                     deadline: Optional[float] = None) -> IslandState:
+    """
+    Nhận cá thể di cư rồi tiến hóa island thêm tối đa `generations` thế hệ,
+    dừng khi tới `deadline` (time.time() — so sánh được giữa các process;
+    None = không giới hạn).
+    """
+    random.seed(state.seed)
+    engine = HybridGeneticAlgorithm(user_prefs)
+    if deadline is not None:
+        engine.start_clock(max(0.0, (deadline - time.time()) * 1000.0))
+    if state.routes:
+        engine.restore(state.routes, state.best_route, state.generation,
+                       state.gens_without_improvement)
+    else:
+        engine.initialize_population()
+    if immigrants:
+        engine.immigrate(immigrants)
+
+    for _ in range(generations):
+        if engine.finished:
+            break
+        engine.step()
+
+    best = engine.best_ever
+    return IslandState(
+        seed=random.getrandbits(32),
+        routes=engine.emigrants(len(engine.population)),
+        best_route=best.ids.tolist(),
+        best_fitness=best.fitness,
+        generation=engine.generation,
+        gens_without_improvement=engine.gens_without_improvement,
+        finished=engine.finished,
+        profile=(engine.profiler.snapshot().model_dump()
+                 if engine.profiler is not None else None),
+    )
+
+
+def build_island_response(user_prefs: UserPreferences, best_route: list[int],
+                          execution_time: float) -> OptimizationResponse:
+    """Dựng OptimizationResponse từ route tốt nhất của mọi island."""
+    engine = HybridGeneticAlgorithm(user_prefs)
+    return engine._build_response(engine.restore_individual(best_route), execution_time)
+
+
+# =============================================================================
+#  Coordinator (phía event loop)
+# =============================================================================
+
+def _migration_targets(count: int, topology: str, rng: random.Random) -> list[int]:
+    if topology == 'ring':
+        return [(i + 1) % count for i in range(count)]
+    return [rng.choice([j for j in range(count) if j != i]) for i in range(count)]
+
+
+async def solve_islands(
+    pool: SolverPool,
+    user_prefs: UserPreferences,
+    islands: int = ISLAND_COUNT,
+    interval: int = MIGRATION_INTERVAL,
+    rate: int = MIGRATION_RATE,
+    topology: str = MIGRATION_TOPOLOGY,
+    seed: Optional[int] = None,
+) -> OptimizationResponse:
+    """
+    Giải `user_prefs` bằng `islands` quần thể song song trên `pool`, trao đổi
+    `rate` elite mỗi `interval` thế hệ. Raises SolverBusyError nếu pool đầy.
+
+    Với time_budget_ms, mọi epoch dùng chung một deadline tuyệt đối (kể cả
+    khi các island phải xếp hàng chờ worker) và không bắt đầu epoch mới khi
+    đã hết giờ (luôn chạy ít nhất một epoch).
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown migration topology {topology!r}; expected one of {TOPOLOGIES}")
+
+    start_time = time.perf_counter()
+    budget_ms = user_prefs.time_budget_ms or HybridGeneticAlgorithm.time_budget_ms
+    deadline = None if budget_ms is None else time.time() + budget_ms / 1000.0
+    rng = random.Random(seed)
+    states = [
+        IslandState(rng.getrandbits(32), [], [], float('-inf'), 0, 0, False)
+        for _ in range(islands)
+    ]
+    inbox: list[list[list[int]]] = [[] for _ in range(islands)]
+    profiler = SolverProfiler()     # Gộp profile của mọi epoch / island
+
+    async with pool.reserve(min(islands, pool.max_pending)):
+        while True:
+            active = [i for i, s in enumerate(states) if not s.finished]
+            if not active:
+                break
+            if deadline is not None and time.time() >= deadline and states[0].routes:
+                break
+            results = await asyncio.gather(*(
+                pool.submit(run_island_epoch, user_prefs, states[i], inbox[i],
+                            interval, deadline)
+                for i in active
+            ))
+            for i, state in zip(active, results):
+                states[i] = state
+                profiler.merge(state.profile)
+
+            # ── Migration: elite của island i → island targets[i] ─────────
+            inbox = [[] for _ in range(islands)]
+            if islands > 1 and rate > 0:
+                for i, target in enumerate(_migration_targets(islands, topology, rng)):
+                    inbox[target].extend(states[i].routes[:rate])
+
+        best = max(states, key=lambda s: s.best_fitness)
+        elapsed = time.perf_counter() - start_time
+        response = await pool.submit(build_island_response, user_prefs, best.best_route, elapsed)
+        if any(s.profile for s in states):
+            response.profile = profiler.snapshot()
+        return response
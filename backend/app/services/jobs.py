@@ -0,0 +1,255 @@
+"""
+Job API — giải tối ưu bất đồng bộ (POST /api/jobs → poll GET → DELETE để hủy).
+
+  • JobStore      – nơi lưu trạng thái job. Giao diện tối giản (save / get)
+                    để có thể thay bằng backend khác; mặc định InMemoryJobStore
+                    (trong process, tự xóa job đã xong sau HGA_JOB_TTL giây).
+  • JobManager    – hàng đợi asyncio (tối đa HGA_JOB_QUEUE_SIZE job chờ) và
+                    HGA_JOB_WORKERS consumer chạy job trên solver pool.
+
+Hủy job:
+  • Đang chờ   → đánh dấu cancelled, consumer bỏ qua.
+  • Đang chạy  → set Event (Manager) mà worker kiểm tra trước mỗi thế hệ;
+                 HybridGeneticAlgorithm.run dừng ngay, job thành cancelled.
+Event là proxy Manager (mỗi lệnh = một round trip IPC): event loop không
+bao giờ gọi is_set() — việc hủy được ghi lại cục bộ trong `_cancelled`.
+
+Kết quả không ghé được POI nào → job failed, cùng thông báo với /optimize.
+
+Job luôn chạy một quần thể (không dùng Island Model).
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from app.config import env_float, env_int
+from app.models.schemas import JobInfo, JobStatus, UserPreferences
+from app.services.metrics import metrics
+from app.services.result_cache import result_cache
+from app.services.solver_pool import (
+    SolverBusyError,
+    SolverPool,
+    empty_route_detail,
+    solve_cancellable,
+    solver_pool,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Cấu hình ────────────────────────────────────────────────────────────────
+JOB_WORKERS    = env_int("HGA_JOB_WORKERS", solver_pool.workers)
+JOB_QUEUE_SIZE = env_int("HGA_JOB_QUEUE_SIZE", 100)
+JOB_TTL        = env_float("HGA_JOB_TTL", 3600.0)
+
+_BUSY_RETRY_S = 0.2   # Chờ trước khi thử lại khi solver pool đầy (giây)
+
+
+class JobQueueFullError(RuntimeError):
+    """Hàng đợi job đã đầy — client nên thử lại sau."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# =============================================================================
+#  Stores
+# =============================================================================
+
+class JobStore(ABC):
+    """Giao diện lưu trữ job (thay thế được)."""
+
+    @abstractmethod
+    def save(self, job: JobInfo) -> None:
+        """Insert or replace `job` (keyed by job.id)."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[JobInfo]:
+        """The stored job, or None if unknown / expired."""
+
+
+class InMemoryJobStore(JobStore):
+    """Lưu job trong dict của process; job đã xong bị xóa sau `ttl` giây."""
+
+    def __init__(self, ttl: float = JOB_TTL):
+        self.ttl = ttl
+        self._jobs: dict[str, JobInfo] = {}
+        self._finished_at: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def save(self, job: JobInfo) -> None:
+        with self._lock:
+            self._jobs[job.id] = job
+            if job.status.finished:
+                self._finished_at.setdefault(job.id, time.monotonic())
+            self._purge()
+
+    def get(self, job_id: str) -> Optional[JobInfo]:
+        with self._lock:
+            self._purge()
+            return self._jobs.get(job_id)
+
+    def _purge(self) -> None:
+        cutoff = time.monotonic() - self.ttl
+        for job_id in [j for j, t in self._finished_at.items() if t < cutoff]:
+            del self._finished_at[job_id]
+            self._jobs.pop(job_id, None)
+
+
+# =============================================================================
+#  JobManager (phía event loop)
+# =============================================================================
+
+class JobManager:
+    def __init__(self, pool: SolverPool, store: Optional[JobStore] = None,
+                 workers: int = JOB_WORKERS, queue_size: int = JOB_QUEUE_SIZE):
+        self.pool = pool
+        self.store = store if store is not None else InMemoryJobStore()
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumers: list[asyncio.Task] = []
+        self._cancel_events: dict[str, Any] = {}    # job_id → Manager Event (job đang chạy)
+        self._cancelled: set[str] = set()           # Job đang chạy đã bị yêu cầu hủy
+
+    def start(self) -> None:
+        if self._consumers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._consumers = [asyncio.create_task(self._consume())
+                           for _ in range(self.workers)]
+        logger.info("Job manager started: %d consumers, queue size %d",
+                    self.workers, self.queue_size)
+
+    async def shutdown(self) -> None:
+        self._cancelled.update(self._cancel_events)
+        for event in list(self._cancel_events.values()):
+            await asyncio.to_thread(event.set)
+        for task in self._consumers:
+            task.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+        self._queue = None
+        logger.info("Job manager stopped")
+
+    # ── Public API ───────────────────────────────────────────────────────────
+    def submit(self, user_prefs: UserPreferences, cache_key: Optional[str] = None) -> JobInfo:
+        """
+        Tạo job mới. Nếu `cache_key` có trong result cache, job hoàn tất ngay.
+        Raises JobQueueFullError nếu hàng đợi đã đầy.
+        """
+        self.start()
+        job = JobInfo(id=uuid.uuid4().hex, status=JobStatus.QUEUED, created_at=_now())
+
+        cached = result_cache.get(cache_key) if cache_key is not None else None
+        if cached is not None:
+            job.status = JobStatus.SUCCEEDED
+            job.started_at = job.finished_at = job.created_at
+            job.result = cached.without_profile()
+            self.store.save(job)
+            return job
+
+        try:
+            self._queue.put_nowait((job.id, user_prefs, cache_key))
+        except asyncio.QueueFull:
+            raise JobQueueFullError(f"Job queue full ({self.queue_size})")
+        self.store.save(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[JobInfo]:
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[JobInfo]:
+        """Hủy job (không làm gì nếu đã kết thúc). None nếu không tồn tại."""
+        job = self.store.get(job_id)
+        if job is None or job.status.finished:
+            return job
+
+        if job.status == JobStatus.QUEUED:
+            self._finish(job, JobStatus.CANCELLED)
+        else:
+            # Route DELETE là sync (threadpool) nên được phép chờ proxy Manager
+            self._cancelled.add(job_id)
+            event = self._cancel_events.get(job_id)
+            if event is not None:
+                event.set()     # Worker dừng ở thế hệ kế tiếp; consumer ghi trạng thái
+        return job
+
+    # ── Consumers ────────────────────────────────────────────────────────────
+    async def _consume(self) -> None:
+        while True:
+            job_id, user_prefs, cache_key = await self._queue.get()
+            try:
+                await self._run(job_id, user_prefs, cache_key)
+            except Exception as e:
+                logger.error("Job %s crashed: %s", job_id, e, exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, user_prefs: UserPreferences,
+                   cache_key: Optional[str]) -> None:
+        job = self.store.get(job_id)
+        if job is None or job.status != JobStatus.QUEUED:
+            return  # Đã hủy khi còn trong hàng đợi
+
+        # Tạo Event là một round trip tới process Manager → chạy ngoài event loop
+        cancel = await asyncio.to_thread(lambda: self.pool.manager().Event())
+        job = self.store.get(job_id)
+        if job is None or job.status != JobStatus.QUEUED:
+            return  # Bị hủy trong lúc tạo Event
+        self._cancel_events[job_id] = cancel
+        job.status = JobStatus.RUNNING
+        job.started_at = _now()
+        self.store.save(job)
+
+        try:
+            result = await self._solve(job_id, user_prefs, cancel)
+            cancelled = job_id in self._cancelled
+        except Exception as e:
+            logger.error("Job %s failed: %s", job_id, e, exc_info=True)
+            self._finish(job, JobStatus.FAILED, error="Đã xảy ra lỗi trong quá trình tối ưu hóa lộ trình.")
+            return
+        finally:
+            self._cancel_events.pop(job_id, None)
+            self._cancelled.discard(job_id)
+
+        if cancelled or result is None:
+            self._finish(job, JobStatus.CANCELLED)
+            return
+        detail = empty_route_detail(user_prefs, result)
+        if detail is not None:
+            self._finish(job, JobStatus.FAILED, error=detail)
+            return
+        if cache_key is not None:
+            result_cache.put(cache_key, result)
+        metrics.observe_profile(result.profile)
+        self._finish(job, JobStatus.SUCCEEDED, result=result.without_profile())
+
+    async def _solve(self, job_id: str, user_prefs: UserPreferences, cancel: Any):
+        """Chạy job trên solver pool, thử lại khi pool đầy. None nếu bị hủy trước khi chạy."""
+        while job_id not in self._cancelled:
+            try:
+                return await self.pool.run(solve_cancellable, user_prefs, cancel)
+            except SolverBusyError:
+                await asyncio.sleep(_BUSY_RETRY_S)
+        return None
+
+    def _finish(self, job: JobInfo, status: JobStatus, result=None,
+                error: Optional[str] = None) -> None:
+        job.status = status
+        job.finished_at = _now()
+        job.result = result
+        job.error = error
+        self.store.save(job)
+        started = job.started_at or job.created_at
+        metrics.observe_request("jobs", status.value, (job.finished_at - started).total_seconds())
+
+
+job_manager = JobManager(solver_pool)
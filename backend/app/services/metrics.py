@@ -0,0 +1,103 @@
+"""
+Metrics — bộ đếm phía API, xuất theo định dạng Prometheus (GET /metrics).
+
+Lời giải chạy trong worker process nên số liệu theo pha của HGA đi về qua
+`OptimizationResponse.profile` (SolverProfile) và được cộng dồn tại đây, cùng
+với số request / thời gian xử lý theo endpoint. Khi render, thêm số liệu
+tức thời của result cache và solver pool.
+
+Không phụ thuộc prometheus_client: định dạng text exposition 0.0.4 được
+sinh trực tiếp (counter, gauge và summary không quantile).
+"""
+
+import threading
+from collections import defaultdict
+from typing import Optional, Union
+
+from app.models.schemas import SolverProfile
+from app.services.result_cache import result_cache
+from app.services.solver_pool import solver_pool
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _labels(**labels: str) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{str(v)}"' for k, v in sorted(labels.items()))
+    return "{" + body + "}"
+
+
+class Metrics:
+    """Thread-safe in-process counters for the API and aggregated solver profiles."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests: dict[tuple[str, str], int] = defaultdict(int)
+        self._request_seconds: dict[str, float] = defaultdict(float)
+        self._request_count: dict[str, int] = defaultdict(int)
+        self._phase_seconds: dict[str, float] = defaultdict(float)
+        self._phase_calls: dict[str, int] = defaultdict(int)
+        self._counters: dict[str, int] = defaultdict(int)
+        self._solves = 0
+
+    def observe_request(self, endpoint: str, status: Union[int, str], seconds: float) -> None:
+        """`status`: HTTP status (job: trạng thái cuối, VD "succeeded")."""
+        with self._lock:
+            self._requests[(endpoint, str(status))] += 1
+            self._request_seconds[endpoint] += seconds
+            self._request_count[endpoint] += 1
+
+    def observe_profile(self, profile: Optional[SolverProfile]) -> None:
+        """Cộng dồn profile của MỘT lời giải mới (không gọi cho kết quả từ cache)."""
+        if profile is None:
+            return
+        with self._lock:
+            self._solves += 1
+            for phase, ms in profile.timings_ms.items():
+                self._phase_seconds[phase] += ms / 1000.0
+            for phase, n in profile.calls.items():
+                self._phase_calls[phase] += n
+            for name, n in profile.counters.items():
+                self._counters[name] += n
+
+    def render(self) -> str:
+        lines: list[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(**labels)} {value}")
+
+        with self._lock:
+            metric("hga_http_requests_total", "counter", "Optimization requests by endpoint and status.",
+                   [({"endpoint": e, "status": s}, n) for (e, s), n in sorted(self._requests.items())])
+            lines.append("# HELP hga_http_request_seconds Request handling time by endpoint.")
+            lines.append("# TYPE hga_http_request_seconds summary")
+            for e in sorted(self._request_count):
+                lines.append(f"hga_http_request_seconds_sum{_labels(endpoint=e)} "
+                             f"{round(self._request_seconds[e], 6)}")
+                lines.append(f"hga_http_request_seconds_count{_labels(endpoint=e)} "
+                             f"{self._request_count[e]}")
+            metric("hga_solves_total", "counter", "Solver runs with a profile (cache misses).",
+                   [({}, self._solves)])
+            metric("hga_phase_seconds_total", "counter", "Solver time per GA phase (init includes its evaluation).",
+                   [({"phase": p}, round(v, 6)) for p, v in sorted(self._phase_seconds.items())])
+            metric("hga_phase_calls_total", "counter", "Calls per GA phase.",
+                   [({"phase": p}, n) for p, n in sorted(self._phase_calls.items())])
+            for name, n in sorted(self._counters.items()):
+                metric(f"hga_{name}_total", "counter", f"Solver counter {name}.", [({}, n)])
+
+        cache = result_cache.stats()
+        metric("hga_result_cache_hits_total", "counter", "Result cache hits.", [({}, cache["hits"])])
+        metric("hga_result_cache_misses_total", "counter", "Result cache misses.", [({}, cache["misses"])])
+        metric("hga_result_cache_hit_ratio", "gauge", "Result cache hit ratio.", [({}, round(cache["hit_rate"], 6))])
+        metric("hga_result_cache_entries", "gauge", "Entries in the result cache.", [({}, cache["size"])])
+        metric("hga_solver_pending", "gauge", "Solves running or queued in the pool.", [({}, solver_pool.pending)])
+        metric("hga_solver_max_pending", "gauge", "Pool backpressure limit.", [({}, solver_pool.max_pending)])
+        metric("hga_solver_workers", "gauge", "Solver worker processes.", [({}, solver_pool.workers)])
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -0,0 +1,95 @@
+"""
+Result Cache — bộ nhớ đệm LRU + TTL cho kết quả tối ưu hóa.
+
+Client (mobile) thường gửi lại đúng cùng một UserPreferences; mỗi lần như vậy
+trước đây đều chạy lại toàn bộ HGA. Cache này nằm trước solver pool:
+
+  • Khóa = SHA-256 của JSON chuẩn hóa (sort_keys) gồm preferences, dataset key
+    (thay đổi khi dữ liệu POI đổi) và cấu hình solver → đổi bất kỳ thành phần
+    nào cũng tự động bỏ qua kết quả cũ.
+  • Giới hạn số mục (LRU) và thời gian sống (TTL) cấu hình qua biến môi trường
+    HGA_CACHE_SIZE (mặc định 256, 0 = tắt) và HGA_CACHE_TTL (giây, mặc định 600).
+  • Đếm hits / misses để theo dõi hiệu quả.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Mapping, Optional
+
+from app.config import env_float, env_int
+from app.models.schemas import UserPreferences
+
+
+CACHE_SIZE = env_int("HGA_CACHE_SIZE", 256)
+CACHE_TTL  = env_float("HGA_CACHE_TTL", 600.0)
+
+
+def cache_key(user_prefs: UserPreferences, dataset_key: str,
+              solver_config: Mapping[str, Any]) -> str:
+    """Canonical hash of (preferences, dataset version, solver config)."""
+    payload = {
+        "prefs": user_prefs.model_dump(mode="json"),
+        "dataset": dataset_key,
+        "solver": dict(solver_config),
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Thread-safe LRU cache whose entries expire `ttl` seconds after insertion."""
+
+    def __init__(self, maxsize: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        self.maxsize = max(0, maxsize)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any) -> None:
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+result_cache = ResultCache()
@@ -0,0 +1,299 @@
+"""
+Solver Process Pool — chạy HGA ngoài event loop.
+
+`HybridGeneticAlgorithm.run()` là tác vụ CPU-bound thuần Python (tối đa
+200 thế hệ × 50 con). Nếu gọi trực tiếp trong handler `async`, một lần giải
+sẽ chặn toàn bộ event loop của worker uvicorn (kể cả health check `/`).
+
+Module này cung cấp một process pool dùng chung:
+  • Số worker mặc định = số core (cấu hình qua HGA_SOLVER_WORKERS).
+  • Ma trận khoảng cách được dựng 1 lần ở process cha, đặt vào shared
+    memory; mỗi worker chỉ map vào (read-only) thay vì tự tính lại. Ma trận
+    nằm trên file (HGA_MATRIX_MODE=mmap|sparse) thì worker tự map file đó.
+  • Backpressure: tối đa HGA_SOLVER_MAX_PENDING lời giải đang chạy/chờ;
+    vượt ngưỡng → SolverBusyError (route trả về 503).
+  • Streaming / hủy: `stream()` chuyển tiến trình (progress) từ worker về
+    event loop qua Manager queue; `manager()` cũng cấp Event để hủy lời giải
+    đang chạy (Manager chỉ được tạo khi cần).
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from queue import Empty
+from typing import Any, AsyncIterator, Callable, Optional, Sequence
+
+from app.config import env_int
+from app.logging_config import configure_logging
+from app.models.schemas import OptimizationResponse, UserPreferences
+from app.services.algorithm.fitness import (
+    DistanceMatrix,
+    SharedMatrixHandle,
+    build_distance_matrix,
+    register_distance_matrix,
+)
+from app.services.data_loader import get_catalogue
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Cấu hình ────────────────────────────────────────────────────────────────
+SOLVER_WORKERS     = env_int("HGA_SOLVER_WORKERS", os.cpu_count() or 1)
+SOLVER_MAX_PENDING = env_int("HGA_SOLVER_MAX_PENDING", SOLVER_WORKERS * 4)
+
+_STREAM_POLL_S = 0.1   # Chu kỳ kiểm tra queue progress khi stream (giây)
+
+
+class SolverBusyError(RuntimeError):
+    """Hàng đợi solver đã đầy — client nên thử lại sau."""
+
+
+# =============================================================================
+#  Worker-side functions (chạy trong process con)
+# =============================================================================
+
+def _init_worker(handle: Optional[SharedMatrixHandle]) -> None:
+    """
+    Initializer của mỗi worker: đọc dữ liệu POI, gắn ma trận khoảng cách
+    từ shared memory của process cha (hoặc tự dựng nếu không có handle), để
+    lời giải đầu tiên không phải trả chi phí cold start. PoiIndex được dựng
+    theo bài toán con của từng request (reduction.py), không cho cả catalogue.
+
+    Worker attach vùng shm mà KHÔNG đăng ký với resource_tracker (process cha
+    sở hữu + unlink khi shutdown), nên worker thoát không xóa / báo rò rỉ.
+    """
+    configure_logging()     # spawn: process con không kế thừa cấu hình logging
+    catalogue = get_catalogue()
+    if handle is not None:
+        register_distance_matrix(DistanceMatrix.attach(handle, catalogue.pois))
+    else:
+        build_distance_matrix(catalogue.pois, key=catalogue.key)
+
+
+def solve_itinerary(user_prefs: UserPreferences) -> OptimizationResponse:
+    """Chạy HGA cho một request (gọi bên trong worker process)."""
+    from app.services.algorithm.hga_engine import HybridGeneticAlgorithm
+
+    return HybridGeneticAlgorithm(user_prefs).run()
+
+
+def stream_itinerary(user_prefs: UserPreferences, events: Any) -> OptimizationResponse:
+    """
+    Như solve_itinerary, nhưng đẩy ("progress", stats, best) vào queue `events`
+    sau mỗi thế hệ (best = OptimizationResponse khi best-ever cải thiện).
+    """
+    from app.services.algorithm.hga_engine import HybridGeneticAlgorithm
+
+    def on_progress(stats, best) -> None:
+        events.put(("progress", stats._asdict(), best))
+
+    return HybridGeneticAlgorithm(user_prefs).run(on_progress=on_progress)
+
+
+def solve_cancellable(user_prefs: UserPreferences, cancel: Any) -> OptimizationResponse:
+    """Như solve_itinerary, dừng sớm (trả về best-so-far) khi `cancel` (Event) được set."""
+    from app.services.algorithm.hga_engine import HybridGeneticAlgorithm
+
+    return HybridGeneticAlgorithm(user_prefs).run(should_stop=cancel.is_set)
+
+
+def empty_route_detail(request: UserPreferences,
+                       result: Optional[OptimizationResponse]) -> Optional[str]:
+    """
+    Edge Case 7: thông báo lỗi nếu GA không ghé được POI nào, ngược lại None.
+    Dùng chung cho /optimize, /optimize/stream, batch (404) và Job API (failed).
+    """
+    if not result:
+        return "Không tìm được lộ trình khả thi với các tùy chọn đã cho."
+
+    # Kiểm tra route chỉ có Depot (không ghé được POI nào, ở mọi ngày)
+    if hasattr(result, 'route') and all(item.category == "depot" for item in result.route):
+        return (
+            "Không thể ghé thăm bất kỳ điểm nào trong khung thời gian "
+            f"và ngân sách đã cho ({request.start_time}h → {request.end_time}h, "
+            f"budget={request.budget:,.0f}). "
+            "Hãy thử mở rộng khung giờ hoặc tăng ngân sách."
+        )
+    return None
+
+
+# =============================================================================
+#  SolverPool (phía event loop)
+# =============================================================================
+
+class SolverPool:
+    """
+    Bọc ProcessPoolExecutor với giới hạn số lời giải đang chờ.
+
+    Bộ đếm `_pending` chỉ được đọc/ghi trên event loop nên không cần lock.
+    """
+
+    def __init__(self, workers: int = SOLVER_WORKERS,
+                 max_pending: int = SOLVER_MAX_PENDING):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._matrix: Optional[DistanceMatrix] = None
+        self._manager: Optional[Any] = None     # multiprocessing Manager (cho stream)
+        self._manager_lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        catalogue = get_catalogue()
+        self._matrix = build_distance_matrix(catalogue.pois, key=catalogue.key)
+        handle = self._matrix.share()
+        # "spawn" → worker không kế thừa event loop / thread của uvicorn
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(handle,),
+        )
+        logger.info("Solver pool started: %d workers, max pending %d",
+                    self.workers, self.max_pending)
+
+    def shutdown(self) -> None:
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+        if self._matrix is not None:
+            self._matrix.release()
+            self._matrix = None
+        logger.info("Solver pool stopped")
+
+    def manager(self) -> Any:
+        """multiprocessing Manager dùng chung (Queue/Event truyền được sang worker)."""
+        with self._manager_lock:    # Có thể được gọi từ thread (asyncio.to_thread)
+            if self._manager is None:
+                self._manager = multiprocessing.get_context("spawn").Manager()
+            return self._manager
+
+    @asynccontextmanager
+    async def reserve(self, slots: int = 1) -> AsyncIterator[None]:
+        """
+        Giữ `slots` chỗ trong hàng đợi cho một lời giải (có thể gồm nhiều tác
+        vụ, VD: các island). Raises SolverBusyError nếu không đủ chỗ.
+        """
+        if self._pending + slots > self.max_pending:
+            raise SolverBusyError(
+                f"Solver pool saturated ({self._pending}/{self.max_pending})"
+            )
+
+        self.start()
+        self._pending += slots
+        try:
+            yield
+        finally:
+            self._pending -= slots
+
+    async def submit(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Chạy `fn(*args)` trên worker (không kiểm tra hàng đợi — dùng trong `reserve`)."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Gửi `fn(*args)` sang worker process và chờ kết quả.
+
+        Raises SolverBusyError nếu số lời giải đang chạy/chờ đã chạm ngưỡng.
+        """
+        async with self.reserve():
+            return await self.submit(fn, *args)
+
+    async def stream(self, fn: Callable[..., Any], *args: Any) -> AsyncIterator[tuple]:
+        """
+        Chạy `fn(*args, events)` trên worker và lần lượt yield các sự kiện mà
+        worker đẩy vào queue `events`; cuối cùng yield ("result", giá trị trả về).
+
+        Raises SolverBusyError nếu hàng đợi đã đầy. Nếu phía đọc dừng sớm
+        (client ngắt kết nối), lời giải vẫn giữ chỗ trong hàng đợi cho tới khi
+        worker chạy xong.
+        """
+        if self._pending >= self.max_pending:
+            raise SolverBusyError(
+                f"Solver pool saturated ({self._pending}/{self.max_pending})"
+            )
+
+        self.start()
+        events = self.manager().Queue()
+
+        self._pending += 1
+        task = asyncio.ensure_future(self.submit(fn, *args, events))
+        task.add_done_callback(self._release_slot)
+
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                yield await loop.run_in_executor(None, events.get, True, _STREAM_POLL_S)
+            except Empty:
+                if task.done():
+                    break
+        # Worker đã xong → mọi sự kiện đã nằm trong queue
+        while not events.empty():
+            yield events.get_nowait()
+        yield ("result", await task)
+
+    async def map_unordered(
+        self, fn: Callable[..., Any], args_list: Sequence[tuple],
+        concurrency: Optional[int] = None,
+    ) -> AsyncIterator[tuple[int, Any, Optional[BaseException]]]:
+        """
+        Chạy `fn(*args)` cho từng phần tử của `args_list`, tối đa `concurrency`
+        (mặc định = số worker, không vượt chỗ trống của hàng đợi) tác vụ cùng
+        lúc, và yield (index, kết quả, exception) theo thứ tự HOÀN THÀNH.
+
+        Raises SolverBusyError nếu hàng đợi không còn chỗ. Nếu phía đọc dừng
+        sớm, các tác vụ chưa bắt đầu bị hủy.
+        """
+        if not args_list:
+            return
+        concurrency = min(len(args_list), concurrency or self.workers,
+                          self.max_pending - self._pending)
+        if concurrency <= 0:
+            raise SolverBusyError(
+                f"Solver pool saturated ({self._pending}/{self.max_pending})"
+            )
+
+        async with self.reserve(concurrency):
+            queue = iter(enumerate(args_list))
+            running: dict[asyncio.Future, int] = {}
+
+            def launch() -> None:
+                for index, args in queue:
+                    running[asyncio.ensure_future(self.submit(fn, *args))] = index
+                    if len(running) >= concurrency:
+                        return
+
+            launch()
+            try:
+                while running:
+                    done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        index = running.pop(task)
+                        error = task.exception()
+                        yield index, (None if error else task.result()), error
+                    launch()
+            finally:
+                for task in running:
+                    task.cancel()
+
+    def _release_slot(self, _task: asyncio.Future) -> None:
+        self._pending -= 1
+
+
+solver_pool = SolverPool()
@@ -0,0 +1,173 @@
+"""
+Benchmark: O(1) forward-slack feasibility vs. full route re-simulation.
+
+Phần 1 — dựng các cá thể Heuristic (Labadie):
+  • legacy – mỗi ứng viên gọi try_add_poi → check_constraints (O(n)/lần thử)
+  • slack  – can_insert trên lịch trình của Individual (O(1)/lần thử), mỗi
+             cá thể dựng độc lập (_create_heuristic_individual)
+  • shared – một _LabadieBuilder cho cả 40 cá thể như initialize_population
+             (score × weight, RCL bước đầu, POI hết chỗ trong ngày dùng chung)
+  Cùng seed → mọi cách phải cho ra CÙNG route (kiểm tra tính đúng đắn).
+
+Phần 2 — riêng phép kiểm tra chèn: mọi cặp (vị trí, POI chưa đi) trên route
+dài nhất tìm được, so sánh check_constraints(route đã chèn) với can_insert.
+
+Chạy từ thư mục backend/:
+    python -m benchmarks.bench_feasibility [--repeat 3] [--seed 42]
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import time
+
+from app.models.domain import Individual, PoiCatalogue
+from app.models.schemas import UserPreferences
+from app.services.data_loader import _load_from_disk
+from app.services.algorithm.fitness import (
+    build_distance_matrix,
+    check_constraints,
+    try_add_poi,
+)
+from app.services.algorithm.initialization import (
+    HEURISTIC_COUNT,
+    RCL_SIZE,
+    _LabadieBuilder,
+    _create_heuristic_individual,
+    _labadie_ratio,
+)
+from app.services.algorithm.poi_index import get_poi_index
+from app.services.algorithm.schedule import can_insert, compute_schedule
+
+INSTANCES = ('C101', 'R101', 'RC101')
+
+PREFS = UserPreferences(
+    budget=2_000_000,
+    start_time=0.0,
+    end_time=23.0,
+    start_node_id=0,
+    interests={
+        'history_culture': 5,
+        'nature_parks': 3,
+        'food_drink': 4,
+        'shopping': 2,
+        'entertainment': 3,
+    },
+)
+
+
+def _legacy_heuristic_individual(pois, depot, user_prefs, dist) -> Individual:
+    """Bản cũ của _create_heuristic_individual (re-simulate mỗi ứng viên)."""
+    route = [depot]
+    unvisited = {p.id for p in pois if p.id != depot.id}
+    poi_map = {p.id: p for p in pois}
+
+    while unvisited:
+        current = route[-1]
+        candidates = []
+        for pid in list(unvisited):
+            poi = poi_map[pid]
+            if try_add_poi(route, poi, user_prefs, dist):
+                candidates.append((poi, _labadie_ratio(poi, current, user_prefs, dist)))
+        if not candidates:
+            break
+        candidates.sort(key=lambda x: x[1], reverse=True)
+        chosen_poi, _ = random.choice(candidates[:RCL_SIZE])
+        route.append(chosen_poi)
+        unvisited.discard(chosen_poi.id)
+
+    route.append(depot)
+    return Individual(route=route)
+
+
+def _shared_builder(pois, depot, user_prefs, dist):
+    """Builder dùng chung cho cả quần thể (như initialize_population)."""
+    builder = _LabadieBuilder(pois, depot, user_prefs, dist, get_poi_index(dist), depot)
+    return builder.build
+
+
+def _per_call(build):
+    return lambda pois, depot, user_prefs, dist: lambda: build(pois, depot, user_prefs, dist)
+
+
+def _time_builds(make_builder, catalogue, dist, seed: int, repeat: int):
+    depot = catalogue.by_id[0]
+    best = float('inf')
+    routes = []
+    for _ in range(repeat):
+        random.seed(seed)
+        t0 = time.perf_counter()
+        build = make_builder(catalogue.pois, depot, PREFS, dist)
+        population = [build() for _ in range(HEURISTIC_COUNT)]
+        best = min(best, time.perf_counter() - t0)
+        routes = [[p.id for p in ind.route] for ind in population]
+    return best, routes
+
+
+def _time_insertion_checks(route, catalogue, dist, repeat: int):
+    ind = Individual(route=list(route))
+    compute_schedule(ind, PREFS, dist)
+    in_route = {p.id for p in route}
+    pairs = [(pos, poi) for pos in range(1, len(route))
+             for poi in catalogue.pois if poi.id not in in_route]
+
+    legacy_best = slack_best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        legacy = [check_constraints(route[:pos] + [poi] + route[pos:], PREFS, dist)
+                  for pos, poi in pairs]
+        legacy_best = min(legacy_best, time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        slack = [can_insert(ind, pos, poi, PREFS, dist) for pos, poi in pairs]
+        slack_best = min(slack_best, time.perf_counter() - t0)
+
+    return len(pairs), legacy_best, slack_best, legacy == slack
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    datasets = {}
+    for name in INSTANCES:
+        with contextlib.redirect_stdout(io.StringIO()):
+            catalogue = PoiCatalogue(name, _load_from_disk(f'{name}.csv'))
+            dist = build_distance_matrix(catalogue.pois, key=catalogue.key)
+        datasets[name] = (catalogue, dist)
+
+    print(f"Heuristic initialization ({HEURISTIC_COUNT} individuals)")
+    print(f"{'instance':<8} {'legacy (ms)':>12} {'slack (ms)':>11} {'shared (ms)':>12} "
+          f"{'speedup':>8} {'avg len':>8}  identical")
+    longest = {}
+    for name, (catalogue, dist) in datasets.items():
+        legacy_t, legacy_routes = _time_builds(
+            _per_call(_legacy_heuristic_individual), catalogue, dist, args.seed, args.repeat)
+        slack_t, slack_routes = _time_builds(
+            _per_call(_create_heuristic_individual), catalogue, dist, args.seed, args.repeat)
+        shared_t, shared_routes = _time_builds(
+            _shared_builder, catalogue, dist, args.seed, args.repeat)
+
+        avg_len = sum(len(r) for r in shared_routes) / len(shared_routes)
+        print(f"{name:<8} {legacy_t * 1e3:>12.1f} {slack_t * 1e3:>11.1f} {shared_t * 1e3:>12.1f} "
+              f"{legacy_t / shared_t:>7.1f}x {avg_len:>8.1f}  "
+              f"{legacy_routes == slack_routes == shared_routes}")
+        longest[name] = [catalogue.by_id[i] for i in max(slack_routes, key=len)]
+
+    print("\nInsertion feasibility checks (every position × unvisited POI)")
+    print(f"{'instance':<8} {'route len':>9} {'checks':>7} {'legacy (µs)':>12} "
+          f"{'slack (µs)':>11} {'speedup':>8}  identical")
+    for name, (catalogue, dist) in datasets.items():
+        route = longest[name]
+        count, legacy_t, slack_t, same = _time_insertion_checks(
+            route, catalogue, dist, args.repeat)
+        print(f"{name:<8} {len(route):>9} {count:>7} {legacy_t / count * 1e6:>12.2f} "
+              f"{slack_t / count * 1e6:>11.2f} {legacy_t / slack_t:>7.1f}x  {same}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""
+Benchmark: thông lượng + chất lượng lời giải HGA trên các instance Solomon.
+
+Chạy HybridGeneticAlgorithm (seed cố định) cho mọi tổ hợp instance × profile
+sở thích × seed và đo:
+  • thời gian từng pha: init, selection, crossover, mutation, repair,
+    diversity, evaluation, local_search — lấy từ SolverProfile của engine
+    (init đã gồm lượt evaluation đầu tiên)
+  • số thế hệ chạy và thế hệ cải thiện cuối cùng (hội tụ)
+  • điểm tốt nhất so với điểm tham chiếu (benchmarks/reference_scores.json —
+    điểm tốt nhất đã biết của từng instance × profile)
+  • số lần đánh giá fitness / giây
+
+Kết quả ghi ra JSON (--output) để so sánh giữa các phiên bản; --baseline
+so với một file JSON cũ và trả về exit code 1 nếu điểm trung bình giảm quá
+--max-score-drop hoặc thời gian tăng quá --max-slowdown.
+
+Local search có giới hạn thời gian (local_search_ms) nên khi máy bận điểm có
+thể lệch nhẹ giữa các lần chạy cùng seed; `--local-search-ms inf` chạy local
+search tới cực trị địa phương → kết quả lặp lại hoàn toàn (nhưng chậm hơn).
+
+Chạy từ thư mục backend/:
+    python -m benchmarks.bench_solver [--seeds 3] [--output bench.json]
+        [--baseline old.json] [--update-reference] [--local-search-ms inf]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from app.models.schemas import UserPreferences
+from app.services.algorithm.hga_engine import HybridGeneticAlgorithm
+from app.services.algorithm.profiling import PHASE_METHODS
+
+# Khung giờ (start, end) theo horizon của depot từng instance (đơn vị giờ → phút × 60)
+INSTANCES = {
+    'C101':  (8.0, 17.0),
+    'R101':  (0.0, 3.8),
+    'RC101': (0.0, 4.0),
+}
+
+PROFILES = {
+    'culture': dict(budget=500_000, interests={
+        'history_culture': 5, 'nature_parks': 3, 'food_drink': 4,
+        'shopping': 1, 'entertainment': 2}),
+    'nature_low_budget': dict(budget=200_000, interests={
+        'history_culture': 1, 'nature_parks': 5, 'food_drink': 2,
+        'shopping': 3, 'entertainment': 4}),
+    'balanced': dict(budget=2_000_000, interests={
+        'history_culture': 3, 'nature_parks': 3, 'food_drink': 3,
+        'shopping': 3, 'entertainment': 3}),
+}
+
+PHASES = tuple(PHASE_METHODS)
+
+REFERENCE_FILE = Path(__file__).with_name('reference_scores.json')
+
+
+def _prefs(instance: str, profile: str) -> UserPreferences:
+    start, end = INSTANCES[instance]
+    return UserPreferences(dataset=instance, start_time=start, end_time=end,
+                           start_node_id=0, **PROFILES[profile])
+
+
+def run_once(instance: str, profile: str, seed: int) -> dict:
+    """One seeded solve with per-phase timings (SolverProfile của engine)."""
+    prefs = _prefs(instance, profile)
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = HybridGeneticAlgorithm(prefs)     # Nạp dataset ngoài phần đo
+        random.seed(seed)
+        t0 = time.perf_counter()
+        result = engine.run()
+        wall = time.perf_counter() - t0
+
+    evaluations = result.profile.counters.get('fitness_evaluations', 0)
+    return {
+        "instance": instance,
+        "profile": profile,
+        "seed": seed,
+        "score": result.total_score,
+        "route_length": len(result.route),
+        "generations": engine.generation,
+        "converged_at": engine.generation - engine.gens_without_improvement,
+        "wall_ms": wall * 1e3,
+        "phases_ms": dict(result.profile.timings_ms),
+        "evaluations": evaluations,
+        "evals_per_s": evaluations / wall if wall > 0 else 0.0,
+    }
+
+
+def summarize(runs: list[dict], reference: dict) -> list[dict]:
+    groups: dict[tuple[str, str], list[dict]] = {}
+    for run in runs:
+        groups.setdefault((run["instance"], run["profile"]), []).append(run)
+
+    summary = []
+    for (instance, profile), group in groups.items():
+        scores = [r["score"] for r in group]
+        ref = reference.get(instance, {}).get(profile)
+        mean_score = statistics.fmean(scores)
+        summary.append({
+            "instance": instance,
+            "profile": profile,
+            "runs": len(group),
+            "score_mean": mean_score,
+            "score_best": max(scores),
+            "score_worst": min(scores),
+            "reference": ref,
+            "gap_pct": (ref - mean_score) / ref * 100 if ref else None,
+            "wall_ms_mean": statistics.fmean(r["wall_ms"] for r in group),
+            "generations_mean": statistics.fmean(r["generations"] for r in group),
+            "converged_at_mean": statistics.fmean(r["converged_at"] for r in group),
+            "evals_per_s_mean": statistics.fmean(r["evals_per_s"] for r in group),
+            "phases_ms_mean": {p: statistics.fmean(r["phases_ms"][p] for r in group)
+                               for p in PHASES},
+        })
+    return summary
+
+
+def compare(summary: list[dict], baseline: dict, max_score_drop: float,
+            max_slowdown: float) -> list[str]:
+    """Regressions of `summary` against the summary of a previous JSON report."""
+    previous = {(s["instance"], s["profile"]): s for s in baseline.get("summary", [])}
+    problems = []
+    for s in summary:
+        old = previous.get((s["instance"], s["profile"]))
+        if old is None:
+            continue
+        label = f"{s['instance']}/{s['profile']}"
+        if old["score_mean"] > 0:
+            drop = (old["score_mean"] - s["score_mean"]) / old["score_mean"] * 100
+            if drop > max_score_drop:
+                problems.append(f"{label}: score {old['score_mean']:.2f} → "
+                                f"{s['score_mean']:.2f} (-{drop:.1f}%)")
+        slowdown = (s["wall_ms_mean"] / old["wall_ms_mean"] - 1) * 100
+        if slowdown > max_slowdown:
+            problems.append(f"{label}: wall time {old['wall_ms_mean']:.0f} → "
+                            f"{s['wall_ms_mean']:.0f} ms (+{slowdown:.0f}%)")
+    return problems
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seeds', type=int, default=3, help="Số seed mỗi tổ hợp")
+    parser.add_argument('--seed', type=int, default=42, help="Seed đầu tiên")
+    parser.add_argument('--instances', nargs='+', default=list(INSTANCES), choices=INSTANCES)
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES), choices=PROFILES)
+    parser.add_argument('--output', type=Path, help="Ghi kết quả JSON ra file")
+    parser.add_argument('--baseline', type=Path, help="JSON của lần chạy trước để so sánh")
+    parser.add_argument('--max-score-drop', type=float, default=1.0, help="%% (mặc định 1)")
+    parser.add_argument('--max-slowdown', type=float, default=20.0, help="%% (mặc định 20)")
+    parser.add_argument('--local-search-ms', type=float,
+                        default=HybridGeneticAlgorithm.local_search_ms,
+                        help="Giới hạn local search mỗi thế hệ (ms); inf = không giới hạn")
+    parser.add_argument('--update-reference', action='store_true',
+                        help="Cập nhật reference_scores.json nếu tìm được điểm tốt hơn")
+    args = parser.parse_args()
+
+    HybridGeneticAlgorithm.local_search_ms = args.local_search_ms
+    HybridGeneticAlgorithm.profiling = True
+    reference = json.loads(REFERENCE_FILE.read_text()) if REFERENCE_FILE.is_file() else {}
+    seeds = range(args.seed, args.seed + args.seeds)
+
+    runs = []
+    for instance in args.instances:
+        for profile in args.profiles:
+            for seed in seeds:
+                run = run_once(instance, profile, seed)
+                runs.append(run)
+                print(f"{instance:<6} {profile:<18} seed={seed:<4} score={run['score']:>7.2f} "
+                      f"gens={run['generations']:>3} wall={run['wall_ms']:>7.1f} ms "
+                      f"evals/s={run['evals_per_s']:>8.0f}")
+
+    summary = summarize(runs, reference)
+    print(f"\n{'instance':<8} {'profile':<18} {'mean':>7} {'best':>7} {'ref':>7} {'gap%':>6} "
+          f"{'wall ms':>8} {'gens':>5} {'conv':>5} {'evals/s':>8}")
+    for s in summary:
+        ref = f"{s['reference']:.2f}" if s['reference'] is not None else '-'
+        gap = f"{s['gap_pct']:.1f}" if s['gap_pct'] is not None else '-'
+        print(f"{s['instance']:<8} {s['profile']:<18} {s['score_mean']:>7.2f} "
+              f"{s['score_best']:>7.2f} {ref:>7} {gap:>6} {s['wall_ms_mean']:>8.1f} "
+              f"{s['generations_mean']:>5.0f} {s['converged_at_mean']:>5.0f} "
+              f"{s['evals_per_s_mean']:>8.0f}")
+
+    totals = {p: statistics.fmean(s["phases_ms_mean"][p] for s in summary) for p in PHASES}
+    print("\nMean time per phase (ms): " +
+          ", ".join(f"{p}={ms:.1f}" for p, ms in totals.items()))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "seeds": list(seeds),
+            "solver_config": HybridGeneticAlgorithm.solver_config(),
+        },
+        "runs": runs,
+        "summary": summary,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nReport written to {args.output}")
+
+    if args.update_reference:
+        for s in summary:
+            best = reference.setdefault(s["instance"], {}).get(s["profile"])
+            if best is None or s["score_best"] > best:
+                reference[s["instance"]][s["profile"]] = s["score_best"]
+        REFERENCE_FILE.write_text(json.dumps(reference, indent=2, sort_keys=True) + "\n")
+        print(f"Reference scores updated: {REFERENCE_FILE}")
+
+    if args.baseline:
+        problems = compare(summary, json.loads(args.baseline.read_text()),
+                           args.max_score_drop, args.max_slowdown)
+        if problems:
+            print("\nREGRESSIONS vs. baseline:")
+            for line in problems:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions vs. baseline.")
+
+
+if __name__ == '__main__':
+    main()
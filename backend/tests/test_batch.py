@@ -0,0 +1,76 @@
+"""
+POST /api/optimize/batch: khi solver pool đầy giữa chừng, mỗi phần tử chưa
+giải nhận một dòng 503 mang `index`; metrics ghi đúng kết quả thật của
+request (503, hoặc "cancelled" khi client ngắt kết nối) thay vì luôn 200.
+
+Solver pool được thay bằng map_unordered giả (giải trong process).
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.api import routes
+from app.models.schemas import UserPreferences
+from app.services.metrics import metrics
+from app.services.solver_pool import SolverBusyError, solve_itinerary
+
+INTERESTS = {'history_culture': 5, 'nature_parks': 3, 'food_drink': 4,
+             'shopping': 1, 'entertainment': 2}
+
+
+def _requests(n: int) -> list:
+    # Budget khác nhau → cache key khác nhau, không trúng result cache
+    return [UserPreferences(dataset='C101', start_time=8.0, end_time=17.0,
+                            budget=321_000 + i, start_node_id=0, interests=INTERESTS)
+            for i in range(n)]
+
+
+def _batch_count(status) -> int:
+    label = f'hga_http_requests_total{{endpoint="batch",status="{status}"}} '
+    for line in metrics.render().splitlines():
+        if line.startswith(label):
+            return int(float(line[len(label):]))
+    return 0
+
+
+@pytest.fixture
+def busy_after_first(monkeypatch):
+    """map_unordered giải phần tử đầu tiên rồi báo pool đầy."""
+    async def map_unordered(fn, args_list, concurrency=None):
+        yield 0, solve_itinerary(*args_list[0]), None
+        raise SolverBusyError("saturated")
+
+    monkeypatch.setattr(routes.solver_pool, 'map_unordered', map_unordered)
+
+
+async def _lines(requests: list, limit=None) -> list:
+    response = await routes.optimize_batch(requests)
+    lines = []
+    async for chunk in response.body_iterator:
+        lines.append(json.loads(chunk))
+        if limit is not None and len(lines) >= limit:
+            await response.body_iterator.aclose()   # Client ngắt kết nối
+            break
+    return lines
+
+
+def test_busy_lines_carry_unprocessed_indices(busy_after_first):
+    before = _batch_count(503)
+    requests = _requests(3)
+
+    lines = asyncio.run(_lines(requests))
+
+    assert [(line['index'], line['status']) for line in lines] == [(0, 200), (1, 503), (2, 503)]
+    assert all(line['detail'] == routes.BUSY_DETAIL for line in lines[1:])
+    assert _batch_count(503) == before + 1
+
+
+def test_client_disconnect_is_recorded_as_cancelled(busy_after_first):
+    before = _batch_count('cancelled'), _batch_count(200)
+
+    lines = asyncio.run(_lines(_requests(3), limit=1))
+
+    assert [line['index'] for line in lines] == [0]
+    assert (_batch_count('cancelled'), _batch_count(200)) == (before[0] + 1, before[1])
@@ -0,0 +1,154 @@
+"""
+Exactness of delta evaluation (delta.py) and MaxShift feasibility (schedule.py).
+
+Both modules promise the SAME answer as a full re-evaluation:
+  • delta_*(ind, ...)       == calculate_fitness(new) − calculate_fitness(old)
+  • can_insert / _many      == check_constraints(route sau khi chèn)
+Kiểm tra trên các route ngẫu nhiên (seed cố định) của C101 / R101, gồm cả
+chuyến đi nhiều ngày (separator = Depot lặp lại).
+"""
+
+import random
+
+import pytest
+
+from app.models.domain import Individual
+from app.models.schemas import UserPreferences
+from app.services.algorithm.delta import (
+    delta_insert,
+    delta_or_opt,
+    delta_remove,
+    delta_swap,
+    delta_two_opt,
+    or_opt_route,
+)
+from app.services.algorithm.fitness import (
+    build_distance_matrix,
+    calculate_fitness,
+    check_constraints,
+)
+from app.services.algorithm.schedule import (
+    can_insert,
+    can_insert_many,
+    compute_schedule,
+    insert_poi,
+    remove_poi,
+)
+from app.services.data_loader import get_catalogue
+
+DATASETS = ('C101', 'R101')
+CATEGORIES = ('history_culture', 'nature_parks', 'food_drink', 'shopping', 'entertainment')
+TRIALS = 150
+
+
+@pytest.fixture(scope='module', params=DATASETS)
+def dataset(request):
+    catalogue = get_catalogue(request.param)
+    pois = list(catalogue.pois)
+    return pois, build_distance_matrix(pois, key=catalogue.key)
+
+
+def _random_prefs(rng: random.Random, horizon: float) -> UserPreferences:
+    end = rng.uniform(0.5, 1.0) * horizon / 60.0
+    return UserPreferences(
+        budget=rng.choice([100_000, 500_000, 2_000_000]),
+        start_time=0.0, end_time=max(end, 1.0), start_node_id=0,
+        interests={c: rng.randint(1, 5) for c in CATEGORIES},
+    )
+
+
+def _random_route(rng: random.Random, pois: list, days: int) -> list:
+    depot = pois[0]
+    route = [depot]
+    for _ in range(days):
+        route += rng.sample(pois[1:], rng.randint(2, 8)) + [depot]
+    return route
+
+
+def _fitness(route: list, prefs: UserPreferences, dist) -> float:
+    return calculate_fitness(Individual(list(route)), prefs, dist)
+
+
+# =============================================================================
+#  Delta evaluation
+# =============================================================================
+
+def test_deltas_match_full_evaluation(dataset):
+    pois, dist = dataset
+    rng = random.Random(7)
+    horizon = pois[0].close_time
+
+    for _ in range(TRIALS):
+        prefs = _random_prefs(rng, horizon)
+        route = _random_route(rng, pois, days=rng.choice([1, 1, 2, 3]))
+        n = len(route)
+        ind = Individual(list(route))
+        old = calculate_fitness(ind, prefs, dist)
+
+        i, j = sorted(rng.sample(range(1, n - 1), 2))
+        outside = [p for p in pois[1:] if p not in route]
+        poi = rng.choice(outside)
+        pos = rng.randint(1, n - 1)
+        rp = rng.randint(1, n - 2)
+        seg_len = rng.randint(1, min(3, n - 1 - i))
+        targets = [k for k in range(1, n - seg_len) if k != i]
+        if not targets:
+            seg_len, targets = 1, [k for k in range(1, n - 1) if k != i]
+        at = rng.choice(targets)
+
+        cases = [
+            (delta_two_opt(ind, i, j, prefs, dist),
+             route[:i] + route[i:j + 1][::-1] + route[j + 1:]),
+            (delta_swap(ind, j, i, prefs, dist),
+             route[:i] + [route[j]] + route[i + 1:j] + [route[i]] + route[j + 1:]),
+            (delta_insert(ind, pos, poi, prefs, dist),
+             route[:pos] + [poi] + route[pos:]),
+            (delta_remove(ind, rp, prefs, dist),
+             route[:rp] + route[rp + 1:]),
+            (delta_or_opt(ind, i, seg_len, at, prefs, dist),
+             or_opt_route(route, i, seg_len, at)),
+        ]
+        for delta, new_route in cases:
+            assert delta == _fitness(new_route, prefs, dist) - old
+        assert ind.route == route   # Delta không sửa route
+
+
+def test_or_opt_route_moves_segment():
+    route = list(range(8))
+    assert or_opt_route(route, 2, 2, 5) == [0, 1, 4, 5, 6, 2, 3, 7]
+    assert or_opt_route(route, 4, 3, 1) == [0, 4, 5, 6, 1, 2, 3, 7]
+
+
+# =============================================================================
+#  MaxShift insertion feasibility
+# =============================================================================
+
+def test_can_insert_matches_check_constraints(dataset):
+    pois, dist = dataset
+    rng = random.Random(11)
+    horizon = pois[0].close_time
+
+    for _ in range(TRIALS // 3):
+        prefs = _random_prefs(rng, horizon)
+        days = rng.choice([1, 2])
+        ind = Individual([pois[0]] * (days + 1))
+        compute_schedule(ind, prefs, dist)
+
+        for _ in range(20):
+            route = ind.route
+            outside = [p for p in pois[1:] if p not in route]
+            pos = rng.randint(1, len(route) - 1)
+            candidates = rng.sample(outside, 10)
+
+            expected = [check_constraints(route[:pos] + [p] + route[pos:], prefs, dist)
+                        for p in candidates]
+            assert [can_insert(ind, pos, p, prefs, dist) for p in candidates] == expected
+            assert can_insert_many(ind, pos, candidates, prefs, dist) == expected
+
+            # Thay đổi route (chủ yếu chèn khả thi) rồi kiểm tra tiếp
+            feasible = [p for p, ok in zip(candidates, expected) if ok]
+            if feasible:
+                insert_poi(ind, pos, feasible[0], prefs, dist)
+            elif len(route) > days + 2 and rng.random() < 0.5:
+                interior = [k for k in range(1, len(route) - 1) if route[k].id != 0]
+                remove_poi(ind, rng.choice(interior), prefs, dist)
@@ -0,0 +1,90 @@
+"""
+evaluate_population (vector hóa theo quần thể) phải trùng khớp TỪNG BIT với
+calculate_fitness trên từng route — kể cả chuyến đi nhiều ngày (separator)
+và điểm đầu / cuối khác depot (PoiCatalogue.endpoint).
+"""
+
+import random
+
+import pytest
+
+from app.models.domain import Individual
+from app.models.schemas import UserPreferences
+from app.services.algorithm.fitness import (
+    build_distance_matrix,
+    calculate_fitness,
+    evaluate_population,
+)
+from app.services.algorithm.hga_engine import HybridGeneticAlgorithm
+from app.services.data_loader import get_catalogue
+
+DATASETS = ('C101', 'R101', 'RC101')
+CATEGORIES = ('history_culture', 'nature_parks', 'food_drink', 'shopping', 'entertainment')
+POPULATION = 60
+
+
+def _random_prefs(rng: random.Random, horizon: float, **nodes) -> UserPreferences:
+    return UserPreferences(
+        budget=rng.choice([100_000, 500_000, 2_000_000]),
+        start_time=0.0, end_time=max(rng.uniform(0.5, 1.0) * horizon / 60.0, 1.0),
+        days=rng.choice([1, 2, 3]),
+        interests={c: rng.randint(1, 5) for c in CATEGORIES},
+        **nodes,
+    )
+
+
+def _random_population(rng: random.Random, visitable: list, start, end, days: int) -> list:
+    population = []
+    for _ in range(POPULATION):
+        route = [start]
+        for day in range(days):
+            route += rng.sample(visitable, rng.randint(0, min(10, len(visitable))))
+            route.append(end if day == days - 1 else start)
+        population.append(Individual(route))
+    return population
+
+
+def _assert_matches_scalar(population: list, prefs: UserPreferences, dist) -> None:
+    evaluate_population(population, prefs, dist)
+    for ind in population:
+        ref = Individual(list(ind.route))
+        calculate_fitness(ref, prefs, dist)
+        for field in Individual.FITNESS_FIELDS:
+            assert getattr(ind, field) == getattr(ref, field), (field, ind.ids.tolist())
+
+
+@pytest.mark.parametrize('name', DATASETS)
+@pytest.mark.parametrize('distinct_end', [False, True])
+def test_batched_matches_scalar_on_catalogue(name, distinct_end):
+    catalogue = get_catalogue(name)
+    dist = build_distance_matrix(list(catalogue.pois), key=catalogue.key)
+    rng = random.Random(DATASETS.index(name) * 2 + distinct_end)
+    horizon = catalogue.pois[0].close_time
+
+    for _ in range(10):
+        start_id = rng.choice([0, rng.randrange(1, len(catalogue))])
+        end_id = start_id
+        if distinct_end:
+            end_id = rng.choice([i for i in range(len(catalogue)) if i != start_id])
+        prefs = _random_prefs(rng, horizon, start_node_id=start_id,
+                              end_node_id=end_id if distinct_end else None)
+        start, end = catalogue.endpoint(start_id), catalogue.endpoint(end_id)
+        visitable = [p for p in catalogue.pois if p.id not in (0, start_id, end_id)]
+        population = _random_population(rng, visitable, start, end, prefs.days)
+        _assert_matches_scalar(population, prefs, dist)
+
+
+@pytest.mark.parametrize('name', DATASETS)
+def test_batched_matches_scalar_on_reduced_problem(name):
+    catalogue = get_catalogue(name)
+    rng = random.Random(DATASETS.index(name))
+    horizon = catalogue.pois[0].close_time
+
+    for _ in range(6):
+        end_id = rng.choice([None, rng.randrange(1, len(catalogue))])
+        prefs = _random_prefs(rng, horizon, start_node_id=0, end_node_id=end_id)
+        engine = HybridGeneticAlgorithm(prefs)
+        start, end = engine.depot, engine.end_depot
+        visitable = [p for p in engine.pois if p is not start and p is not end]
+        population = _random_population(rng, visitable, start, end, prefs.days)
+        _assert_matches_scalar(population, prefs, engine.dist)
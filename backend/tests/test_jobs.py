@@ -0,0 +1,93 @@
+"""
+Job API (JobManager): DELETE một job đang chạy phải dừng HybridGeneticAlgorithm.run
+qua `should_stop`, và job không ghé được POI nào kết thúc `failed` với cùng
+thông báo như /optimize.
+
+Solver pool giả chạy lời giải trong thread (thay vì process) với
+threading.Event thay cho Event của Manager — cùng đường đi solve_cancellable.
+"""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from app.models.schemas import JobStatus, UserPreferences
+from app.services.algorithm.hga_engine import HybridGeneticAlgorithm
+from app.services.jobs import InMemoryJobStore, JobManager
+from app.services.solver_pool import empty_route_detail
+
+INTERESTS = {'history_culture': 5, 'nature_parks': 3, 'food_drink': 4,
+             'shopping': 1, 'entertainment': 2}
+TIMEOUT_S = 30.0
+SAFETY_BUDGET_MS = 10_000.0
+
+
+class ThreadPool:
+    """Thay SolverPool: chạy `fn(*args)` trong thread của asyncio."""
+
+    def __init__(self):
+        self.calls = 0
+        self._manager = SimpleNamespace(Event=threading.Event)
+
+    def manager(self):
+        return self._manager
+
+    async def run(self, fn, *args):
+        self.calls += 1
+        return await asyncio.to_thread(fn, *args)
+
+
+async def _wait_for(manager: JobManager, job_id: str, predicate) -> object:
+    deadline = time.monotonic() + TIMEOUT_S
+    while not predicate(manager.get(job_id)):
+        assert time.monotonic() < deadline, manager.get(job_id).status
+        await asyncio.sleep(0.01)
+    return manager.get(job_id)
+
+
+def _run_job(prefs: UserPreferences, cancel_when_running: bool):
+    async def scenario():
+        manager = JobManager(ThreadPool(), InMemoryJobStore(), workers=1)
+        job = manager.submit(prefs)
+        cancelled_at = None
+        if cancel_when_running:
+            await _wait_for(manager, job.id, lambda j: j.status == JobStatus.RUNNING)
+            await asyncio.sleep(0.2)    # Để worker vào vòng lặp tiến hóa
+            cancelled_at = time.monotonic()
+            await asyncio.to_thread(manager.cancel, job.id)   # Như route DELETE (sync)
+        job = await _wait_for(manager, job.id, lambda j: j.status.finished)
+        stop_latency = time.monotonic() - cancelled_at if cancelled_at else None
+        await manager.shutdown()
+        return job, manager, stop_latency
+    return asyncio.run(scenario())
+
+
+def test_cancel_running_job_stops_solver(monkeypatch):
+    # Chỉ should_stop dừng được lời giải; time budget là lưới an toàn để một
+    # lỗi hủy job làm test fail (dừng quá muộn) thay vì treo mãi
+    monkeypatch.setattr(HybridGeneticAlgorithm, 'generations', 10 ** 9)
+    monkeypatch.setattr(HybridGeneticAlgorithm, 'stagnation_limit', 10 ** 9)
+    prefs = UserPreferences(dataset='C101', start_time=8.0, end_time=17.0, budget=500_000,
+                            start_node_id=0, interests=INTERESTS,
+                            time_budget_ms=SAFETY_BUDGET_MS)
+
+    job, manager, stop_latency = _run_job(prefs, cancel_when_running=True)
+
+    assert stop_latency < SAFETY_BUDGET_MS / 1000 / 2     # Dừng ở thế hệ kế tiếp
+    assert job.status == JobStatus.CANCELLED
+    assert job.result is None
+    assert manager.pool.calls == 1
+    assert not manager._cancel_events and not manager._cancelled
+
+
+def test_empty_route_job_fails_with_optimize_detail():
+    prefs = UserPreferences(dataset='C101', start_time=8.0, end_time=9.0, budget=1_000,
+                            start_node_id=0, interests=INTERESTS)
+
+    job, _, _ = _run_job(prefs, cancel_when_running=False)
+
+    assert job.status == JobStatus.FAILED
+    assert job.result is None
+    assert job.error == empty_route_detail(prefs, HybridGeneticAlgorithm(prefs).run())
+    assert job.error.startswith("Không thể ghé thăm bất kỳ điểm nào")
@@ -0,0 +1,70 @@
+"""
+Memetic stage trong vòng lặp GA: Local Search không được sửa cá thể tại chỗ
+khi cá thể đó cũng là best_ever — nếu không, cải thiện của Local Search bị
+tính là "không cải thiện" và Early Stopping dừng sớm.
+"""
+
+import random
+
+import pytest
+
+from app.models.schemas import UserPreferences
+from app.services.algorithm.hga_engine import HybridGeneticAlgorithm
+from app.services.algorithm.local_search import improve_individual
+
+INTERESTS = {'history_culture': 5, 'nature_parks': 3, 'food_drink': 4,
+             'shopping': 1, 'entertainment': 2}
+
+
+@pytest.fixture
+def engine():
+    random.seed(3)
+    engine = HybridGeneticAlgorithm(UserPreferences(
+        dataset='C101', start_time=8.0, end_time=17.0, budget=500_000,
+        start_node_id=0, interests=INTERESTS))
+    engine.initialize_population()
+    return engine
+
+
+def _improvable(engine):
+    for ind in engine.population:
+        trial = ind.copy()
+        if improve_individual(trial, engine.poi_map, engine.user_prefs, engine.dist,
+                              float('inf')):
+            return ind, trial.fitness
+    pytest.fail("no individual improved by local search")
+
+
+def test_local_search_gain_on_best_resets_stagnation(engine):
+    best, improved_fitness = _improvable(engine)
+    old_fitness, old_route = best.fitness, list(best.route)
+
+    # Một thế hệ chỉ gồm elite đó: mọi cải thiện đến từ Local Search
+    engine.population_size = engine.elitism_rate = engine.local_search_elites = 1
+    engine.local_search_ms = float('inf')
+    engine.population = [best]
+    engine.best_ever = best
+    engine.gens_without_improvement = 3
+
+    engine.step()
+
+    assert engine.population[0].fitness == improved_fitness > old_fitness
+    assert engine.best_ever is engine.population[0]
+    assert engine.gens_without_improvement == 0
+    # Cá thể cũ (tham chiếu best_ever trước đó) không bị sửa
+    assert best.fitness == old_fitness and best.route == old_route
+
+
+def test_local_optimum_elite_counts_as_stagnation(engine):
+    best, _ = _improvable(engine)
+    engine.population_size = engine.elitism_rate = engine.local_search_elites = 1
+    engine.local_search_ms = float('inf')
+    engine.population = [best]
+    engine.best_ever = best
+
+    engine.step()                       # Local Search → cực trị địa phương
+    engine.gens_without_improvement = 0
+    engine.step()                       # Không còn gì để cải thiện
+
+    assert engine.gens_without_improvement == 1
+    assert engine.population[0].local_optimum
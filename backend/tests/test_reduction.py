@@ -0,0 +1,82 @@
+"""
+Problem Reduction: bài toán con đánh lại chỉ số POI, response phải ánh xạ
+ngược về đúng id gốc của catalogue (sai ánh xạ = API trả sai POI, không lỗi).
+"""
+
+import random
+
+import pytest
+
+from app.models.schemas import UserPreferences
+from app.services.algorithm.fitness import build_distance_matrix
+from app.services.algorithm.hga_engine import HybridGeneticAlgorithm
+from app.services.data_loader import get_catalogue
+
+INTERESTS = {'history_culture': 5, 'nature_parks': 3, 'food_drink': 4,
+             'shopping': 1, 'entertainment': 2}
+
+CASES = [
+    # dataset, start, end (giờ), start_node_id, end_node_id, days
+    ('C101', 8.0, 17.0, 0, None, 1),
+    ('C101', 8.0, 17.0, 20, 75, 3),
+    ('R101', 0.0, 3.8, 5, None, 2),
+    ('RC101', 0.0, 4.0, 12, 40, 1),
+]
+
+
+@pytest.mark.parametrize('dataset,start,end,start_node,end_node,days', CASES)
+def test_response_uses_original_catalogue_ids(dataset, start, end, start_node, end_node, days):
+    prefs = UserPreferences(dataset=dataset, start_time=start, end_time=end,
+                            budget=900_000, start_node_id=start_node,
+                            end_node_id=end_node, days=days, interests=INTERESTS)
+    catalogue = get_catalogue(dataset)
+    full = build_distance_matrix(list(catalogue.pois), key=catalogue.key)
+    weights = prefs.interest_weights
+
+    random.seed(5)
+    engine = HybridGeneticAlgorithm(prefs)
+    assert engine.problem.candidates < len(catalogue) - 1   # Bài toán thật sự được thu gọn
+    response = engine.run()
+    items = response.route
+
+    # Điểm đầu / cuối và separator mang id gốc
+    assert items[0].id == start_node
+    assert items[-1].id == prefs.end_node
+    assert [i.id for i in items if i.category == 'depot' and i is not items[-1]] \
+        == [start_node] * (2 * days - 1)
+
+    visits = [i for i in items if i.category != 'depot']
+    assert visits
+    assert len({i.id for i in visits}) == len(visits)
+    for prev, item in zip(items, items[1:]):
+        if item.order == 1:
+            continue    # Xuất phát của ngày mới — không có chặng đi
+        assert item.travel_distance == round(full.array[prev.id, item.id], 2)
+
+    for item in visits:
+        poi = catalogue.by_id[item.id]
+        assert item.id not in (start_node, prefs.end_node)
+        assert item.category == poi.category
+        assert item.name == f"POI-{poi.id} ({poi.category})"
+        assert item.cost == poi.price
+        assert item.score == round(poi.base_score * weights[poi.category], 2)
+        assert item.score > 0 and poi.price <= prefs.budget
+
+
+def test_sub_problem_pois_mirror_catalogue():
+    prefs = UserPreferences(dataset='C101', start_time=8.0, end_time=17.0, budget=500_000,
+                            start_node_id=20, end_node_id=75, interests=INTERESTS)
+    catalogue = get_catalogue('C101')
+    problem = HybridGeneticAlgorithm(prefs).problem
+
+    assert problem.original_ids[:2] == (20, 75)
+    assert list(problem.original_ids[2:]) == sorted(problem.original_ids[2:])
+    for local, poi in enumerate(problem.pois):
+        original = catalogue.by_id[problem.original_ids[local]]
+        assert poi.id == local
+        assert (poi.x, poi.y) == (original.x, original.y)
+        if local >= 2:      # Endpoint mang khung giờ của depot (PoiCatalogue.endpoint)
+            assert (poi.base_score, poi.open_time, poi.close_time, poi.duration,
+                    poi.category, poi.price) == \
+                   (original.base_score, original.open_time, original.close_time,
+                    original.duration, original.category, original.price)